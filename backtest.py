@@ -0,0 +1,253 @@
+"""
+ROLLING-ORIGIN BACKTEST FOR BANKCONVERT AI
+
+1. Why: the notebook scores the model once on a random 30% split, so every test customer has neighbours from the
+same month in training. Live, the model scores NEXT month's customers, often in a different euribor3m /
+emp.var.rate regime, and nobody knows how fast it goes stale, i.e. how often retrain.py has to run.
+
+2. How:
+   - the dataset is in contact order (May 2008 -> Nov 2010) but only has month names, so a new campaign month
+     starts every time the month changes from one row to the next (the year goes up when the month number drops)
+   - origin t: train on every month <= t, test on month t+1 (and t+2 .. t+horizon with --horizon, to see how
+     metrics decay as the model ages)
+   - all rows are encoded ONCE (same layout as the app, cached as a stage like train_pipeline.py) and saved as
+     .npy, every worker of the process pool memory-maps them. Months are contiguous rows, so a fold is just a
+     prefix of the matrix
+   - per-fold preprocessing is refitted on the fold's training months only, straight on the shared matrix: the
+     numeric columns are re-standardised with the training rows' mean/std (= a StandardScaler fitted on them) and
+     economic_condition is redone with the training months' emp/nr medians. No fold sees future months
+   - each fold's test probabilities are cached under a hash of the rows it used + model + params, so after a new
+     month is appended only the folds that touch it are trained again
+   - report per test month: base rate, precision, recall, F1, lift (= precision / base rate, vs calling at random)
+     and ROC AUC, then the mean per model age and the longest retrain interval that stays within --tolerance F1
+     of a model retrained every month
+
+Usage:
+    python backtest.py bank-additional-full.csv --horizon 3 --workers 4
+    python backtest.py bank-additional-full.csv --model logistic_regression --output backtest.csv
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
+
+from batch_score import file_fingerprint
+from model_registry import resolve_artifact
+from scoring import (FEATURE_COLUMNS_PATH, SCALER_PATH, load_artifacts, load_labelled_data, load_thresholds,
+                     one_hot_levels, predict_probability, preprocess_batch)
+from train_pipeline import CACHE_DIR, MODELS, StageCache, parse_params, train
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+DEFAULT_START_YEAR = 2008 # first contact month of bank-additional-full.csv is May 2008
+DEFAULT_HORIZON = 1 # months tested after each origin
+DEFAULT_MIN_TRAIN_MONTHS = 3
+DEFAULT_TOLERANCE = 0.05 # F1 a stale model may lose vs one retrained every month
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: CAMPAIGN MONTHS
+
+def campaign_months(month, start_year=DEFAULT_START_YEAR):
+    """Rows in contact order -> (period index per row, 'YYYY-MM' label per period)"""
+    number = pd.Series(month).str.lower().map({m: i + 1 for i, m in enumerate(MONTHS)}).to_numpy()
+    if np.isnan(number).any():
+        raise SystemExit("Unknown month names in the 'month' column")
+    number = number.astype(int)
+    starts = np.flatnonzero(np.r_[True, number[1:] != number[:-1]])
+    year = start_year + np.cumsum(np.r_[0, number[starts][1:] <= number[starts][:-1]])
+    period = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(number)]))
+    return period, [f"{y}-{m:02d}" for y, m in zip(year, number[starts])]
+
+
+def build_timeline(csv_path, sep, start_year):
+    """Every labelled row encoded once with the app's layout + what per-fold preprocessing needs"""
+    _, scaler, feature_columns = load_artifacts()
+    emp_median, nr_median = load_thresholds()
+    X_raw, y = load_labelled_data(csv_path, sep)
+    period, labels = campaign_months(X_raw['month'], start_year)
+    numerical_cols = list(scaler.feature_names_in_)
+    position = {col: i for i, col in enumerate(feature_columns)}
+    levels = one_hot_levels(feature_columns, numerical_cols).get('economic_condition', (pd.Index([]), []))
+    return {
+        'X': np.ascontiguousarray(preprocess_batch(X_raw, feature_columns, scaler, emp_median, nr_median)),
+        'y': y.to_numpy(dtype=np.int8),
+        'emp': X_raw['emp.var.rate'].to_numpy(dtype=np.float64),
+        'nr': X_raw['nr.employed'].to_numpy(dtype=np.float64),
+        'period': period, 'labels': labels,
+        'numeric': np.array([position[c] for c in numerical_cols]),
+        'economic_levels': list(levels[0]), 'economic_positions': np.asarray(levels[1]),
+    }
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: POOL WORKERS
+
+_worker = {}
+
+
+def init_worker(data_dir, model_name, params):
+    for name in ('X', 'y', 'emp', 'nr'):
+        _worker[name] = np.load(os.path.join(data_dir, f"{name}.npy"), mmap_mode='r')
+    _worker.update(np.load(os.path.join(data_dir, "layout.npz"), allow_pickle=True))
+    _worker['model_name'] = model_name
+    # the pool already uses every CPU, one thread per forest
+    _worker['params'] = {'n_jobs': 1, **params} if model_name == 'random_forest' else params
+
+
+def run_fold(train_end, windows):
+    """Fit on rows [0, train_end), predict every (test period, start, end) window -> [(period, probabilities)]"""
+    X = np.array(_worker['X'][:windows[-1][2]]) # private copy of the prefix this fold uses
+    numeric = _worker['numeric']
+    mean = X[:train_end, numeric].mean(axis=0)
+    std = X[:train_end, numeric].std(axis=0)
+    X[:, numeric] = (X[:, numeric] - mean) / np.where(std > 0, std, 1.0)
+
+    # economic_condition with the training months' medians (same rule as engineer_features)
+    emp, nr = _worker['emp'][:len(X)], _worker['nr'][:len(X)]
+    emp_above = emp > np.median(emp[:train_end])
+    nr_above = nr > np.median(nr[:train_end])
+    condition = np.select([emp_above & nr_above, ~emp_above & ~nr_above], ['Good', 'Bad'], 'Neutral')
+    for level, column in zip(_worker['economic_levels'], _worker['economic_positions']):
+        X[:, column] = condition == level
+
+    model = train({'X_train': X[:train_end], 'y_train': np.asarray(_worker['y'][:train_end])},
+                  _worker['model_name'], _worker['params'])
+    return [(period, predict_probability(model, X[start:end]).astype(np.float32)) for period, start, end in windows]
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: BACKTEST
+
+def month_metrics(y, probability):
+    predicted = probability > 0.5
+    base_rate = float(y.mean())
+    precision = precision_score(y, predicted, zero_division=0)
+    return {
+        'rows': len(y), 'base_rate': base_rate, 'precision': precision,
+        'recall': recall_score(y, predicted, zero_division=0), 'f1': f1_score(y, predicted, zero_division=0),
+        'lift': precision / base_rate if base_rate > 0 else np.nan,
+        'roc_auc': roc_auc_score(y, probability) if 0 < y.sum() < len(y) else np.nan,
+    }
+
+
+def fold_key(cache, timeline, train_end, windows, model_name, params):
+    """Hash of the exact rows the fold reads, so appending a later month leaves older folds cached"""
+    end = windows[-1][2]
+    digest = hashlib.sha256(timeline['X'][:end].data)
+    digest.update(timeline['y'][:end].tobytes())
+    return cache.key('fold', digest.hexdigest(), model=model_name, params=params, train_end=train_end,
+                     windows=[(int(s), int(e)) for _, s, e in windows])
+
+
+def backtest(csv_path, sep=";", model_name='random_forest', params=None, horizon=DEFAULT_HORIZON,
+             min_train_months=DEFAULT_MIN_TRAIN_MONTHS, start_year=DEFAULT_START_YEAR, workers=None, cache=None):
+    """Per (origin, test month) metrics DataFrame, folds missing from the cache run in one process pool"""
+    params = params or {}
+    cache = cache or StageCache()
+    timeline_key = cache.key('timeline', file_fingerprint(csv_path), sep=sep, start_year=start_year,
+                             scaler=file_fingerprint(resolve_artifact(SCALER_PATH)),
+                             feature_columns=file_fingerprint(resolve_artifact(FEATURE_COLUMNS_PATH)))
+    timeline = cache.run('timeline', timeline_key, lambda: build_timeline(csv_path, sep, start_year))
+    labels = timeline['labels']
+    bounds = np.r_[np.searchsorted(timeline['period'], np.arange(len(labels))), len(timeline['period'])]
+
+    folds = {}
+    for origin in range(min_train_months - 1, len(labels) - 1):
+        tested = range(origin + 1, min(origin + horizon + 1, len(labels)))
+        windows = [(t, bounds[t], bounds[t + 1]) for t in tested]
+        train_end = bounds[origin + 1]
+        folds[origin] = (train_end, windows, fold_key(cache, timeline, train_end, windows, model_name, params))
+    results = {origin: cache.get('fold', key) for origin, (_, _, key) in folds.items()}
+    missing = [origin for origin, result in results.items() if result is None]
+
+    if missing:
+        data_dir = tempfile.mkdtemp(prefix="backtest-")
+        try:
+            for name in ('X', 'y', 'emp', 'nr'):
+                np.save(os.path.join(data_dir, f"{name}.npy"), timeline[name])
+            np.savez(os.path.join(data_dir, "layout.npz"), numeric=timeline['numeric'],
+                     economic_levels=np.array(timeline['economic_levels'], dtype=object),
+                     economic_positions=timeline['economic_positions'])
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                     initargs=(data_dir, model_name, params)) as pool:
+                # biggest training sets first, so the pool does not end on one long fold
+                tasks = {origin: pool.submit(run_fold, folds[origin][0], folds[origin][1])
+                         for origin in sorted(missing, reverse=True)}
+                for origin, task in tasks.items():
+                    results[origin] = task.result()
+                    cache.put('fold', folds[origin][2], results[origin])
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    rows = []
+    for origin, (train_end, _, _) in folds.items():
+        for period, probability in results[origin]:
+            y = timeline['y'][bounds[period]:bounds[period + 1]]
+            rows.append({'origin': labels[origin], 'train_months': origin + 1, 'train_rows': int(train_end),
+                         'test_month': labels[period], 'age': period - origin, **month_metrics(y, probability)})
+    return pd.DataFrame(rows), len(missing)
+
+
+def retrain_interval(results, tolerance=DEFAULT_TOLERANCE):
+    """(mean metrics per model age, longest age whose mean F1 is within tolerance of a 1-month-old model).
+    Only test months scored at every age are compared, so each age is averaged over the same months"""
+    ages = results['age'].nunique()
+    common = results.groupby('test_month')['age'].transform('nunique') == ages
+    by_age = results[common].groupby('age')[['rows', 'precision', 'recall', 'f1', 'lift', 'roc_auc']].mean()
+    within = (by_age['f1'] >= by_age['f1'].iloc[0] - tolerance).to_numpy()
+    # ages 1, 2, ... up to the first one that falls outside
+    return by_age, len(within) if within.all() else max(int(np.argmin(within)), 1)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest: train on months <= t, test on t+1")
+    parser.add_argument("csv", nargs="?", default="bank-additional-full.csv", help="labelled rows in contact order")
+    parser.add_argument("--sep", default=";")
+    parser.add_argument("--model", default="random_forest", choices=sorted(MODELS))
+    parser.add_argument("--param", action="append", default=[], help="hyperparameter, e.g. --param max_depth=15")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help="months tested after each origin")
+    parser.add_argument("--min-train-months", type=int, default=DEFAULT_MIN_TRAIN_MONTHS)
+    parser.add_argument("--start-year", type=int, default=DEFAULT_START_YEAR)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="F1 a stale model may lose")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all CPUs)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--output", default=None, help="CSV with every (origin, test month) row")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results, trained = backtest(args.csv, args.sep, args.model, parse_params(args.param), args.horizon,
+                                args.min_train_months, args.start_year, args.workers,
+                                StageCache(args.cache_dir, enabled=not args.no_cache))
+    if results.empty:
+        raise SystemExit("Not enough campaign months for a single fold, lower --min-train-months")
+    folds = results['origin'].nunique()
+    print(f"{folds} origins, {trained} folds trained ({folds - trained} cached) in {time.perf_counter() - start:.1f}s")
+    print(results[results['age'] == 1].drop(columns='age').round(3).to_string(index=False))
+
+    by_age, interval = retrain_interval(results, args.tolerance)
+    if len(by_age) > 1:
+        print("\nMean per model age (months since training):")
+        print(by_age.round(3).to_string())
+        print(f"Retraining every {interval} month(s) keeps F1 within {args.tolerance:.2f} of monthly retraining")
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Saved -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
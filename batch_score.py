@@ -0,0 +1,512 @@
+"""
+HEADLESS SHARDED BATCH SCORING FOR BANKCONVERT AI (no streamlit)
+
+1. For nightly runs: scores a large customer CSV across all CPU cores.
+   - the CSV is split into row-range shards (byte offsets found in one quick pass, so workers seek straight to
+     their rows instead of re-reading the file from the top)
+   - shards are scored in a process pool, each worker memory-maps the exported forest + scaler arrays
+     (see forest_arrays.py) instead of unpickling best_model.pkl again
+   - every shard is written to its own Parquet file (temp file + rename, so a half-written shard never counts)
+   - when all shards are done they are merged into the final Parquet file, again via temp file + rename
+
+2. Each shard also builds drift sketches of its inputs + scores (drift_monitor.py), saved next to the shard, and
+they are merged into drift_state.pkl at the end (skip with --no-drift).
+
+3. If a shadow candidate is set (models/SHADOW, see shadow_scoring.py) every shard is scored again by the candidate.
+Those tasks are queued after all primary shards, so the final Parquet file is merged + published first.
+
+4. If the job dies halfway, running the same command again resumes: shards that already have a Parquet file
+are skipped. The work folder remembers the input file + model fingerprint so a changed input/model is not mixed.
+
+5. --early-exit (forest models only): trees are evaluated in batches and a customer stops once its label against the
+serving threshold (decision_threshold.pkl when it was computed for this model file, else 0.5) is settled
+(forest_predict_early_exit in forest_arrays.py).
+The output gets 'exact' (full-forest probability or running estimate), 'trees' and 'call' (probability >= the serving
+threshold, the label the early exit settles) columns, and with --top-k every shard's top K (so also the file's top K)
+has exact probabilities. --exact-spread sends customers whose trees disagree a lot down the full-forest path as well.
+'prediction' is model.predict's > 0.5 with or without --early-exit. At the end one shard is scored both ways and the
+tree saving + wall-clock speedup against the full forest are printed.
+
+6. Forest models also write 'uncertainty' (std of the tree votes, from the same pass) and, when conformal.pkl was
+calibrated on this model file (uncertainty.py), the calibrated 'lower' / 'upper' interval. Rank by 'lower' for
+cautious call lists.
+
+Usage:
+    python batch_score.py customers.csv scores.parquet --id-col customer_id --workers 8
+    python batch_score.py customers.csv scores.parquet --early-exit --top-k 5000
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from drift_monitor import STATE_PATH, DriftMonitor, load_monitor, merge_into_state, save_monitor
+from forest_arrays import (DEFAULT_DELTA, DEFAULT_TREE_BATCH, export_forest, forest_predict_early_exit,
+                           forest_predict_proba, forest_predict_spread, is_tree_model, load_forest)
+from model_registry import LOCAL_VERSION, SHADOW_POINTER, read_pointer, resolve_artifact, version_dir
+from scoring import (MODEL_PATH, SCALER_PATH, FEATURE_COLUMNS_PATH, THRESHOLDS_PATH, accepts_sparse,
+                     encode_features, encode_features_sparse, engineer_features, load_thresholds, predict_probability)
+from shadow_scoring import RECORD, SOURCE_BATCH, append_records, make_records
+from threshold_optimizer import DEFAULT_THRESHOLD, THRESHOLD_PATH, load_model_threshold
+from uncertainty import CONFORMAL_PATH, conformal_interval, load_model_conformal
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+MANIFEST = "manifest.json"
+MODEL_DIR = "model"
+DEFAULT_SHARD_ROWS = 100000
+
+
+class WorkDirMismatch(SystemExit):
+    """Checkpoint folder belongs to another input / model (still exits the CLI with the message)"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: SHARED MODEL (exported once, memory-mapped by every worker)
+
+class MappedScaler:
+    """Just the part of StandardScaler that encode_features needs, backed by memory-mapped arrays"""
+
+    def __init__(self, feature_names, mean, scale):
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+def file_fingerprint(path):
+    """sha256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_shared_model(model_dir, model_path=MODEL_PATH, scaler_path=SCALER_PATH,
+                        feature_columns_path=FEATURE_COLUMNS_PATH, thresholds_path=THRESHOLDS_PATH,
+                        conformal_path=CONFORMAL_PATH):
+    """Unpickle the artifacts ONCE in the parent and write them as arrays the workers can memory-map"""
+    model_path = resolve_artifact(model_path)
+    model = joblib.load(model_path)
+    scaler = joblib.load(resolve_artifact(scaler_path))
+    feature_columns = joblib.load(resolve_artifact(feature_columns_path))
+    emp_median, nr_median = load_thresholds(thresholds_path)
+    os.makedirs(model_dir, exist_ok=True)
+
+    if is_tree_model(model):
+        export_forest(model, model_dir)
+        kind = "forest"
+    else:
+        # other models: uncompressed joblib dump so at least their numpy arrays get memory-mapped
+        joblib.dump(model, os.path.join(model_dir, "model.joblib"))
+        kind = "joblib"
+
+    np.save(os.path.join(model_dir, "scaler_mean.npy"), scaler.mean_)
+    np.save(os.path.join(model_dir, "scaler_scale.npy"), scaler.scale_)
+    meta = {
+        'kind': kind,
+        'feature_columns': list(feature_columns),
+        'numerical_cols': list(scaler.feature_names_in_),
+        'emp_median': float(emp_median),
+        'nr_median': float(nr_median),
+        'sparse': kind == "joblib" and accepts_sparse(model), # linear models get the CSR matrix
+        # calibrated on this exact model file, else no interval (q + beta of another forest cover nothing)
+        'conformal': (load_model_conformal(file_fingerprint(model_path), resolve_artifact(conformal_path))
+                      if kind == "forest" else None),
+    }
+    with open(os.path.join(model_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+
+def load_shared_model(model_dir):
+    """Worker side: open the exported arrays memory-mapped"""
+    with open(os.path.join(model_dir, "meta.json")) as f:
+        meta = json.load(f)
+    scaler = MappedScaler(meta['numerical_cols'],
+                          np.load(os.path.join(model_dir, "scaler_mean.npy"), mmap_mode='r'),
+                          np.load(os.path.join(model_dir, "scaler_scale.npy"), mmap_mode='r'))
+    if meta['kind'] == "forest":
+        forest = load_forest(model_dir)
+        predict = lambda X: forest_predict_proba(forest, X)
+    else:
+        model = joblib.load(os.path.join(model_dir, "model.joblib"), mmap_mode='r')
+        predict = lambda X: predict_probability(model, X)
+    return meta, scaler, predict
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: SHARDS
+
+def plan_shards(input_path, shard_rows):
+    """One pass over the file to find the byte offset of every shard_rows-th row.
+    Assumes one customer per line (no quoted newlines), which holds for the bank CSV exports"""
+    with open(input_path, "rb") as f:
+        header = f.readline()
+        shards = []
+        offset = f.tell()
+        rows = 0
+        start_offset, start_row = offset, 0
+        for line in f:
+            if not line.strip():
+                offset += len(line)
+                continue
+            rows += 1
+            offset += len(line)
+            if rows - start_row == shard_rows:
+                shards.append({'offset': start_offset, 'start_row': start_row, 'n_rows': rows - start_row})
+                start_offset, start_row = offset, rows
+        if rows > start_row:
+            shards.append({'offset': start_offset, 'start_row': start_row, 'n_rows': rows - start_row})
+    return header.decode().rstrip("\r\n"), shards
+
+
+def shard_path(work_dir, index):
+    return os.path.join(work_dir, f"shard-{index:05d}.parquet")
+
+
+def shard_drift_path(work_dir, index):
+    return os.path.join(work_dir, f"shard-{index:05d}.drift.pkl")
+
+
+def shard_shadow_path(work_dir, index):
+    return os.path.join(work_dir, f"shard-{index:05d}.shadow.bin")
+
+
+def write_parquet_atomic(table, path):
+    """Write to a temp file then rename, so readers never see a half-written file"""
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: WORKER
+
+_worker = {} # per-process state set up once by init_worker
+
+
+def init_worker(model_dir, shadow_dir=None, early_exit=None):
+    """Runs once per worker process"""
+    _worker['meta'], _worker['scaler'], _worker['predict'] = load_shared_model(model_dir)
+    if shadow_dir is not None:
+        _worker['shadow'] = load_shared_model(shadow_dir)
+    _worker['early_exit'] = early_exit
+    # score_shard's columns: forests give the vote spread from the same pass (+ exact / trees with early exit)
+    if _worker['meta']['kind'] != "forest":
+        _worker['score'] = lambda X: {'probability': _worker['predict'](X)}
+        return
+    forest = load_forest(model_dir) # memory-mapped, so a second handle on the same pages costs nothing
+    if early_exit is None:
+        _worker['score'] = lambda X: dict(zip(['probability', 'uncertainty'], forest_predict_spread(forest, X)))
+    else:
+        _worker['score'] = lambda X: dict(zip(['probability', 'uncertainty', 'exact', 'trees'],
+                                              forest_predict_early_exit(forest, X, **early_exit)))
+
+
+def read_shard(input_path, header, sep, shard):
+    """Seek straight to the shard's first row and read only its rows"""
+    with open(input_path, "rb") as f:
+        f.seek(shard['offset'])
+        return pd.read_csv(f, sep=sep, header=None, names=header.split(sep), nrows=shard['n_rows'])
+
+
+def shard_probabilities(customers, meta, scaler, predict):
+    df = engineer_features(customers, meta['emp_median'], meta['nr_median'])
+    encode = encode_features_sparse if meta.get('sparse') else encode_features
+    return predict(encode(df, meta['feature_columns'], scaler))
+
+
+def worker_probabilities(customers):
+    """Live-model probabilities inside a pool worker (after init_worker)"""
+    return shard_probabilities(customers, _worker['meta'], _worker['scaler'], _worker['predict'])
+
+
+def score_shard(input_path, header, sep, shard, index, work_dir, id_col, track_drift=True):
+    """Reads one row range, scores it and writes shard-XXXXX.parquet"""
+    customers = read_shard(input_path, header, sep, shard)
+    meta = _worker['meta']
+    scored = shard_probabilities(customers, meta, _worker['scaler'], _worker['score'])
+    probability = scored['probability']
+    early_exit = _worker['early_exit']
+
+    out = pd.DataFrame({
+        'row': np.arange(shard['start_row'], shard['start_row'] + len(customers), dtype=np.int64),
+        'probability': probability,
+        'prediction': (probability > 0.5).astype(np.int8), # model.predict's rule, same as the app, whatever the flags
+    })
+    if 'uncertainty' in scored:
+        out['uncertainty'] = scored['uncertainty']
+        if meta.get('conformal'):
+            out['lower'], out['upper'] = conformal_interval(probability, scored['uncertainty'], meta['conformal'])
+    if 'exact' in scored:
+        out['exact'] = scored['exact']
+        out['trees'] = scored['trees'].astype(np.int16)
+        # "call if probability >= threshold" (threshold_optimizer.py, budget card in the app), the label the early
+        # exit settled. Customers tied exactly at the cut are common with early-exit vote fractions
+        out['call'] = (probability >= early_exit['threshold']).astype(np.int8)
+    if id_col is not None:
+        out.insert(0, id_col, customers[id_col].to_numpy())
+    if track_drift:
+        # written before the parquet, so a shard that counts as done always has its sketches
+        save_monitor(DriftMonitor().observe(customers, probability), shard_drift_path(work_dir, index))
+    write_parquet_atomic(pa.Table.from_pandas(out, preserve_index=False), shard_path(work_dir, index))
+    return index, len(out)
+
+
+def time_early_exit(input_path, header, sep, shard, model_dir, early_exit):
+    """Seconds for one shard through the full forest vs the early exit (same encoded rows, in the parent) + n_trees"""
+    meta, scaler, _ = load_shared_model(model_dir)
+    forest = load_forest(model_dir)
+    X = shard_probabilities(read_shard(input_path, header, sep, shard), meta, scaler, lambda X: X) # encoded only
+    start = time.perf_counter()
+    forest_predict_spread(forest, X)
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    forest_predict_early_exit(forest, X, **early_exit)
+    return full, time.perf_counter() - start, forest['n_trees']
+
+
+def shadow_shard(input_path, header, sep, shard, index, work_dir, primary_version, shadow_version):
+    """Candidate scores for one shard next to the primary ones already in shard-XXXXX.parquet"""
+    customers = read_shard(input_path, header, sep, shard)
+    shadow = shard_probabilities(customers, *_worker['shadow'])
+    primary = pq.read_table(shard_path(work_dir, index), columns=['probability']).column(0).to_numpy()
+    path = shard_shadow_path(work_dir, index)
+    with open(path + ".tmp", "wb") as f:
+        f.write(make_records(primary, shadow, SOURCE_BATCH, primary_version, shadow_version).tobytes())
+    os.replace(path + ".tmp", path)
+    return len(customers)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CHECKPOINT + MERGE
+
+def prepare_work_dir(work_dir, input_path, shard_rows, sep, restart=False, early_exit=None):
+    """Create or resume the work folder, returns the manifest (shard plan + fingerprints)"""
+    stat = os.stat(input_path)
+    model_path, thresholds_path = resolve_artifact(MODEL_PATH), resolve_artifact(THRESHOLDS_PATH)
+    conformal_path = resolve_artifact(CONFORMAL_PATH)
+    identity = {
+        'input': os.path.abspath(input_path),
+        'input_size': stat.st_size,
+        'input_mtime': stat.st_mtime,
+        'model_sha256': file_fingerprint(model_path),
+        'thresholds_sha256': file_fingerprint(thresholds_path) if os.path.exists(thresholds_path) else None,
+        'conformal_sha256': file_fingerprint(conformal_path) if os.path.exists(conformal_path) else None,
+        'shard_rows': shard_rows,
+        'sep': sep,
+        'early_exit': early_exit, # estimated and exact shards are not mixed either
+    }
+    manifest_path = os.path.join(work_dir, MANIFEST)
+
+    if os.path.exists(manifest_path) and not restart:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if all(manifest.get(k) == v for k, v in identity.items()):
+            return manifest, True
+        raise WorkDirMismatch(f"{work_dir} belongs to a different input/model. Use --restart to throw it away.")
+
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    os.makedirs(work_dir)
+    export_shared_model(os.path.join(work_dir, MODEL_DIR))
+    header, shards = plan_shards(input_path, shard_rows)
+    manifest = dict(identity, header=header, shards=shards)
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, manifest_path)
+    return manifest, False
+
+
+def merge_shards(work_dir, n_shards, output_path):
+    """Concatenate shard files in row order into the final Parquet file, atomically"""
+    tmp = output_path + ".tmp"
+    writer = None
+    try:
+        for index in range(n_shards):
+            table = pq.read_table(shard_path(work_dir, index))
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None: # empty input, still write an empty file
+        pq.write_table(pa.table({'row': pa.array([], pa.int64()), 'probability': pa.array([], pa.float64()),
+                                 'prediction': pa.array([], pa.int8())}), tmp)
+    os.replace(tmp, output_path)
+
+
+def merge_shard_drift(work_dir, n_shards, state_path):
+    """Merge every shard's drift sketches and add them to the live drift window"""
+    total = DriftMonitor()
+    for index in range(n_shards):
+        monitor = load_monitor(shard_drift_path(work_dir, index))
+        if monitor is not None:
+            total.merge(monitor)
+    merge_into_state(total, state_path)
+
+
+def prepare_shadow_model(work_dir, shadow_version):
+    """Export the candidate version like the live model (once, kept for resumed runs)"""
+    shadow_dir = os.path.join(work_dir, f"shadow-{shadow_version}")
+    if not os.path.exists(os.path.join(shadow_dir, "meta.json")): # meta.json is written last
+        folder = version_dir(shadow_version)
+        export_shared_model(shadow_dir, *(os.path.join(folder, name) for name in
+                                          (MODEL_PATH, SCALER_PATH, FEATURE_COLUMNS_PATH, THRESHOLDS_PATH,
+                                           CONFORMAL_PATH)))
+    return shadow_dir
+
+
+def serving_threshold():
+    """Cut the early exit has to settle: decision_threshold.pkl of the live model file, else the model's own 0.5"""
+    saved = load_model_threshold(file_fingerprint(resolve_artifact(MODEL_PATH)), resolve_artifact(THRESHOLD_PATH))
+    return float(saved['threshold']) if saved else DEFAULT_THRESHOLD
+
+
+def append_shard_shadow(work_dir, n_shards):
+    """Move every shard's shadow records into the shadow log (file removed once appended, so never twice)"""
+    rows = 0
+    for index in range(n_shards):
+        path = shard_shadow_path(work_dir, index)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                records = f.read()
+            append_records(np.frombuffer(records, dtype=RECORD))
+            rows += len(records) // RECORD.itemsize
+            os.remove(path)
+    return rows
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 7: CLI
+
+def run(input_path, output_path, work_dir=None, workers=None, shard_rows=DEFAULT_SHARD_ROWS, sep=",",
+        id_col=None, restart=False, keep_parts=False, drift_state=STATE_PATH, shadow=True, early_exit=None,
+        progress=None):
+    """Score input_path into output_path, resuming from work_dir if a previous run died.
+    early_exit = None or forest_predict_early_exit options, e.g. {'threshold': 0.62, 'top_k': 5000}
+    progress(rows_done, rows_total) is called after every shard (e.g. job_queue.py), anything it raises stops
+    the run with the finished shards kept for a resume"""
+    work_dir = work_dir or output_path + ".parts"
+    manifest, resumed = prepare_work_dir(work_dir, input_path, shard_rows, sep, restart, early_exit)
+    with open(os.path.join(work_dir, MODEL_DIR, "meta.json")) as f:
+        if early_exit is not None and json.load(f)['kind'] != "forest":
+            raise SystemExit("--early-exit needs a tree model (the live model is not a forest)")
+    shards = manifest['shards']
+    todo = [i for i in range(len(shards)) if not os.path.exists(shard_path(work_dir, i))]
+    if resumed:
+        print(f"Resuming: {len(shards) - len(todo)} of {len(shards)} shards already done")
+
+    # early-exit probabilities are estimates away from the threshold, comparing them would blur the shadow log
+    shadow_version = read_pointer(pointer=SHADOW_POINTER) if shadow and early_exit is None else None
+    shadow_dir = prepare_shadow_model(work_dir, shadow_version) if shadow_version else None
+    primary_version = read_pointer() or LOCAL_VERSION
+
+    started = time.perf_counter()
+    rows_done = 0
+    rows_total = sum(s['n_rows'] for s in shards)
+    rows_before = rows_total - sum(shards[i]['n_rows'] for i in todo) # already done by an earlier run
+    if progress is not None:
+        progress(rows_before, rows_total)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(os.path.join(work_dir, MODEL_DIR), shadow_dir, early_exit)) as pool:
+        futures = [pool.submit(score_shard, input_path, manifest['header'], sep, shards[i], i, work_dir, id_col,
+                               drift_state is not None)
+                   for i in todo]
+        # queued behind ALL primary shards, so they only use workers the primary job no longer needs
+        shadow_futures = [pool.submit(shadow_shard, input_path, manifest['header'], sep, shards[i], i, work_dir,
+                                      primary_version, shadow_version)
+                          for i in todo] if shadow_dir else []
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                index, n = future.result()
+                rows_done += n
+                print(f"  shard {index} done ({done}/{len(todo)}, {rows_done:,} rows)", flush=True)
+                if progress is not None:
+                    progress(rows_before + rows_done, rows_total)
+        except BaseException:
+            # otherwise leaving the pool waits for every queued shard first
+            for future in futures + shadow_futures:
+                future.cancel()
+            raise
+
+        merge_shards(work_dir, len(shards), output_path)
+        elapsed = time.perf_counter() - started
+        print(f"Scored {rows_total:,} rows -> {output_path} "
+              f"({rows_done:,} rows this run in {elapsed:.1f}s)")
+        if early_exit is not None:
+            trees = pq.read_table(output_path, columns=['trees', 'exact']).to_pandas()
+            print(f"  early exit at {early_exit['threshold']:g}: {trees['trees'].mean():.1f} trees per customer on "
+                  f"average, {trees['exact'].mean():.1%} exact")
+            if shards and rows_total:
+                full, early, n_trees = time_early_exit(input_path, manifest['header'], sep, shards[0],
+                                                       os.path.join(work_dir, MODEL_DIR), early_exit)
+                print(f"  {n_trees / trees['trees'].mean():.1f}x fewer trees than the full forest ({n_trees}), shard 0 "
+                      f"timed both ways: {full * 1000:.0f} ms full vs {early * 1000:.0f} ms early exit = "
+                      f"{full / early:.1f}x faster")
+
+        for future in shadow_futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"  shadow shard failed ({e}), primary output is not affected")
+
+    if drift_state is not None:
+        merge_shard_drift(work_dir, len(shards), drift_state)
+    if shadow_dir:
+        print(f"Shadow {shadow_version}: {append_shard_shadow(work_dir, len(shards)):,} rows added to the shadow log "
+              f"({time.perf_counter() - started - elapsed:.1f}s after the primary output)")
+    if not keep_parts:
+        shutil.rmtree(work_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a large customer CSV across all cores")
+    parser.add_argument("input", help="customer CSV with the 18 raw input columns")
+    parser.add_argument("output", help="final Parquet file")
+    parser.add_argument("--id-col", default=None, help="customer id column to carry through")
+    parser.add_argument("--sep", default=",", help="input CSV separator (UCI file uses ';')")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--shard-rows", type=int, default=DEFAULT_SHARD_ROWS, help="rows per shard")
+    parser.add_argument("--work-dir", default=None, help="checkpoint folder (default: <output>.parts)")
+    parser.add_argument("--restart", action="store_true", help="ignore any checkpoint and start over")
+    parser.add_argument("--keep-parts", action="store_true", help="keep shard files after the merge")
+    parser.add_argument("--drift-state", default=STATE_PATH, help="live drift window to add this run to")
+    parser.add_argument("--no-drift", action="store_true", help="do not track input/score drift")
+    parser.add_argument("--no-shadow", action="store_true", help="skip the shadow candidate even if one is set")
+    parser.add_argument("--early-exit", action="store_true", help="stop evaluating trees once a label is settled")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="cut for --early-exit (default: decision_threshold.pkl, else 0.5)")
+    parser.add_argument("--tree-batch", type=int, default=DEFAULT_TREE_BATCH)
+    parser.add_argument("--delta", type=float, default=DEFAULT_DELTA, help="allowed label error rate per customer")
+    parser.add_argument("--top-k", type=int, default=0, help="customers per shard that always get exact scores")
+    parser.add_argument("--exact-spread", type=float, default=None,
+                        help="tree-vote std from which a customer always gets the full forest")
+    args = parser.parse_args(argv)
+
+    early_exit = None
+    if args.early_exit:
+        threshold = serving_threshold() if args.threshold is None else args.threshold
+        early_exit = {'threshold': threshold, 'tree_batch': args.tree_batch, 'delta': args.delta, 'top_k': args.top_k,
+                      'exact_spread': args.exact_spread}
+    run(args.input, args.output, args.work_dir, args.workers, args.shard_rows, args.sep, args.id_col,
+        args.restart, args.keep_parts, None if args.no_drift else args.drift_state, not args.no_shadow, early_exit)
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
@@ -0,0 +1,170 @@
+"""
+MONTE CARLO CAMPAIGN SIMULATOR FOR BANKCONVERT AI
+
+1. Why: the Performance tab quotes fixed test-set numbers (729 of 1,392 subscribers found), but planners ask
+"3 RMs x 40 calls a day for 4 weeks, how many deposits, and how sure are we?"
+
+2. How:
+   - campaign = RMs x calls/day x 5 working days x weeks calls, from a pool of scored customers (pre-scored book,
+     saved scores, or a batch_score.py / score_table.py Parquet file), each customer called at most once
+   - model-ranked: call the pool from the highest probability down. random: same number of calls to customers
+     drawn at random from the pool (with replacement, so runs are independent draws: same expected
+     conversions, slightly wider band only when the campaign calls most of the pool)
+   - every run is a row of Bernoulli draws, all runs in ONE array comparison (uniform < chance per call), summed
+     per day -> cumulative conversions per run. Runs are only split into blocks to cap memory, never per call
+   - the forest is trained with class_weight='balanced', so its scores are NOT conversion chances (mean ~0.4 for
+     an ~11% base rate). Scores are turned into chances with the held-out curve from threshold_optimizer.py
+     (decision_threshold.pkl): conversion rate of each 5% slice of customers by score, made non-increasing.
+     Without that file (or when it was computed for another model file) raw scores are used and the totals are
+     overstated
+   - report: mean + 5th-95th percentile band per day and at the end for both, lift, and the share of runs where
+     model-ranked calling beat random calling
+
+Usage:
+    python campaign_simulator.py scores.parquet --rms 3 --calls-per-day 40 --weeks 4 --runs 5000
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_score import file_fingerprint
+from model_registry import resolve_artifact
+from scoring import MODEL_PATH
+from threshold_optimizer import DEFAULT_CALLS_PER_DAY, THRESHOLD_PATH, load_model_threshold
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+DEFAULT_RMS = 3
+DEFAULT_WEEKS = 4
+WORKING_DAYS = 5
+DEFAULT_RUNS = 2000
+DEFAULT_SEED = 0
+BAND = (5, 95) # percentiles of the confidence band
+CALIBRATION_BINS = 20 # slices of customers by score (5% of the held-out split each)
+BLOCK_DRAWS = 4_000_000 # runs x calls per block (~16 MB of float32 uniforms)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: SCORE -> CONVERSION CHANCE
+
+def calibration_table(curve, bins=CALIBRATION_BINS):
+    """Held-out conversion rate per score slice from the threshold_optimizer curve (thresholds high -> low)"""
+    call_rate = curve['call_rate'].to_numpy()
+    subscriber_rate = curve['subscriber_rate'].to_numpy()
+    thresholds = curve['threshold'].to_numpy()
+    # last curve row of each slice of the call rate (ties can make slices merge, hence unique)
+    cuts = np.unique(np.clip(np.searchsorted(call_rate, np.linspace(0, 1, bins + 1)[1:] - 1e-12), 0,
+                             len(curve) - 1))
+    calls = np.diff(np.r_[0.0, call_rate[cuts]])
+    subscribers = np.diff(np.r_[0.0, subscriber_rate[cuts]])
+    rates = subscribers / np.maximum(calls, 1e-12)
+    # a lower score should never mean a higher chance, flatten noise between neighbouring slices
+    return {'thresholds': thresholds[cuts], 'rates': np.minimum.accumulate(rates)}
+
+
+def conversion_chance(probabilities, table):
+    """Score -> held-out conversion rate of the slice it falls in"""
+    slice_index = np.searchsorted(-table['thresholds'], -np.asarray(probabilities), side='left')
+    return table['rates'][np.minimum(slice_index, len(table['rates']) - 1)]
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: SIMULATION
+
+def daily_conversions(chances, runs, days, rng):
+    """chances = (runs x calls) or (calls,) conversion chance per call in calling order ->
+    (runs x days) conversions per day"""
+    hits = rng.random((runs, chances.shape[-1]), dtype=np.float32) < chances
+    return hits.reshape(runs, days, -1).sum(axis=2, dtype=np.int32)
+
+
+def simulate_campaign(chances, rms=DEFAULT_RMS, calls_per_day=DEFAULT_CALLS_PER_DAY, weeks=DEFAULT_WEEKS,
+                      runs=DEFAULT_RUNS, seed=DEFAULT_SEED):
+    """chances = conversion chance of every customer in the pool ->
+    {'model', 'random'}: (runs x days) cumulative conversions + the campaign size"""
+    chances = np.asarray(chances, dtype=np.float32)
+    days = weeks * WORKING_DAYS
+    per_day = rms * calls_per_day
+    calls = min(per_day * days, len(chances))
+    rng = np.random.default_rng(seed)
+
+    # model-ranked call list: the top `calls` customers, highest first, padded to whole days with no-hope calls
+    top = np.argpartition(-chances, calls - 1)[:calls] if calls < len(chances) else np.arange(len(chances))
+    ranked = np.zeros(per_day * days, dtype=np.float32)
+    ranked[:calls] = np.sort(chances[top])[::-1]
+
+    model = np.empty((runs, days), dtype=np.int32)
+    random = np.empty((runs, days), dtype=np.int32)
+    block = max(BLOCK_DRAWS // ranked.size, 1)
+    for start in range(0, runs, block):
+        n = min(block, runs - start)
+        model[start:start + n] = daily_conversions(ranked, n, days, rng)
+        drawn = np.zeros((n, ranked.size), dtype=np.float32)
+        drawn[:, :calls] = chances[rng.integers(0, len(chances), (n, calls))]
+        random[start:start + n] = daily_conversions(drawn, n, days, rng)
+    return {'model': np.cumsum(model, axis=1), 'random': np.cumsum(random, axis=1), 'calls': calls,
+            'days': days, 'pool': len(chances), 'runs': runs}
+
+
+def summarise(result, band=BAND):
+    """(per-day DataFrame with mean + band for both, end-of-campaign totals dict)"""
+    frame = {'day': np.arange(1, result['days'] + 1)}
+    totals = {'calls': result['calls'], 'pool': result['pool'], 'runs': result['runs']}
+    for strategy in ('model', 'random'):
+        cumulative = result[strategy]
+        low, high = np.percentile(cumulative, band, axis=0)
+        frame.update({f'{strategy}_mean': cumulative.mean(axis=0), f'{strategy}_low': low,
+                      f'{strategy}_high': high})
+        totals.update({f'{strategy}_mean': float(cumulative[:, -1].mean()), f'{strategy}_low': float(low[-1]),
+                       f'{strategy}_high': float(high[-1])})
+    totals['lift'] = totals['model_mean'] / max(totals['random_mean'], 1e-9)
+    totals['model_wins'] = float(np.mean(result['model'][:, -1] > result['random'][:, -1]))
+    return pd.DataFrame(frame), totals
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo campaign outcomes: model-ranked vs random calling")
+    parser.add_argument("scores", help="Parquet/CSV with a probability column (batch_score.py, score_table.py)")
+    parser.add_argument("--column", default="probability")
+    parser.add_argument("--rms", type=int, default=DEFAULT_RMS)
+    parser.add_argument("--calls-per-day", type=int, default=DEFAULT_CALLS_PER_DAY, help="per RM")
+    parser.add_argument("--weeks", type=int, default=DEFAULT_WEEKS)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--raw-scores", action="store_true", help="skip calibration (overstates conversions)")
+    args = parser.parse_args(argv)
+
+    read = pd.read_parquet if args.scores.endswith(".parquet") else pd.read_csv
+    probabilities = read(args.scores, columns=[args.column])[args.column].to_numpy()
+    saved = None if args.raw_scores else load_model_threshold(file_fingerprint(resolve_artifact(MODEL_PATH)),
+                                                              resolve_artifact(THRESHOLD_PATH))
+    if saved is None:
+        chances = probabilities
+        print("⚠️ Using raw scores as conversion chances (no decision_threshold.pkl for the live model / "
+              "--raw-scores), totals will be overstated")
+    else:
+        chances = conversion_chance(probabilities, calibration_table(saved['curve']))
+
+    start = time.perf_counter()
+    result = simulate_campaign(chances, args.rms, args.calls_per_day, args.weeks, args.runs, args.seed)
+    daily, totals = summarise(result)
+    elapsed = time.perf_counter() - start
+    print(f"{args.rms} RMs x {args.calls_per_day} calls/day x {args.weeks} weeks = {totals['calls']:,} calls "
+          f"from a pool of {totals['pool']:,}, {args.runs:,} runs in {elapsed * 1000:.0f} ms")
+    for strategy, name in (('model', "Model-ranked"), ('random', "Random")):
+        print(f"  {name:<13} {totals[f'{strategy}_mean']:8.1f} conversions "
+              f"({BAND[0]}-{BAND[1]}%: {totals[f'{strategy}_low']:.0f}-{totals[f'{strategy}_high']:.0f})")
+    print(f"  Lift {totals['lift']:.2f}x, model-ranked beats random in {totals['model_wins']:.1%} of runs")
+    print(daily.iloc[WORKING_DAYS - 1::WORKING_DAYS].round(1).to_string(index=False)) # end of every week
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
@@ -0,0 +1,269 @@
+"""
+CONTACT-SLOT OPTIMIZER FOR BANKCONVERT AI
+
+1. For every customer, find the best contact slot (month x day_of_week x contact) = 10 x 5 x 2 = 100 counterfactuals.
+
+2. Rationale for approach:
+Only the month_*, day_of_week_* and contact_telephone one-hot columns change between counterfactuals, everything else
+in the encoded row (the "static part") stays the same. So the static part is encoded ONCE per customer, and for tree
+models each tree is walked ONCE per customer: only when a node splits on a slot column does the path fork, carrying
+a mask of which of the 100 slots go left/right. This shares the tree path across all 100 slots instead of evaluating
+the model 100 times.
+
+3. Customers are processed in chunks sized from a memory budget and results are streamed chunk by chunk.
+
+Usage:
+    python contact_optimizer.py customers.csv best_slots.csv --id-col customer_id --memory-mb 256
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import itertools
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from scoring import (engineer_features, encode_features, iter_csv_chunks, load_artifacts, load_thresholds,
+                     predict_probability, split_one_hot_column)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: SLOT GRID
+
+# months that exist in the training data (no jan/feb campaigns in the dataset)
+SLOT_MONTHS = ['mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+SLOT_DAYS = ['mon', 'tue', 'wed', 'thu', 'fri']
+SLOT_CONTACTS = ['cellular', 'telephone']
+SLOT_FIELDS = ['month', 'day_of_week', 'contact']
+
+# rough bytes per (customer, slot) pair on the shared path: float64 total + float64 per-tree accumulator,
+# the frontier itself is only a few int entries per customer
+BYTES_PER_SLOT = 8 + 8
+
+
+def build_slot_grid(feature_columns, months=SLOT_MONTHS, days=SLOT_DAYS, contacts=SLOT_CONTACTS):
+    """Describes the 100 counterfactual slots and which encoded columns they touch.
+
+    Every level of month/day_of_week/contact gets one bit (10 + 5 + 2 = 17 bits). Since a tree split only ever
+    tests ONE slot column, the set of slots reaching any tree node is always a product set
+    (allowed months x allowed days x allowed contacts), so it fits in a single int instead of 100 booleans"""
+    levels = {'month': months, 'day_of_week': days, 'contact': contacts}
+    slots = pd.DataFrame(list(itertools.product(months, days, contacts)), columns=SLOT_FIELDS)
+
+    bit = {}
+    field_bits = {}
+    for field in SLOT_FIELDS:
+        field_bits[field] = 0
+        for level in levels[field]:
+            bit[(field, level)] = len(bit)
+            field_bits[field] |= 1 << bit[(field, level)]
+
+    # only the one-hot columns of the 3 slot fields change between counterfactuals
+    slot_cols, col_field_bits, col_level_bits = [], [], []
+    for i, col in enumerate(feature_columns):
+        parsed = split_one_hot_column(col)
+        if parsed is None or parsed[0] not in levels:
+            continue
+        field, level = parsed
+        slot_cols.append(i)
+        col_field_bits.append(field_bits[field])
+        col_level_bits.append(1 << bit[(field, level)] if (field, level) in bit else 0)
+
+    # 0/1 values of the slot columns for each slot (used by the tiled fallback)
+    values = np.zeros((len(slots), len(slot_cols)), dtype=np.float32)
+    for j, i in enumerate(slot_cols):
+        field, level = split_one_hot_column(feature_columns[i])
+        values[:, j] = slots[field].to_numpy() == level
+
+    # bit positions of each slot, to expand a product-set int back into 100 booleans
+    slot_bits = np.array([[bit[(field, row[field])] for field in SLOT_FIELDS] for _, row in slots.iterrows()])
+
+    return {
+        'slots': slots,
+        'slot_cols': np.array(slot_cols, dtype=np.intp),
+        'col_field_bits': np.array(col_field_bits, dtype=np.int64),
+        'col_level_bits': np.array(col_level_bits, dtype=np.int64),
+        'values': values,
+        'slot_bits': slot_bits,
+        'all_bits': (1 << len(bit)) - 1,
+    }
+
+
+def expand_states(states, grid):
+    """Product-set ints -> (len(states) x n_slots) 0/1 matrix"""
+    member = (states[:, None, None] >> grid['slot_bits'][None, :, :]) & 1
+    return member.all(axis=2).astype(np.float64)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: SHARED TREE PATH EVALUATION
+
+def tree_slot_probabilities(tree, X_static, grid):
+    """P(class 1) for every (row, slot) from ONE fitted sklearn tree, walking each row's path only once.
+    Frontier entries are (row, node, slot state); the state only forks at nodes that split on a slot column"""
+    t = tree.tree_
+    n_rows = len(X_static)
+
+    # leaf probabilities (normalise since older sklearn stores counts instead of fractions)
+    value = t.value[:, 0, :]
+    leaf_p1 = value[:, 1] / value.sum(axis=1)
+
+    # feature index -> position in the slot columns (-1 if not a slot column)
+    slot_position = np.full(t.n_features, -1, dtype=np.intp)
+    slot_position[grid['slot_cols']] = np.arange(len(grid['slot_cols']))
+
+    rows = np.arange(n_rows)
+    nodes = np.zeros(n_rows, dtype=np.intp)
+    states = np.full(n_rows, grid['all_bits'], dtype=np.int64)
+    leaf_rows, leaf_states, leaf_values = [], [], []
+
+    while len(rows):
+        is_leaf = t.children_left[nodes] == -1
+        if is_leaf.any():
+            leaf_rows.append(rows[is_leaf])
+            leaf_states.append(states[is_leaf])
+            leaf_values.append(leaf_p1[nodes[is_leaf]])
+            rows, nodes, states = rows[~is_leaf], nodes[~is_leaf], states[~is_leaf]
+            if not len(rows):
+                break
+
+        feature = t.feature[nodes]
+        threshold = t.threshold[nodes]
+        position = slot_position[feature]
+        on_slot = position >= 0
+
+        # static split: whole entry goes one way, state unchanged
+        static = ~on_slot
+        go_left = X_static[rows[static], feature[static]] <= threshold[static]
+        static_nodes = np.where(go_left, t.children_left[nodes[static]], t.children_right[nodes[static]])
+
+        # slot split: slots with this level have value 1, the rest of the field has value 0
+        pos = position[on_slot]
+        thr = threshold[on_slot]
+        field = grid['col_field_bits'][pos]
+        level = grid['col_level_bits'][pos]
+        left_allowed = np.where(0 <= thr, field & ~level, 0) | np.where(1 <= thr, level, 0)
+        right_allowed = field & ~left_allowed
+        slot_rows, slot_nodes, slot_states = rows[on_slot], nodes[on_slot], states[on_slot]
+        left_states = slot_states & (left_allowed | ~field)
+        right_states = slot_states & (right_allowed | ~field)
+        keep_left = (left_states & field) != 0
+        keep_right = (right_states & field) != 0
+
+        rows = np.concatenate([rows[static], slot_rows[keep_left], slot_rows[keep_right]])
+        nodes = np.concatenate([static_nodes, t.children_left[slot_nodes[keep_left]],
+                                t.children_right[slot_nodes[keep_right]]])
+        states = np.concatenate([states[static], left_states[keep_left], right_states[keep_right]])
+
+    # leaf hits as a sparse (row x distinct state) matrix, then expand states to slots in one matmul
+    unique_states, inverse = np.unique(np.concatenate(leaf_states), return_inverse=True)
+    per_state = sparse.csr_matrix((np.concatenate(leaf_values), (np.concatenate(leaf_rows), inverse)),
+                                  shape=(n_rows, len(unique_states)))
+    return per_state @ expand_states(unique_states, grid)
+
+
+def supports_shared_paths(model):
+    """Random Forest / Decision Tree with a class-1 column can use the shared tree path evaluation"""
+    trees = getattr(model, 'estimators_', None)
+    if trees is None and hasattr(model, 'tree_'):
+        trees = [model]
+    return trees is not None and all(hasattr(t, 'tree_') for t in trees) and list(model.classes_) == [0, 1]
+
+
+def slot_probabilities(model, X_static, grid):
+    """(rows x slots) matrix of subscription probabilities for every counterfactual slot"""
+    # sklearn trees compare float32 features, so do the same to get identical splits
+    X_static = np.asarray(X_static, dtype=np.float32)
+    n_rows, n_slots = len(X_static), len(grid['slots'])
+
+    if supports_shared_paths(model):
+        trees = model.estimators_ if hasattr(model, 'estimators_') else [model]
+        total = np.zeros((n_rows, n_slots), dtype=np.float64)
+        for tree in trees:
+            total += tree_slot_probabilities(tree, X_static, grid)
+        return total / len(trees) # forest = average of tree probabilities
+
+    # fallback for other models: tile the cached static rows and patch only the slot columns
+    X = np.repeat(X_static, n_slots, axis=0)
+    X[:, grid['slot_cols']] = np.tile(grid['values'], (n_rows, 1))
+    return predict_probability(model, X).reshape(n_rows, n_slots)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: STREAMING OPTIMIZER
+
+def chunk_rows_for_budget(model, n_slots, n_features, memory_mb):
+    """How many customers fit in one chunk for the given memory budget"""
+    if supports_shared_paths(model):
+        bytes_per_row = n_slots * BYTES_PER_SLOT + 8 * n_features
+    else:
+        bytes_per_row = n_slots * 8 * (n_features + 1) # tiled float64 rows for the fallback
+    return max(1, int(memory_mb * 1024 * 1024 // bytes_per_row))
+
+
+def optimize_slots(customers, model, scaler, feature_columns, emp_median, nr_median, id_col=None, grid=None):
+    """Best slot + lift for one DataFrame of raw customers"""
+    if grid is None:
+        grid = build_slot_grid(feature_columns)
+    slots = grid['slots']
+
+    # static part encoded once per customer (slot columns are patched per counterfactual)
+    X_static = encode_features(engineer_features(customers, emp_median, nr_median), feature_columns, scaler)
+    probs = slot_probabilities(model, X_static, grid)
+
+    # current slot probability = the customer's own month/day/contact
+    current = predict_probability(model, X_static)
+    best = probs.argmax(axis=1)
+    best_slots = slots.iloc[best].reset_index(drop=True)
+
+    result = pd.DataFrame({
+        'best_month': best_slots['month'],
+        'best_day_of_week': best_slots['day_of_week'],
+        'best_contact': best_slots['contact'],
+        'best_probability': probs[np.arange(len(probs)), best],
+        'current_probability': current,
+    })
+    result['lift'] = result['best_probability'] - result['current_probability']
+    if id_col is not None:
+        result.insert(0, id_col, customers[id_col].to_numpy())
+    return result
+
+
+def iter_best_slots(chunks, model, scaler, feature_columns, emp_median, nr_median, id_col=None, memory_mb=256):
+    """Streams best-slot results for an iterable of customer DataFrames, re-chunking to stay within memory_mb"""
+    grid = build_slot_grid(feature_columns)
+    rows_per_chunk = chunk_rows_for_budget(model, len(grid['slots']), len(feature_columns), memory_mb)
+    for chunk in chunks:
+        for start in range(0, len(chunk), rows_per_chunk):
+            part = chunk.iloc[start:start + rows_per_chunk]
+            yield optimize_slots(part, model, scaler, feature_columns, emp_median, nr_median, id_col, grid)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find each customer's best month/day/contact slot")
+    parser.add_argument("input", help="customer CSV with the 18 raw input columns")
+    parser.add_argument("output", help="CSV to write best slots to")
+    parser.add_argument("--id-col", default=None, help="customer id column to carry through")
+    parser.add_argument("--sep", default=",", help="input CSV separator (UCI file uses ';')")
+    parser.add_argument("--memory-mb", type=float, default=256, help="memory budget per chunk")
+    parser.add_argument("--read-chunk", type=int, default=50000, help="rows read from the CSV at a time")
+    args = parser.parse_args(argv)
+
+    model, scaler, feature_columns = load_artifacts()
+    emp_median, nr_median = load_thresholds()
+
+    chunks = iter_csv_chunks(args.input, chunk_size=args.read_chunk, sep=args.sep)
+    written = 0
+    for i, result in enumerate(iter_best_slots(chunks, model, scaler, feature_columns, emp_median, nr_median,
+                                               args.id_col, args.memory_mb)):
+        # stream to disk, header only on the first chunk
+        result.to_csv(args.output, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+        written += len(result)
+    print(f"Best slots written for {written:,} customers -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
@@ -0,0 +1,263 @@
+"""
+CRM DATABASE SOURCE FOR BANKCONVERT AI BATCH SCORING
+
+1. Why: customers live in the bank's relational CRM, not in CSV exports. Exporting to CSV first and reading
+the scores back in afterwards doubles the I/O of a nightly run.
+
+2. How:
+   - ConnectionPool: a fixed number of DB-API connections, reused with `with pool.connection() as conn`
+     (SQLite locally, any DB-API driver with the same ? placeholders in production)
+   - rows are streamed with ONE query + cursor.fetchmany(chunk_rows), never one round trip per customer
+     (for PostgreSQL pass a connect function that returns named / server-side cursors)
+   - every chunk goes straight into the batch_score.py worker pool (same memory-mapped forest + scaler,
+     same engineer_features / encode_features), while the next chunk is being fetched
+   - scores are written back to a customer_scores table with one executemany upsert per chunk, model_version is
+     score_store.version_key (version + sha256 of the model / thresholds files), so a flat-file retrain that is
+     still 'local' can be told apart from the model before it
+   - at most 2 chunks per worker are in flight, so memory stays bounded and the workers never wait for the DB
+
+Usage:
+    python crm_source.py load customers.csv crm.db
+    python crm_source.py score crm.db --table customers --id-col customer_id --chunk-rows 20000
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+
+import pandas as pd
+
+from batch_score import MODEL_DIR, export_shared_model, init_worker, worker_probabilities
+from score_store import version_key
+from score_table import current_identity
+from scoring import RAW_COLUMNS
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+DEFAULT_TABLE = "customers"
+SCORES_TABLE = "customer_scores"
+DEFAULT_CHUNK_ROWS = 20000
+DEFAULT_POOL_SIZE = 4
+MIN_SCORE_POOL_SIZE = 2 # score holds the read connection and the write-back connection at the same time
+IN_FLIGHT_PER_WORKER = 2
+
+# SQL column names cannot have dots, so emp.var.rate is stored as emp_var_rate etc.
+SQL_COLUMNS = {col: col.replace('.', '_') for col in RAW_COLUMNS}
+
+SCORES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS {table} (
+    customer_id   TEXT PRIMARY KEY,
+    model_version TEXT    NOT NULL,
+    probability   REAL    NOT NULL,
+    prediction    INTEGER NOT NULL,
+    scored_at     REAL    NOT NULL
+)"""
+
+SCORES_UPSERT = """
+INSERT INTO {table} (customer_id, model_version, probability, prediction, scored_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (customer_id) DO UPDATE SET
+    model_version = excluded.model_version, probability = excluded.probability,
+    prediction = excluded.prediction, scored_at = excluded.scored_at"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: CONNECTION POOL
+
+def sqlite_connect(path):
+    """Connect function for the local SQLite stand-in"""
+    def connect():
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False) # pooled, so may change threads
+        conn.execute("PRAGMA journal_mode=WAL") # write-back must not wait for the open read cursor
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    return connect
+
+
+class ConnectionPool:
+    """At most `size` open connections, idle ones are handed out again instead of reconnecting"""
+
+    def __init__(self, connect, size=DEFAULT_POOL_SIZE):
+        self._connect = connect
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire() # blocks when all connections are in use
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            except BaseException:
+                conn.close() # state unknown after an error, the next caller gets a fresh connection
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: READ + WRITE BACK
+
+def default_query(table, id_col):
+    columns = ", ".join(f'"{col}"' for col in [id_col] + list(SQL_COLUMNS.values())) # "default" is a keyword
+    return f"SELECT {columns} FROM {table}"
+
+
+def iter_customer_chunks(conn, query, chunk_rows=DEFAULT_CHUNK_ROWS, params=()):
+    """One query, then fetchmany -> DataFrames with the app's raw column names"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        columns = [d[0] for d in cursor.description]
+        rename = {sql: raw for raw, sql in SQL_COLUMNS.items()}
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield pd.DataFrame.from_records(rows, columns=columns).rename(columns=rename)
+    finally:
+        cursor.close()
+
+
+def write_scores(conn, customer_ids, probabilities, model_version, table=SCORES_TABLE):
+    """One executemany upsert + one commit for a whole chunk"""
+    now = time.time()
+    rows = [(str(c), model_version, float(p), int(p > 0.5), now) for c, p in zip(customer_ids, probabilities)]
+    with conn:
+        conn.executemany(SCORES_UPSERT.format(table=table), rows)
+    return len(rows)
+
+
+def score_chunk(customers, id_col):
+    """Runs in a batch_score worker process"""
+    return customers[id_col].to_numpy(), worker_probabilities(customers)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: PIPELINE
+
+def score_from_db(pool, query, id_col="customer_id", scores_table=SCORES_TABLE, chunk_rows=DEFAULT_CHUNK_ROWS,
+                  workers=None, model_version=None):
+    """Stream customers out of the CRM, score them in the worker pool, upsert the scores back.
+    Returns row count + where the wall time went (fetch / waiting for the model / write-back)"""
+    if pool.size < MIN_SCORE_POOL_SIZE: # the second pool.connection() below would wait forever
+        raise ValueError(f"score_from_db needs a pool of at least {MIN_SCORE_POOL_SIZE} connections")
+    if model_version is None:
+        identity = current_identity() # same key as the score store, 'local' alone says nothing after a retrain
+        model_version = version_key(identity['model_version'], identity['model_sha256'], identity['thresholds_sha256'])
+    workers = workers or os.cpu_count() or 1
+    stats = {'rows': 0, 'chunks': 0, 'fetch_seconds': 0.0, 'model_wait_seconds': 0.0, 'write_seconds': 0.0}
+
+    def write_done(futures, write_conn):
+        for future in futures:
+            ids, probability = future.result()
+            start = time.perf_counter()
+            stats['rows'] += write_scores(write_conn, ids, probability, model_version, scores_table)
+            stats['write_seconds'] += time.perf_counter() - start
+
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        model_dir = os.path.join(tmp, MODEL_DIR)
+        export_shared_model(model_dir) # same memory-mapped export as batch_score.py
+        with pool.connection() as read_conn, pool.connection() as write_conn, \
+                ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(model_dir,)) as executor:
+            with write_conn:
+                write_conn.execute(SCORES_SCHEMA.format(table=scores_table))
+            chunks = iter_customer_chunks(read_conn, query, chunk_rows)
+            pending = set()
+            while True:
+                start = time.perf_counter()
+                customers = next(chunks, None)
+                stats['fetch_seconds'] += time.perf_counter() - start
+                if customers is None:
+                    break
+                pending.add(executor.submit(score_chunk, customers, id_col))
+                stats['chunks'] += 1
+                if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                    start = time.perf_counter()
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    stats['model_wait_seconds'] += time.perf_counter() - start
+                    write_done(done, write_conn)
+            start = time.perf_counter()
+            done, _ = wait(pending)
+            stats['model_wait_seconds'] += time.perf_counter() - start
+            write_done(done, write_conn)
+    stats['seconds'] = time.perf_counter() - started
+    stats['model_version'] = model_version
+    return stats
+
+
+def load_csv(csv_path, pool, table=DEFAULT_TABLE, sep=",", chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Fill the local stand-in CRM table from a customer CSV"""
+    rows = 0
+    with pool.connection() as conn:
+        for chunk in pd.read_csv(csv_path, sep=sep, chunksize=chunk_rows):
+            chunk.rename(columns=SQL_COLUMNS).to_sql(table, conn, if_exists="append", index=False)
+            rows += len(chunk)
+        conn.commit()
+    return rows
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score customers straight from the CRM database")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load", help="copy a customer CSV into a local SQLite stand-in")
+    load.add_argument("csv")
+    load.add_argument("db")
+    load.add_argument("--table", default=DEFAULT_TABLE)
+    load.add_argument("--sep", default=",")
+    score = sub.add_parser("score", help="score every customer in the table and write the scores back")
+    score.add_argument("db")
+    score.add_argument("--table", default=DEFAULT_TABLE)
+    score.add_argument("--query", help="custom SELECT (default: id + the 18 input columns of --table)")
+    score.add_argument("--id-col", default="customer_id")
+    score.add_argument("--scores-table", default=SCORES_TABLE)
+    score.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    score.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    score.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE,
+                       help=f"open connections, at least {MIN_SCORE_POOL_SIZE} (one reads, one writes back)")
+    args = parser.parse_args(argv)
+    if args.command == "score" and args.pool_size < MIN_SCORE_POOL_SIZE:
+        parser.error(f"--pool-size must be at least {MIN_SCORE_POOL_SIZE}, score reads and writes back at once")
+
+    pool = ConnectionPool(sqlite_connect(args.db), getattr(args, 'pool_size', DEFAULT_POOL_SIZE))
+    try:
+        if args.command == "load":
+            print(f"Loaded {load_csv(args.csv, pool, args.table, args.sep):,} customers into {args.db}:{args.table}")
+            return
+        query = args.query or default_query(args.table, args.id_col)
+        stats = score_from_db(pool, query, args.id_col, args.scores_table, args.chunk_rows, args.workers)
+    finally:
+        pool.close()
+    print(f"Model {stats['model_version']}: scored {stats['rows']:,} customers in {stats['chunks']} chunks, "
+          f"{stats['seconds']:.1f}s ({stats['rows'] / max(stats['seconds'], 1e-9):,.0f} rows/s)")
+    print(f"  fetch {stats['fetch_seconds']:.1f}s | waiting for the model {stats['model_wait_seconds']:.1f}s | "
+          f"write-back {stats['write_seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    # run through the imported module so the worker processes can find score_chunk
+    from crm_source import main as module_main
+    module_main()
+#---------------------------------------------------------------------------------------------------------
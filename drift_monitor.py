@@ -0,0 +1,305 @@
+"""
+STREAMING DRIFT MONITOR FOR BANKCONVERT AI
+
+1. Why: thresholds.pkl freezes emp.var.rate / nr.employed medians from training, and nothing tells us when the live
+customers (or the economy) drift away from what the model learned.
+
+2. How:
+   - DriftMonitor keeps constant-memory sketches of what has been scored: a QuantileSketch per numerical input,
+     a CategoryCounter per categorical input and a 20-bin histogram of predicted probabilities
+   - the SAME structure built on the training split is saved as the reference profile (drift_reference.pkl)
+   - compare() gives PSI (+ KS for numerics and scores) of live vs reference per column, with a status
+   - live sketches are merged into drift_state.pkl by batch_score.py and by the app's Predict tab
+
+Usage:
+    python drift_monitor.py build-reference bank-additional-full.csv     # once, after training
+    python drift_monitor.py report                                        # print drift table
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import copy
+import os
+import threading
+from contextlib import contextmanager
+
+import joblib
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+    import msvcrt
+import numpy as np
+import pandas as pd
+
+from sketches import CategoryCounter, QuantileSketch
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+REFERENCE_PATH = "drift_reference.pkl"
+STATE_PATH = "drift_state.pkl"
+
+# raw inputs that are monitored (same as the Predict form)
+NUMERIC_COLS = ['age', 'pdays', 'previous', 'emp.var.rate', 'cons.price.idx', 'cons.conf.idx',
+                'euribor3m', 'nr.employed']
+CATEGORY_COLS = ['job', 'marital', 'education', 'default', 'housing', 'loan', 'contact',
+                 'month', 'day_of_week', 'poutcome']
+SCORE_COL = 'probability'
+
+SCORE_BINS = np.linspace(0, 1, 21) # 20 bins of 5% for predicted probabilities
+PSI_BINS = 10 # numerics are binned on reference deciles for PSI
+
+# usual PSI rule of thumb: < 0.1 stable, 0.1-0.25 moderate shift, > 0.25 major shift
+PSI_MODERATE, PSI_MAJOR = 0.1, 0.25
+KS_MODERATE, KS_MAJOR = 0.1, 0.2
+MIN_LIVE_ROWS = 100 # below this the comparison is too noisy to alert on
+EPS = 1e-4 # avoids log(0) in PSI for empty bins
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: DRIFT MONITOR (sketches of inputs + scores)
+
+class DriftMonitor:
+    """Constant-memory summary of everything that has been scored"""
+
+    def __init__(self, k=200):
+        self.numeric = {col: QuantileSketch(k) for col in NUMERIC_COLS}
+        self.category = {col: CategoryCounter() for col in CATEGORY_COLS}
+        self.score_counts = np.zeros(len(SCORE_BINS) - 1, dtype=np.int64)
+        self.rows = 0
+
+    def observe(self, customers, probabilities=None):
+        """Add a batch of raw customer rows (+ their predicted probabilities)"""
+        for col in NUMERIC_COLS:
+            self.numeric[col].update(customers[col].to_numpy())
+        for col in CATEGORY_COLS:
+            self.category[col].update(customers[col].to_numpy())
+        if probabilities is not None:
+            self.observe_scores(probabilities)
+        self.rows += len(customers)
+        return self
+
+    def observe_scores(self, probabilities):
+        """Add predicted probabilities to the score histogram"""
+        bins = np.searchsorted(SCORE_BINS, np.asarray(probabilities, dtype=np.float64).ravel(), side='right') - 1
+        bins = np.clip(bins, 0, len(SCORE_BINS) - 2) # probability 1.0 goes in the last bin
+        self.score_counts += np.bincount(bins, minlength=len(SCORE_BINS) - 1)
+        return self
+
+    def merge(self, other):
+        for col in NUMERIC_COLS:
+            self.numeric[col].merge(other.numeric[col])
+        for col in CATEGORY_COLS:
+            self.category[col].merge(other.category[col])
+        self.score_counts += other.score_counts
+        self.rows += other.rows
+        return self
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: PSI / KS
+
+def psi(expected, actual):
+    """Population Stability Index between two proportion vectors"""
+    expected = np.clip(np.asarray(expected, dtype=np.float64), EPS, None)
+    actual = np.clip(np.asarray(actual, dtype=np.float64), EPS, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def status_for(psi_value, ks_value, live_rows):
+    """Traffic-light status used by the app tab and the CLI"""
+    if live_rows < MIN_LIVE_ROWS:
+        return "not enough data"
+    ks_value = 0.0 if ks_value is None or np.isnan(ks_value) else ks_value
+    if psi_value >= PSI_MAJOR or ks_value >= KS_MAJOR:
+        return "major"
+    if psi_value >= PSI_MODERATE or ks_value >= KS_MODERATE:
+        return "moderate"
+    return "stable"
+
+
+def numeric_drift(reference, live):
+    """PSI on reference deciles + KS from the two sketch cdfs"""
+    edges = np.unique(reference.quantile(np.linspace(0, 1, PSI_BINS + 1)[1:-1]))
+    ref_cdf = np.concatenate([[0.0], reference.cdf(edges), [1.0]])
+    live_cdf = np.concatenate([[0.0], live.cdf(edges), [1.0]])
+    psi_value = psi(np.diff(ref_cdf), np.diff(live_cdf))
+
+    # KS = biggest gap between the cdfs, checked at every value either sketch holds
+    points = np.unique(np.concatenate(reference.levels + live.levels))
+    ks_value = float(np.max(np.abs(reference.cdf(points) - live.cdf(points)))) if len(points) else np.nan
+    return psi_value, ks_value
+
+
+def category_drift(reference, live):
+    levels = sorted(set(reference.counts) | set(live.counts), key=str)
+    return psi(reference.proportions(levels), live.proportions(levels)), np.nan
+
+
+def score_drift(reference_counts, live_counts):
+    ref = reference_counts / max(reference_counts.sum(), 1)
+    cur = live_counts / max(live_counts.sum(), 1)
+    return psi(ref, cur), float(np.max(np.abs(np.cumsum(ref) - np.cumsum(cur))))
+
+
+def compare(reference, live):
+    """One row per monitored column: PSI, KS (numerics + scores), status"""
+    rows = []
+    for col in NUMERIC_COLS:
+        psi_value, ks_value = numeric_drift(reference.numeric[col], live.numeric[col])
+        rows.append({'column': col, 'type': 'numeric', 'psi': psi_value, 'ks': ks_value,
+                     'live_rows': live.numeric[col].count})
+    for col in CATEGORY_COLS:
+        psi_value, ks_value = category_drift(reference.category[col], live.category[col])
+        rows.append({'column': col, 'type': 'categorical', 'psi': psi_value, 'ks': ks_value,
+                     'live_rows': live.category[col].count})
+    psi_value, ks_value = score_drift(reference.score_counts, live.score_counts)
+    rows.append({'column': SCORE_COL, 'type': 'score', 'psi': psi_value, 'ks': ks_value,
+                 'live_rows': int(live.score_counts.sum())})
+
+    report = pd.DataFrame(rows)
+    report['status'] = [status_for(p, k, n) for p, k, n in zip(report['psi'], report['ks'], report['live_rows'])]
+    return report
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: SAVE / LOAD
+
+def load_monitor(path):
+    """Saved monitor, or None if the file does not exist yet"""
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return None
+
+
+def save_monitor(monitor, path):
+    """Temp file + rename so the app never reads a half-written state"""
+    tmp = path + ".tmp"
+    joblib.dump(monitor, tmp)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def state_lock(path=STATE_PATH):
+    """Exclusive lock on <state>.lock across processes (the app's recorder + every batch_score.py run),
+    held for a whole read-merge-write so no writer's observations get overwritten by another
+    (shadow_scoring.py takes the same lock on shadow_log.bin for its appends)"""
+    with open(path + ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1) # gives up after ~10s, so keep retrying
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def merge_into_state(monitor, path=STATE_PATH):
+    """Add a batch job's (or the app's) observations to the saved live window"""
+    with state_lock(path):
+        state = load_monitor(path) or DriftMonitor()
+        save_monitor(state.merge(monitor), path)
+
+
+def build_reference(train_customers, holdout_probabilities):
+    """Reference profile = the same sketches built on the training split. Scores come from the held-out split
+    since scores on rows the forest was trained on are overfit"""
+    return DriftMonitor().observe(train_customers).observe_scores(holdout_probabilities)
+
+
+class LiveDriftRecorder:
+    """Thread-safe recorder for the Streamlit app (shared by all sessions).
+    Predictions are added to an in-memory monitor and only written to disk every flush_every rows,
+    so the Predict tab does not pay for file I/O on every click"""
+
+    def __init__(self, state_path=STATE_PATH, flush_every=50):
+        self.state_path = state_path
+        self.flush_every = flush_every
+        self.pending = DriftMonitor()
+        self.lock = threading.Lock()
+
+    def record(self, customers, probabilities):
+        with self.lock:
+            self.pending.observe(customers, probabilities)
+            if self.pending.rows >= self.flush_every:
+                self._flush()
+
+    def _flush(self):
+        if self.pending.rows:
+            merge_into_state(self.pending, self.state_path)
+            self.pending = DriftMonitor()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def snapshot(self):
+        """Saved state + not-yet-flushed rows, without writing anything"""
+        with self.lock:
+            state = load_monitor(self.state_path) or DriftMonitor()
+            if self.pending.rows:
+                state.merge(copy.deepcopy(self.pending))
+            return state
+
+    def reset(self):
+        """Start a new live window"""
+        with self.lock:
+            self.pending = DriftMonitor()
+            with state_lock(self.state_path):
+                if os.path.exists(self.state_path):
+                    os.remove(self.state_path)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Input / score drift monitor")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build-reference", help="build the training reference profile")
+    build.add_argument("csv", nargs="?", default="bank-additional-full.csv", help="original dataset")
+    build.add_argument("--sep", default=";")
+    build.add_argument("--output", default=REFERENCE_PATH)
+
+    report = sub.add_parser("report", help="print live vs reference drift")
+    report.add_argument("--reference", default=REFERENCE_PATH)
+    report.add_argument("--state", default=STATE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build-reference":
+        from scoring import load_artifacts, load_dataset_split, load_thresholds, score_frame
+        model, scaler, feature_columns = load_artifacts()
+        emp_median, nr_median = load_thresholds()
+        X_train, X_test, _, _ = load_dataset_split(args.csv, args.sep)
+        probabilities, _ = score_frame(X_test, model, scaler, feature_columns, emp_median, nr_median)
+        reference = build_reference(X_train, probabilities)
+        save_monitor(reference, args.output)
+        print(f"Reference profile from {reference.rows:,} training rows -> {args.output}")
+    else:
+        reference = load_monitor(args.reference)
+        live = load_monitor(args.state)
+        if reference is None or live is None:
+            raise SystemExit("Need both a reference profile and a live state file")
+        with pd.option_context('display.width', 120):
+            print(compare(reference, live).round(4).to_string(index=False))
+
+
+if __name__ == "__main__":
+    # run through the imported module so pickles reference drift_monitor.DriftMonitor, not __main__.DriftMonitor
+    # (otherwise the app and batch_score.py could not load a reference built from the command line)
+    from drift_monitor import main as module_main
+    module_main()
+#---------------------------------------------------------------------------------------------------------
@@ -0,0 +1,114 @@
+"""
+DENSE VS SPARSE ENCODING BENCHMARK FOR BANKCONVERT AI
+
+1. Builds N synthetic customers from the saved artifacts (levels from feature_columns.pkl, numbers around the
+scaler's means) and encodes them both ways:
+   - dense: encode_features -> float64 (N, 60) matrix
+   - sparse: encode_features_sparse -> CSR with only the 10 scaled numbers + the kept one-hot 1.0s per row
+   reporting time, size of the finished matrix and peak memory while encoding (tracemalloc sees numpy buffers).
+
+2. Then times predict_proba of the live model (or --model) on both. Forests are expected to be slower on CSR
+(that is why accepts_sparse() keeps them dense), linear models faster.
+
+3. Run from the folder that has the .pkl files, e.g.
+    python encoding_benchmark.py --rows 1000000
+    python encoding_benchmark.py --rows 1000000 --model logistic_regression.pkl
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from scoring import (RAW_COLUMNS, encode_features, encode_features_sparse, engineer_features, load_artifacts,
+                     load_thresholds, one_hot_levels)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: SYNTHETIC CUSTOMERS
+
+def synthetic_customers(n_rows, feature_columns, scaler, seed=0):
+    """Raw rows with the training levels and roughly the training number ranges"""
+    rng = np.random.default_rng(seed)
+    numerical_cols = list(scaler.feature_names_in_)
+    levels = one_hot_levels(feature_columns, numerical_cols)
+    stats = dict(zip(numerical_cols, zip(scaler.mean_, scaler.scale_)))
+    customers = {}
+    for col in RAW_COLUMNS:
+        if col in levels:
+            names = list(levels[col][0]) + ["(first level)"] # the drop_first level, encoded as all zeros
+            customers[col] = rng.choice(names, n_rows)
+        elif col == 'pdays':
+            customers[col] = np.where(rng.random(n_rows) < 0.96, 999, rng.integers(0, 27, n_rows))
+        else:
+            mean, scale = stats[col]
+            customers[col] = rng.normal(mean, scale, n_rows)
+    customers['age'] = np.clip(customers['age'], 17, 98).round()
+    return pd.DataFrame(customers)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: MEASURE
+
+def measure(action):
+    """(result, seconds, peak MB allocated during the call).
+    Timed untraced first, since tracemalloc slows every Python allocation down a lot"""
+    start = time.perf_counter()
+    action()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    result = action()
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def matrix_mb(X):
+    if hasattr(X, 'indptr'):
+        return (X.data.nbytes + X.indices.nbytes + X.indptr.nbytes) / 1e6
+    return X.nbytes / 1e6
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare dense and CSR feature matrices")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--predict-rows", type=int, default=200000, help="rows used for the predict timing")
+    parser.add_argument("--model", default=None, help="other fitted model .pkl (default: live best_model.pkl)")
+    args = parser.parse_args(argv)
+
+    model, scaler, feature_columns = load_artifacts()
+    if args.model:
+        model = joblib.load(args.model)
+    emp_median, nr_median = load_thresholds()
+    df = engineer_features(synthetic_customers(args.rows, feature_columns, scaler), emp_median, nr_median)
+
+    dense, dense_s, dense_peak = measure(lambda: encode_features(df, feature_columns, scaler))
+    csr, sparse_s, sparse_peak = measure(lambda: encode_features_sparse(df, feature_columns, scaler))
+    if not np.array_equal(csr[:1000].toarray(), dense[:1000]):
+        raise SystemExit("Sparse and dense encodings differ")
+
+    print(f"{args.rows:,} rows x {len(feature_columns)} columns, {csr.nnz / args.rows:.1f} stored values per row")
+    print(f"{'':<8}{'encode s':>10}{'matrix MB':>11}{'peak MB':>9}")
+    print(f"{'dense':<8}{dense_s:>10.2f}{matrix_mb(dense):>11.0f}{dense_peak:>9.0f}")
+    print(f"{'sparse':<8}{sparse_s:>10.2f}{matrix_mb(csr):>11.0f}{sparse_peak:>9.0f}")
+
+    n = min(args.predict_rows, args.rows)
+    start = time.perf_counter()
+    p_dense = model.predict_proba(dense[:n])[:, 1]
+    predict_dense = time.perf_counter() - start
+    start = time.perf_counter()
+    p_sparse = model.predict_proba(csr[:n])[:, 1]
+    predict_sparse = time.perf_counter() - start
+    print(f"{type(model).__name__} predict_proba on {n:,} rows: dense {predict_dense:.2f}s, "
+          f"sparse {predict_sparse:.2f}s (max difference {np.abs(p_dense - p_sparse).max():.1e})")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
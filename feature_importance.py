@@ -0,0 +1,188 @@
+"""
+GROUPED PERMUTATION IMPORTANCE FOR BANKCONVERT AI
+
+1. Why: the Performance tab's "Top Predictive Features" were typed in by hand from the notebook, so they go stale
+as soon as retrain.py swaps in a new forest.
+
+2. How:
+   - importance of a field = how much the held-out ROC AUC drops when that field is shuffled between customers.
+     A categorical field is shuffled as ONE unit: all its one-hot columns move together with the same row
+     permutation (shuffling job_admin. alone would create customers with two jobs or none)
+   - the held-out 30% split is encoded ONCE and saved as .npy; the live model is exported the same way as
+     batch_score.py (forest arrays). Every worker of the process pool memory-maps both, so nothing is pickled
+     per task and all workers share the same pages
+   - one task = (field, repeat): copy the matrix, permute the field's columns, predict, score. All fields x
+     repeats run in parallel
+   - saved as feature_importance.pkl in the live model's folder (the version folder with a registry), with the
+     sha256 of the model file, so the app only shows numbers that belong to the model it is serving
+
+Usage:
+    python feature_importance.py bank-additional-full.csv --repeats 5 --workers 8
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import average_precision_score, roc_auc_score
+
+from batch_score import export_shared_model, file_fingerprint, load_shared_model
+from model_registry import LOCAL_VERSION, read_pointer, resolve_artifact
+from scoring import (MODEL_PATH, load_artifacts, load_dataset_split, load_thresholds, one_hot_levels,
+                     preprocess_batch)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+IMPORTANCE_PATH = "feature_importance.pkl"
+DEFAULT_REPEATS = 5
+METRICS = {'roc_auc': roc_auc_score, 'average_precision': average_precision_score}
+
+# how the Performance tab groups the fields
+ENGINEERED_FIELDS = ['age_group', 'contacted_before', 'prev_success', 'economic_condition', 'contact_recency']
+ECONOMIC_FIELDS = ['emp.var.rate', 'cons.price.idx', 'cons.conf.idx', 'euribor3m', 'nr.employed']
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: FIELD GROUPS
+
+def field_groups(feature_columns, numerical_cols):
+    """{original field: its column positions in the model matrix}, one-hot levels grouped under their field"""
+    groups = {cat: positions for cat, (_, positions) in one_hot_levels(feature_columns, numerical_cols).items()}
+    grouped = {int(i) for positions in groups.values() for i in positions}
+    for i, col in enumerate(feature_columns):
+        if i not in grouped:
+            groups[col] = np.array([i], dtype=np.int32) # scaled numbers + 0/1 flags
+    return groups
+
+
+def field_kind(field):
+    if field in ENGINEERED_FIELDS:
+        return "engineered"
+    return "economic" if field in ECONOMIC_FIELDS else "customer"
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: POOL WORKERS
+
+_worker = {}
+
+
+def init_worker(data_dir, model_dir, metric):
+    """Runs once per worker: memory-map the holdout + the exported model"""
+    _worker['X'] = np.load(os.path.join(data_dir, "X.npy"), mmap_mode='r')
+    _worker['y'] = np.load(os.path.join(data_dir, "y.npy"))
+    _, _, _worker['predict'] = load_shared_model(model_dir)
+    _worker['metric'] = METRICS[metric]
+
+
+def permuted_score(field, columns, seed):
+    """Metric with one field's columns shuffled together (same permutation for every column of the field)"""
+    X = np.array(_worker['X']) # private copy, the mapped pages stay shared
+    rows = np.random.default_rng(seed).permutation(len(X))
+    X[:, columns] = X[np.ix_(rows, columns)]
+    return field, _worker['metric'](_worker['y'], _worker['predict'](X))
+
+
+def baseline_score():
+    return _worker['metric'](_worker['y'], _worker['predict'](np.asarray(_worker['X'])))
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: IMPORTANCE
+
+def compute_importance(X, y, groups, model_dir, repeats=DEFAULT_REPEATS, workers=None, metric='roc_auc', seed=0):
+    """(baseline metric, DataFrame field / kind / importance / std / share) with all (field, repeat) tasks in
+    one process pool"""
+    data_dir = tempfile.mkdtemp(prefix="importance-")
+    try:
+        np.save(os.path.join(data_dir, "X.npy"), np.ascontiguousarray(X, dtype=np.float64))
+        np.save(os.path.join(data_dir, "y.npy"), np.asarray(y, dtype=np.int8))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(data_dir, model_dir, metric)) as pool:
+            baseline = pool.submit(baseline_score)
+            tasks = [pool.submit(permuted_score, field, columns, seed + 1000 * r + i)
+                     for i, (field, columns) in enumerate(groups.items()) for r in range(repeats)]
+            baseline = baseline.result()
+            scores = pd.DataFrame([task.result() for task in tasks], columns=['field', 'score'])
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    drops = (baseline - scores['score']).groupby(scores['field'], sort=False)
+    table = pd.DataFrame({'importance': drops.mean(), 'std': drops.std(ddof=0)}).reset_index(names='field')
+    table.insert(1, 'kind', table['field'].map(field_kind))
+    # share of the total drop, negative drops (= noise, shuffling did not hurt) count as 0
+    positive = table['importance'].clip(lower=0)
+    table['share'] = positive / max(positive.sum(), 1e-12)
+    return baseline, table.sort_values('importance', ascending=False, ignore_index=True)
+
+
+def save_importance(result, path=IMPORTANCE_PATH):
+    tmp = path + ".tmp"
+    joblib.dump(result, tmp)
+    os.replace(tmp, path)
+
+
+def load_importance(path=IMPORTANCE_PATH):
+    """Saved result, or None if feature_importance.py has not been run for this model"""
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return None
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grouped permutation importance of the live model on the holdout")
+    parser.add_argument("csv", nargs="?", default="bank-additional-full.csv", help="original dataset")
+    parser.add_argument("--sep", default=";")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="shuffles per field")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all CPUs)")
+    parser.add_argument("--metric", default="roc_auc", choices=sorted(METRICS))
+    parser.add_argument("--output", default=None, help="default: feature_importance.pkl next to the live model")
+    args = parser.parse_args(argv)
+
+    model_path = resolve_artifact(MODEL_PATH)
+    output = args.output or os.path.join(os.path.dirname(model_path), IMPORTANCE_PATH)
+    _, scaler, feature_columns = load_artifacts()
+    emp_median, nr_median = load_thresholds()
+    _, X_test, _, y_test = load_dataset_split(args.csv, args.sep)
+    X = preprocess_batch(X_test, feature_columns, scaler, emp_median, nr_median)
+    groups = field_groups(feature_columns, list(scaler.feature_names_in_))
+
+    start = time.perf_counter()
+    model_dir = tempfile.mkdtemp(prefix="importance-model-")
+    try:
+        export_shared_model(model_dir)
+        baseline, table = compute_importance(X, y_test, groups, model_dir, args.repeats, args.workers, args.metric)
+    finally:
+        shutil.rmtree(model_dir, ignore_errors=True)
+    seconds = time.perf_counter() - start
+
+    save_importance({
+        'model_version': read_pointer() or LOCAL_VERSION,
+        'model_sha256': file_fingerprint(model_path),
+        'metric': args.metric,
+        'baseline': baseline,
+        'rows': len(y_test),
+        'repeats': args.repeats,
+        'table': table,
+        'built': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'seconds': seconds,
+    }, output)
+    print(f"{len(groups)} fields x {args.repeats} repeats on {len(y_test):,} held-out rows in {seconds:.1f}s "
+          f"(baseline {args.metric} {baseline:.4f})")
+    print(table.head(15).assign(share=(table['share'] * 100).round(1)).round(4).to_string(index=False))
+    print(f"Saved -> {output}")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
@@ -0,0 +1,283 @@
+"""
+CALL-OUTCOME FEEDBACK LOG FOR BANKCONVERT AI
+
+1. Why: every number in the Performance tab comes from the 2008-2010 holdout. Once RMs call down the ranked list,
+the real outcomes are the only way to see live precision / recall, and they are next month's training data.
+
+2. How:
+   - append: each batch of outcomes (customer id, score, model version, outcome, time) becomes its own small
+     Parquet file in feedback/segments/ (temp file + rename). Writers never touch an existing file, so the app,
+     a CRM import and the compaction job can all run at once without locks
+   - compact: merges all settled segments into feedback/outcomes/ partitioned by model_version and date
+     (hive layout, readable with pd.read_parquet), folds them into the running counters and only then deletes them
+   - counters (feedback/metrics.pkl): TN / FP / FN / TP per (model version, date) at the 0.5 cut of model.predict.
+     Each row is counted exactly once, when it is compacted, so a dashboard reads the counters + the few segments
+     written since the last compaction, never the history
+   - crash safety: segments are compacted in name order and metrics.pkl records the last one folded in. Partition
+     files are named after that batch, so files from a crashed run (batch newer than metrics.pkl) are removed and
+     segments already folded in are just deleted on the next run
+   - outcomes only exist for customers an RM chose to call, mostly high scores, so live recall is "share of the
+     called subscribers the model flagged", not recall over the whole book
+   - export: latest outcome per customer joined with the customer book -> a labelled CSV in the
+     bank-additional-full.csv format for retrain.py
+
+Usage:
+    python feedback_log.py add 12345 yes --probability 0.71 --model-version v0003
+    python feedback_log.py compact
+    python feedback_log.py report
+    python feedback_log.py export customers.csv --output campaign-2026-10.csv
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import itertools
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from scoring import RAW_COLUMNS
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+FEEDBACK_DIR = "feedback"
+SEGMENTS = "segments"
+OUTCOMES = "outcomes"
+METRICS_PATH = "metrics.pkl"
+DECISION = 0.5 # same cut as model.predict
+SETTLE_SECONDS = 60 # younger segments are left for the next compaction (a writer may still be renaming an older one)
+COUNT_COLUMNS = ['tn', 'fp', 'fn', 'tp'] # outcome code = 2 * outcome + flagged
+
+SCHEMA = pa.schema([('customer_id', pa.string()), ('probability', pa.float32()), ('model_version', pa.string()),
+                    ('outcome', pa.int8()), ('time', pa.float64())])
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: COUNTERS
+
+def outcome_counts(frame, decision=DECISION):
+    """Outcome rows -> TN / FP / FN / TP per (model_version, date) in one groupby"""
+    code = 2 * frame['outcome'].to_numpy(dtype=np.int8) + (frame['probability'].to_numpy() > decision)
+    keys = pd.DataFrame({'model_version': frame['model_version'].to_numpy(),
+                         'date': pd.to_datetime(frame['time'], unit='s').dt.strftime("%Y-%m-%d").to_numpy(),
+                         'code': code})
+    counts = keys.groupby(['model_version', 'date', 'code']).size().unstack('code', fill_value=0)
+    counts = counts.reindex(columns=range(4), fill_value=0)
+    counts.columns = COUNT_COLUMNS
+    return counts
+
+
+def add_counts(total, counts):
+    if total is None or total.empty:
+        return counts
+    return total.add(counts, fill_value=0).astype(np.int64)
+
+
+def online_metrics(counts):
+    """Per model version: outcomes, subscribers, live precision / recall / conversion rate"""
+    if counts is None or counts.empty:
+        return pd.DataFrame()
+    per_version = counts.groupby(level='model_version').sum()
+    tp, fp, fn = per_version['tp'], per_version['fp'], per_version['fn']
+    outcomes = per_version.sum(axis=1)
+    return pd.DataFrame({
+        'outcomes': outcomes,
+        'subscribers': tp + fn,
+        'conversion_rate': (tp + fn) / outcomes,
+        'precision': tp / (tp + fp).where(tp + fp > 0),
+        'recall': tp / (tp + fn).where(tp + fn > 0),
+    }).reset_index()
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: LOG
+
+_sequence = itertools.count()
+
+
+class FeedbackLog:
+    """Append-only segments + partitioned outcomes + running counters under one folder"""
+
+    def __init__(self, root=FEEDBACK_DIR):
+        self.root = root
+        self.segments_dir = os.path.join(root, SEGMENTS)
+        self.outcomes_dir = os.path.join(root, OUTCOMES)
+        self.metrics_path = os.path.join(root, METRICS_PATH)
+        self.compact_lock = threading.Lock()
+
+    def append(self, customer_ids, probabilities, model_version, outcomes, times=None):
+        """One new segment file per call, nothing existing is ever rewritten"""
+        n = len(customer_ids)
+        table = pa.Table.from_pydict({
+            'customer_id': [str(c) for c in customer_ids],
+            'probability': np.asarray(probabilities, dtype=np.float32),
+            'model_version': np.broadcast_to(np.asarray(model_version, dtype=object), n).tolist(),
+            'outcome': np.asarray(outcomes, dtype=np.int8),
+            'time': np.full(n, time.time()) if times is None else np.asarray(times, dtype=np.float64),
+        }, schema=SCHEMA)
+        os.makedirs(self.segments_dir, exist_ok=True)
+        # time first so names sort in write order, pid + counter keep concurrent writers apart
+        name = f"{time.time_ns():020d}-{os.getpid()}-{next(_sequence):06d}.parquet"
+        path = os.path.join(self.segments_dir, name)
+        pq.write_table(table, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        return n
+
+    def load_state(self):
+        try:
+            return joblib.load(self.metrics_path)
+        except FileNotFoundError:
+            return {'compacted_through': "", 'counts': None, 'rows': 0, 'updated': None}
+
+    def segment_names(self):
+        try:
+            return sorted(name for name in os.listdir(self.segments_dir) if name.endswith(".parquet"))
+        except FileNotFoundError:
+            return []
+
+    def pending(self, state=None):
+        """Segments written since the last compaction"""
+        state = state or self.load_state()
+        return [name for name in self.segment_names() if name > state['compacted_through']]
+
+    def read_segments(self, names):
+        if not names:
+            return SCHEMA.empty_table().to_pandas()
+        return pa.concat_tables([pq.read_table(os.path.join(self.segments_dir, name), schema=SCHEMA)
+                                 for name in names]).to_pandas()
+
+    def signature(self):
+        """Changes whenever anything was appended or compacted (for the app's cache key)"""
+        try:
+            mtime = os.stat(self.metrics_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = 0
+        return mtime, tuple(self.segment_names())
+
+    def counts(self):
+        """Counters of every outcome so far = saved counters + pending segments only"""
+        state = self.load_state()
+        pending = self.read_segments(self.pending(state))
+        return add_counts(state['counts'], outcome_counts(pending)) if len(pending) else state['counts']
+
+    def compact(self, settle_seconds=SETTLE_SECONDS):
+        """Settled segments -> partitioned Parquet + counters, then delete them -> rows compacted"""
+        with self.compact_lock:
+            state = self.load_state()
+            done = state['compacted_through']
+            self._remove_orphans(done)
+            for name in self.segment_names():
+                if name <= done: # folded in by a run that crashed before deleting them
+                    os.remove(os.path.join(self.segments_dir, name))
+
+            settled = f"{time.time_ns() - int(settle_seconds * 1e9):020d}"
+            names = [name for name in self.segment_names() if name < settled]
+            if not names:
+                return 0
+            frame = self.read_segments(names)
+            batch = names[-1].removesuffix(".parquet")
+            frame['date'] = pd.to_datetime(frame['time'], unit='s').dt.strftime("%Y-%m-%d")
+            pq.write_to_dataset(pa.Table.from_pandas(frame, preserve_index=False), self.outcomes_dir,
+                                partition_cols=['model_version', 'date'],
+                                basename_template=f"part-{batch}-{{i}}.parquet")
+
+            state = {'compacted_through': names[-1], 'counts': add_counts(state['counts'], outcome_counts(frame)),
+                     'rows': state['rows'] + len(frame), 'updated': time.time()}
+            tmp = self.metrics_path + ".tmp"
+            joblib.dump(state, tmp)
+            os.replace(tmp, self.metrics_path) # the commit point
+            for name in names:
+                os.remove(os.path.join(self.segments_dir, name))
+            return len(frame)
+
+    def _remove_orphans(self, done):
+        """Partition files from a compaction that crashed before saving the counters"""
+        done_batch = done.removesuffix(".parquet")
+        for folder, _, files in os.walk(self.outcomes_dir):
+            for name in files:
+                if name.startswith("part-") and name[5:].rsplit("-", 1)[0] > done_batch:
+                    os.remove(os.path.join(folder, name))
+
+    def history(self):
+        """Every compacted outcome (for exports / training sets, not for dashboards)"""
+        if not os.path.isdir(self.outcomes_dir):
+            return SCHEMA.empty_table().to_pandas()
+        return pd.read_parquet(self.outcomes_dir)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: TRAINING SET EXPORT
+
+def export_training_set(log, book_path, output, id_col="customer_id", sep=",", output_sep=";"):
+    """Latest outcome per customer + their book row -> labelled CSV that retrain.py reads"""
+    outcomes = pd.concat([log.history(), log.read_segments(log.pending())], ignore_index=True)
+    latest = outcomes.sort_values('time').drop_duplicates('customer_id', keep='last')
+    book = pd.read_csv(book_path, sep=sep, dtype={id_col: str})
+    labelled = book.merge(latest[['customer_id', 'outcome']], left_on=id_col, right_on='customer_id')
+    labelled['y'] = np.where(labelled['outcome'] == 1, "yes", "no")
+    labelled[[c for c in RAW_COLUMNS if c in labelled] + ['y']].to_csv(output, sep=output_sep, index=False)
+    return len(labelled), len(latest)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Call-outcome feedback log")
+    parser.add_argument("--root", default=FEEDBACK_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("add", help="log one call outcome")
+    p.add_argument("customer_id")
+    p.add_argument("outcome", choices=["yes", "no"])
+    p.add_argument("--probability", type=float, required=True, help="score the RM saw")
+    p.add_argument("--model-version", required=True)
+
+    p = sub.add_parser("import", help="log a CSV of outcomes (customer_id, probability, model_version, outcome)")
+    p.add_argument("csv")
+
+    p = sub.add_parser("compact", help="merge segments into partitioned Parquet + update the counters")
+    p.add_argument("--settle-seconds", type=float, default=SETTLE_SECONDS)
+
+    sub.add_parser("report", help="live precision / recall per model version")
+
+    p = sub.add_parser("export", help="labelled training CSV for retrain.py")
+    p.add_argument("book", help="customer CSV with the model inputs")
+    p.add_argument("--id-col", default="customer_id")
+    p.add_argument("--sep", default=",")
+    p.add_argument("--output", required=True)
+
+    args = parser.parse_args(argv)
+    log = FeedbackLog(args.root)
+    if args.command == "add":
+        log.append([args.customer_id], [args.probability], args.model_version, [int(args.outcome == "yes")])
+        print(f"Logged {args.customer_id}: {args.outcome}")
+    elif args.command == "import":
+        frame = pd.read_csv(args.csv, dtype={'customer_id': str})
+        outcome = frame['outcome'].replace({'yes': 1, 'no': 0}).astype(int)
+        for version, rows in frame.assign(outcome=outcome).groupby('model_version'):
+            log.append(rows['customer_id'], rows['probability'], version, rows['outcome'])
+        print(f"Logged {len(frame):,} outcomes -> {log.segments_dir}")
+    elif args.command == "compact":
+        start = time.perf_counter()
+        rows = log.compact(args.settle_seconds)
+        print(f"Compacted {rows:,} outcomes in {time.perf_counter() - start:.2f}s -> {log.outcomes_dir} "
+              f"({len(log.segment_names())} segments left)")
+    elif args.command == "report":
+        metrics = online_metrics(log.counts())
+        if metrics.empty:
+            raise SystemExit("No outcomes logged yet")
+        print(metrics.round(3).to_string(index=False))
+    else:
+        rows, customers = export_training_set(log, args.book, args.output, args.id_col, args.sep)
+        print(f"{rows:,} of {customers:,} customers with an outcome found in {args.book} -> {args.output} "
+              f"(python retrain.py {args.output})")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
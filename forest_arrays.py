@@ -0,0 +1,208 @@
+"""
+FLAT ARRAY FORM OF THE RANDOM FOREST FOR BANKCONVERT AI
+
+1. best_model.pkl is a pickled sklearn RandomForestClassifier. Unpickling it in every worker process makes a private
+copy of every tree (sklearn copies the node arrays into its own buffers), so N workers = N copies of the forest.
+
+2. Instead, the trees are exported ONCE into a few flat .npy arrays (all trees concatenated) that each process opens
+with np.load(mmap_mode='r'). The OS then shares the same pages between all workers, and the forest is evaluated
+with plain numpy, giving the same probabilities as model.predict_proba.
+
+3. Early exit (forest_predict_early_exit): trees are evaluated in batches and a row stops as soon as the running vote
+is far enough from the serving threshold that the full forest's label cannot flip (Hoeffding-Serfling bound).
+Rows near the threshold, and rows that could be in the top K, still get the exact probability.
+
+4. Every evaluation also returns the spread (std) of the per-tree votes from the same pass, as a per-customer
+uncertainty (see uncertainty.py for the calibrated intervals built on it).
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import json
+import os
+
+import numpy as np
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+FOREST_ARRAYS = ['left', 'right', 'feature', 'threshold', 'leaf_p1', 'roots']
+FOREST_META = "forest.json"
+
+# rows evaluated at a time, keeps the (rows x trees) node index arrays small
+DEFAULT_BLOCK_ROWS = 8192
+
+DEFAULT_TREE_BATCH = 10 # trees per early-exit step
+DEFAULT_DELTA = 0.01 # allowed chance that an early-exited row's label differs from the full forest
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: EXPORT + LOAD
+
+def is_tree_model(model):
+    """Random Forest / Decision Tree with classes [0, 1] can be exported"""
+    trees = getattr(model, 'estimators_', None)
+    if trees is None and hasattr(model, 'tree_'):
+        trees = [model]
+    return trees is not None and all(hasattr(t, 'tree_') for t in trees) and list(model.classes_) == [0, 1]
+
+
+def export_forest(model, out_dir):
+    """Writes all trees of the model as flat .npy arrays into out_dir"""
+    trees = model.estimators_ if hasattr(model, 'estimators_') else [model]
+    os.makedirs(out_dir, exist_ok=True)
+
+    parts = {name: [] for name in FOREST_ARRAYS}
+    offset = 0
+    for tree in trees:
+        t = tree.tree_
+        is_leaf = t.children_left == -1
+        # child indices shifted by the tree's offset, leaves keep -1
+        parts['left'].append(np.where(is_leaf, -1, t.children_left + offset))
+        parts['right'].append(np.where(is_leaf, -1, t.children_right + offset))
+        parts['feature'].append(np.where(is_leaf, 0, t.feature)) # 0 so that leaves can still index X safely
+        parts['threshold'].append(t.threshold)
+        # leaf probabilities (normalise since older sklearn stores counts instead of fractions)
+        value = t.value[:, 0, :]
+        parts['leaf_p1'].append(value[:, 1] / value.sum(axis=1))
+        parts['roots'].append(np.array([offset]))
+        offset += t.node_count
+
+    dtypes = {'left': np.int64, 'right': np.int64, 'feature': np.int64, 'threshold': np.float64,
+              'leaf_p1': np.float64, 'roots': np.int64}
+    for name in FOREST_ARRAYS:
+        np.save(os.path.join(out_dir, name + ".npy"), np.concatenate(parts[name]).astype(dtypes[name]))
+
+    meta = {
+        'n_trees': len(trees),
+        'max_depth': int(max(tree.tree_.max_depth for tree in trees)),
+        'n_features': int(trees[0].tree_.n_features),
+    }
+    with open(os.path.join(out_dir, FOREST_META), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def load_forest(forest_dir, mmap_mode='r'):
+    """Opens the exported arrays, memory-mapped by default so processes share them"""
+    with open(os.path.join(forest_dir, FOREST_META)) as f:
+        forest = json.load(f)
+    for name in FOREST_ARRAYS:
+        forest[name] = np.load(os.path.join(forest_dir, name + ".npy"), mmap_mode=mmap_mode)
+    return forest
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: EVALUATION
+
+def forest_leaves(forest, X, trees=None):
+    """Leaf node index reached by every row in every tree -> (rows x trees).
+    trees = optional subset of tree positions (e.g. a batch of trees)"""
+    # sklearn trees compare float32 features, so do the same to get identical splits
+    X = np.asarray(X, dtype=np.float32)
+    roots = np.asarray(forest['roots'])
+    if trees is not None:
+        roots = roots[trees]
+    left, right = forest['left'], forest['right']
+    feature, threshold = forest['feature'], forest['threshold']
+
+    nodes = np.broadcast_to(roots, (len(X), len(roots))).copy()
+    for _ in range(forest['max_depth']):
+        is_leaf = left[nodes] == -1
+        if is_leaf.all():
+            break
+        values = np.take_along_axis(X, feature[nodes], axis=1)
+        go_left = values <= threshold[nodes]
+        nodes = np.where(is_leaf, nodes, np.where(go_left, left[nodes], right[nodes]))
+    return nodes
+
+
+def forest_tree_probabilities(forest, X, trees=None, block_rows=DEFAULT_BLOCK_ROWS):
+    """P(class 1) from each tree separately -> (rows x trees)"""
+    n_trees = forest['n_trees'] if trees is None else len(trees)
+    out = np.empty((len(X), n_trees), dtype=np.float64)
+    for start in range(0, len(X), block_rows):
+        block = slice(start, start + block_rows)
+        out[block] = forest['leaf_p1'][forest_leaves(forest, X[block], trees)]
+    return out
+
+
+def forest_predict_proba(forest, X, block_rows=DEFAULT_BLOCK_ROWS):
+    """P(class 1) of the whole forest = average over trees (same as RandomForestClassifier.predict_proba)"""
+    return forest_tree_probabilities(forest, X, block_rows=block_rows).mean(axis=1)
+
+
+def forest_predict_spread(forest, X, block_rows=DEFAULT_BLOCK_ROWS):
+    """(probability, spread): forest average + std of the per-tree votes, both from ONE traversal.
+    Done per block so the full (rows x trees) matrix never exists for big inputs"""
+    probability = np.empty(len(X))
+    spread = np.empty(len(X))
+    for start in range(0, len(X), block_rows):
+        block = slice(start, start + block_rows)
+        votes = forest['leaf_p1'][forest_leaves(forest, X[block])]
+        probability[block] = votes.mean(axis=1)
+        spread[block] = votes.std(axis=1)
+    return probability, spread
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: EARLY EXIT
+
+def hoeffding_radius(n, n_trees, delta):
+    """Half-width of the (1 - delta) interval around the mean of n trees out of n_trees, for per-tree probabilities
+    in [0, 1]. Trees are drawn WITHOUT replacement, so Serfling's (1 - (n-1)/N) factor shrinks it towards 0 as
+    n approaches the whole forest"""
+    n = np.asarray(n, dtype=np.float64)
+    return np.sqrt((1 - (n - 1) / n_trees) * np.log(2 / delta) / (2 * n))
+
+
+def forest_predict_early_exit(forest, X, threshold=0.5, tree_batch=DEFAULT_TREE_BATCH, delta=DEFAULT_DELTA, top_k=0,
+                              exact_spread=None, seed=0, block_rows=DEFAULT_BLOCK_ROWS):
+    """Anytime forest: returns (probability, spread, exact, trees_used) per row.
+    - after every tree_batch trees, rows whose running mean is more than hoeffding_radius away from threshold stop
+      (their label matches the full forest with probability >= 1 - delta, delta is split over all checks)
+    - stopped rows keep the running mean as probability (exact=False), the rest get the full-forest value
+    - top_k > 0: stopped rows whose interval could still reach the top_k are finished too, so the top_k are exact
+    - exact_spread: stopped rows whose trees disagree at least this much (vote std) are finished too"""
+    X = np.asarray(X, dtype=np.float32)
+    n_trees = forest['n_trees']
+    # warm-started forests keep the newest month's trees at the end, so batches are a random sample of all trees
+    order = np.random.default_rng(seed).permutation(n_trees)
+    steps = list(range(tree_batch, n_trees, tree_batch)) + [n_trees]
+    delta_step = delta / max(len(steps) - 1, 1)
+
+    total = np.zeros(len(X))
+    total_sq = np.zeros(len(X)) # for the vote spread
+    used = np.zeros(len(X), dtype=np.int64)
+    active = np.arange(len(X))
+    done = 0
+    for stop in steps:
+        if not len(active):
+            break
+        votes = forest_tree_probabilities(forest, X[active], order[done:stop], block_rows)
+        total[active] += votes.sum(axis=1)
+        total_sq[active] += (votes ** 2).sum(axis=1)
+        used[active] = done = stop
+        if stop < n_trees:
+            far = np.abs(total[active] / stop - threshold) > hoeffding_radius(stop, n_trees, delta_step)
+            active = active[~far]
+
+    refine = np.zeros(len(X), dtype=bool)
+    mean = total / np.maximum(used, 1)
+    if top_k and len(X):
+        # finish every stopped row whose upper bound reaches the k-th best lower bound
+        radius = np.where(used == n_trees, 0.0, hoeffding_radius(used, n_trees, delta_step))
+        k = min(top_k, len(X))
+        refine |= mean + radius >= np.partition(mean - radius, -k)[-k]
+    if exact_spread is not None:
+        refine |= np.sqrt(np.maximum(total_sq / np.maximum(used, 1) - mean ** 2, 0)) >= exact_spread
+    refine = np.flatnonzero(refine & (used < n_trees))
+    for n_used in np.unique(used[refine]): # rows that stopped together share the same remaining trees
+        rows = refine[used[refine] == n_used]
+        votes = forest_tree_probabilities(forest, X[rows], order[n_used:], block_rows)
+        total[rows] += votes.sum(axis=1)
+        total_sq[rows] += (votes ** 2).sum(axis=1)
+        used[rows] = n_trees
+
+    probability = total / used
+    spread = np.sqrt(np.maximum(total_sq / used - probability ** 2, 0)) # clip float noise below 0
+    return probability, spread, used == n_trees, used
+#---------------------------------------------------------------------------------------------------------
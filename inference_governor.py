@@ -0,0 +1,245 @@
+"""
+INFERENCE CONCURRENCY GOVERNOR FOR BANKCONVERT AI
+
+1. Why: @st.cache_resource shares one model between every browser session and each session predicts on its own
+script thread. The forest is trained with n_jobs=-1, so 8 RMs clicking at once = 8 x all-cores joblib threads
+(+ BLAS threads) fighting over the same CPUs, and the slowest request takes many times longer than it should.
+
+2. How:
+   - ONE bounded pool of inference threads per server process (INFERENCE_WORKERS, default up to 4), every model
+     call from the app goes through it, so at most that many predictions run at the same time
+   - inside a call nothing fans out again: the shared model is pinned to n_jobs=1 and BLAS / OpenMP pools are
+     capped with threadpoolctl (INFERENCE_BLAS_THREADS, default 1) -> CPU used <= workers x blas threads
+   - two queues: INTERACTIVE (single-row Predict tab) always goes first. BATCH work (list uploads, shadow
+     scoring) is cut into chunks of BATCH_CHUNK_ROWS, so an RM waits at most one chunk, and batch may use
+     every worker but one, which is kept free for interactive requests
+   - stats(): queue depth now / max, running, and p50 / p95 wait + service time per queue over the last 1000
+     calls -> shown in the Drift tab for sizing containers (queue waits growing = add CPUs or workers)
+
+Env (read once at start-up):
+    INFERENCE_WORKERS=4 INFERENCE_BLAS_THREADS=1 streamlit run streamlit_app.py
+
+Usage (load test: concurrent single-row requests while a batch runs, with and without the governor):
+    python inference_governor.py --sessions 8 --requests 40 --batch-rows 100000
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from threadpoolctl import threadpool_limits
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+INTERACTIVE, BATCH = 0, 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+DEFAULT_WORKERS = int(os.environ.get("INFERENCE_WORKERS", min(4, os.cpu_count() or 1)))
+DEFAULT_BLAS_THREADS = int(os.environ.get("INFERENCE_BLAS_THREADS", 1))
+BATCH_CHUNK_ROWS = 2000 # longest an interactive request waits behind batch work (when every worker is busy)
+TIMING_WINDOW = 1000 # calls kept per queue for the percentiles
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: GOVERNOR
+
+def pin_model(model, n_jobs=1):
+    """Stop the model fanning out its own joblib threads (the governor decides the parallelism)"""
+    if 'n_jobs' in model.get_params(deep=False) and model.n_jobs != n_jobs:
+        model.set_params(n_jobs=n_jobs)
+    return model
+
+
+def take_rows(X, rows):
+    return X.iloc[rows] if isinstance(X, pd.DataFrame) else X[rows]
+
+
+class InferenceGovernor:
+    """Fixed pool of inference threads, interactive calls first, batch calls chunked"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, blas_threads=DEFAULT_BLAS_THREADS, chunk_rows=BATCH_CHUNK_ROWS):
+        self.workers = max(workers, 1)
+        self.blas_threads = blas_threads
+        self.chunk_rows = chunk_rows
+        self.batch_slots = max(self.workers - 1, 1) # one worker stays free for interactive requests
+        # process-wide cap on BLAS / OpenMP pools (kept for the life of the process)
+        self._limits = threadpool_limits(limits=blas_threads)
+        self._queues = {INTERACTIVE: deque(), BATCH: deque()}
+        self._cond = threading.Condition()
+        self._running = {INTERACTIVE: 0, BATCH: 0}
+        self._max_depth = {INTERACTIVE: 0, BATCH: 0}
+        self._completed = {INTERACTIVE: 0, BATCH: 0}
+        self._waits = {p: deque(maxlen=TIMING_WINDOW) for p in self._queues}
+        self._services = {p: deque(maxlen=TIMING_WINDOW) for p in self._queues}
+        for i in range(self.workers):
+            threading.Thread(target=self._work, name=f"inference-{i}", daemon=True).start()
+
+    def submit(self, fn, *args, priority=INTERACTIVE, **kwargs):
+        """Queue one call -> concurrent.futures.Future"""
+        future = Future()
+        with self._cond:
+            queue = self._queues[priority]
+            queue.append((future, fn, args, kwargs, time.perf_counter()))
+            self._max_depth[priority] = max(self._max_depth[priority], len(queue))
+            self._cond.notify()
+        return future
+
+    def run(self, fn, *args, priority=INTERACTIVE, **kwargs):
+        """Call fn on an inference thread and wait for it"""
+        return self.submit(fn, *args, priority=priority, **kwargs).result()
+
+    def map_chunks(self, fn, X, priority=BATCH):
+        """fn over row chunks of X (array, CSR or DataFrame), results stacked back in row order"""
+        n = X.shape[0]
+        if n <= self.chunk_rows:
+            return self.run(fn, X, priority=priority)
+        futures = [self.submit(fn, take_rows(X, slice(start, start + self.chunk_rows)), priority=priority)
+                   for start in range(0, n, self.chunk_rows)]
+        parts = [future.result() for future in futures]
+        return sparse.vstack(parts) if sparse.issparse(parts[0]) else np.concatenate(parts)
+
+    def _next(self):
+        """Called with the lock held: interactive first, batch only while a worker is left for interactive"""
+        if self._queues[INTERACTIVE]:
+            return INTERACTIVE, self._queues[INTERACTIVE].popleft()
+        if self._queues[BATCH] and self._running[BATCH] < self.batch_slots:
+            return BATCH, self._queues[BATCH].popleft()
+        return None, None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                priority, item = self._next()
+                while item is None:
+                    self._cond.wait()
+                    priority, item = self._next()
+                self._running[priority] += 1
+            future, fn, args, kwargs, queued_at = item
+            started = time.perf_counter()
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            finished = time.perf_counter()
+            with self._cond:
+                self._running[priority] -= 1
+                self._completed[priority] += 1
+                self._waits[priority].append(started - queued_at)
+                self._services[priority].append(finished - started)
+                self._cond.notify_all() # a batch slot may have freed up
+
+    def stats(self):
+        """Queue depth + latency per queue, for sizing (all times in ms)"""
+        with self._cond:
+            rows = []
+            for priority, name in PRIORITY_NAMES.items():
+                waits = np.array(self._waits[priority]) * 1000
+                services = np.array(self._services[priority]) * 1000
+                rows.append({
+                    'queue': name,
+                    'depth': len(self._queues[priority]),
+                    'max_depth': self._max_depth[priority],
+                    'running': self._running[priority],
+                    'completed': self._completed[priority],
+                    'wait_p50_ms': float(np.percentile(waits, 50)) if len(waits) else 0.0,
+                    'wait_p95_ms': float(np.percentile(waits, 95)) if len(waits) else 0.0,
+                    'service_p50_ms': float(np.percentile(services, 50)) if len(services) else 0.0,
+                    'service_p95_ms': float(np.percentile(services, 95)) if len(services) else 0.0,
+                })
+        return {'workers': self.workers, 'blas_threads': self.blas_threads, 'batch_slots': self.batch_slots,
+                'queues': pd.DataFrame(rows)}
+
+
+class GovernedModel:
+    """Drop-in for the model inside score_frame / ScoreStore: predict_proba goes through the governor in chunks,
+    everything else (classes_, coef_, ...) is the real model's"""
+
+    def __init__(self, model, governor, priority=BATCH):
+        self.model = model
+        self.governor = governor
+        self.priority = priority
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    @property
+    def predict_proba(self):
+        predict_proba = self.model.predict_proba # AttributeError like the real model, so hasattr() checks still work
+        return lambda X: self.governor.map_chunks(predict_proba, X, self.priority)
+
+    @property
+    def predict(self):
+        predict = self.model.predict
+        return lambda X: self.governor.map_chunks(predict, X, self.priority)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: LOAD TEST (CLI)
+
+def load_test(model, X_single, X_batch, sessions, requests, governor=None):
+    """sessions threads each send `requests` single-row predictions while one batch runs -> latencies (ms)"""
+    latencies = []
+    lock = threading.Lock()
+
+    def session(seed):
+        rows = np.random.default_rng(seed).integers(0, len(X_single), requests)
+        for row in rows:
+            start = time.perf_counter()
+            if governor is None:
+                model.predict_proba(X_single[row:row + 1])
+            else:
+                governor.run(model.predict_proba, X_single[row:row + 1])
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions + 1) as pool:
+        batch = pool.submit(model.predict_proba if governor is None else GovernedModel(model, governor).predict_proba,
+                            X_batch)
+        for future in [pool.submit(session, seed) for seed in range(sessions)]:
+            future.result()
+        batch.result()
+    return np.array(latencies), time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive latency under concurrent load, with/without governor")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent RMs sending single-row requests")
+    parser.add_argument("--requests", type=int, default=40, help="requests per RM")
+    parser.add_argument("--batch-rows", type=int, default=100000, help="rows of the batch running meanwhile")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--blas-threads", type=int, default=DEFAULT_BLAS_THREADS)
+    args = parser.parse_args(argv)
+
+    from encoding_benchmark import synthetic_customers
+    from scoring import engineer_features, encode_features, load_artifacts, load_thresholds
+    model, scaler, feature_columns = load_artifacts()
+    emp_median, nr_median = load_thresholds()
+    X = encode_features(engineer_features(synthetic_customers(args.batch_rows, feature_columns, scaler),
+                                          emp_median, nr_median), feature_columns, scaler)
+    print(f"{type(model).__name__} (n_jobs={getattr(model, 'n_jobs', None)}), {os.cpu_count()} CPUs, "
+          f"{args.sessions} sessions x {args.requests} requests + {args.batch_rows:,}-row batch")
+
+    results = {'ungoverned': load_test(model, X, X, args.sessions, args.requests)}
+    governor = InferenceGovernor(args.workers, args.blas_threads)
+    pin_model(model)
+    results[f'governed ({args.workers} workers)'] = load_test(model, X, X, args.sessions, args.requests, governor)
+    for name, (latencies, seconds) in results.items():
+        print(f"  {name:<24} single-row p50 {np.percentile(latencies, 50):7.1f} ms  p95 "
+              f"{np.percentile(latencies, 95):7.1f} ms  p99 {np.percentile(latencies, 99):7.1f} ms  "
+              f"(whole run {seconds:.1f}s)")
+    print(governor.stats()['queues'].round(1).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
@@ -0,0 +1,384 @@
+"""
+BACKGROUND JOB QUEUE FOR BANKCONVERT AI (SQLite, WAL mode)
+
+1. Why: scoring a big upload inside a Streamlit run blocks that session until it is done, and the spinner times
+out on large files. Those files now go through a queue and the page stays usable.
+
+2. How:
+   - jobs.db keeps one row per job: who submitted it, the input file, status, progress, message, attempts
+   - a JobRunner (a daemon thread in the app, or `python job_queue.py worker` on its own) claims queued jobs in one
+     IMMEDIATE transaction, so two runners never start the same job
+   - every job runs batch_score.run() in its OWN process (new process group), writing progress to jobs.db after
+     every shard. The app only reads that table, so nothing waits on the scoring
+   - caps: at most `workers` jobs at a time and at most `per_user` per RM, so one huge file cannot take every
+     slot while other RMs are waiting
+   - cancel: a queued job is just marked cancelled, a running one stops after its current shard (its progress
+     callback sees the flag), or is killed with its whole process group after CANCEL_GRACE_SECONDS
+   - retry: failed / cancelled jobs go back in the queue and resume from batch_score's shard checkpoints, so the
+     shards already scored are not scored again (unless the live model changed in between)
+   - a job whose process died (server restart, OOM kill) is marked failed by the next runner, and can be retried
+   - process checks + kills use os.kill(pid, 0) / os.killpg on POSIX only. On Windows os.kill would terminate the
+     process it is asked about, so there they go through psutil when it is installed (pip install psutil). Without
+     it a Windows runner cannot tell whether another runner's job died, and a cancel kills the job process only
+
+Usage:
+    python job_queue.py submit customers.csv --user RM001 --id-col customer_id
+    python job_queue.py worker --workers 2 --per-user 1
+    python job_queue.py list
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import json
+import os
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+try:
+    import psutil # only needed on Windows, see process_alive / kill_job_process
+except ImportError:
+    psutil = None
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+DB_PATH = "jobs.db"
+JOBS_DIR = "jobs"
+DEFAULT_WORKERS = 2 # jobs running at the same time
+DEFAULT_PER_USER = 1 # of which at most this many from the same RM
+DEFAULT_POLL_SECONDS = 1.0
+CANCEL_GRACE_SECONDS = 30 # then the job's process group is killed
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id               INTEGER PRIMARY KEY AUTOINCREMENT,
+    user             TEXT    NOT NULL,
+    name             TEXT    NOT NULL,
+    input_path       TEXT    NOT NULL,
+    params           TEXT    NOT NULL,
+    status           TEXT    NOT NULL,
+    rows_done        INTEGER NOT NULL DEFAULT 0,
+    rows_total       INTEGER,
+    message          TEXT    NOT NULL DEFAULT '',
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    pid              INTEGER,
+    cancel_requested REAL,
+    submitted_at     REAL    NOT NULL,
+    started_at       REAL,
+    finished_at      REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user, id DESC);
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: QUEUE (the jobs table)
+
+class JobQueue:
+    """Shared by the app threads, the runner and the job processes, one connection per thread"""
+
+    def __init__(self, path=DB_PATH, jobs_dir=JOBS_DIR):
+        self.path = path
+        self.jobs_dir = jobs_dir
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None so claim() can run its own BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL") # the app keeps reading while jobs write progress
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, str(job_id))
+
+    def output_path(self, job_id):
+        return os.path.join(self.job_dir(job_id), "scores.parquet")
+
+    def log_path(self, job_id):
+        return os.path.join(self.job_dir(job_id), "job.log")
+
+    def submit(self, user, source, name=None, params=None):
+        """Copy source (a path or an open file, e.g. a Streamlit upload) into jobs/ and queue it -> job id.
+        The file is in place before the row exists, so a runner can never claim a job without its input"""
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        input_path = os.path.join(self.jobs_dir, f"input-{uuid.uuid4().hex}.csv")
+        if hasattr(source, 'read'):
+            with open(input_path, "wb") as f:
+                shutil.copyfileobj(source, f)
+        else:
+            shutil.copyfile(source, input_path)
+        name = name or os.path.basename(getattr(source, 'name', None) or str(source))
+        cursor = self._conn().execute(
+            "INSERT INTO jobs (user, name, input_path, params, status, submitted_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (user, name, input_path, json.dumps(params or {}), QUEUED, time.time()))
+        return cursor.lastrowid
+
+    def get(self, job_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else dict(row)
+
+    def jobs(self, user=None, limit=20):
+        """Newest first, one user's or everyone's"""
+        where, params = ("WHERE user = ?", (user,)) if user is not None else ("", ())
+        return pd.read_sql_query(f"SELECT * FROM jobs {where} ORDER BY id DESC LIMIT ?", self._conn(),
+                                 params=(*params, limit))
+
+    def cancel(self, job_id):
+        """Queued -> cancelled straight away, running -> flagged (the job stops itself). Returns the new status"""
+        conn = self._conn()
+        conn.execute("UPDATE jobs SET status = ?, finished_at = ?, message = 'cancelled before it started' "
+                     "WHERE id = ? AND status = ?", (CANCELLED, time.time(), job_id, QUEUED))
+        conn.execute("UPDATE jobs SET cancel_requested = ? WHERE id = ? AND status = ? AND cancel_requested IS NULL",
+                     (time.time(), job_id, RUNNING))
+        return self.get(job_id)['status']
+
+    def retry(self, job_id):
+        """Failed / cancelled -> queued again. Returns False if the job is in any other state"""
+        return self._conn().execute(
+            "UPDATE jobs SET status = ?, message = '', pid = NULL, cancel_requested = NULL, finished_at = NULL "
+            "WHERE id = ? AND status IN (?, ?)", (QUEUED, job_id, FAILED, CANCELLED)).rowcount == 1
+
+    def claim(self, workers=DEFAULT_WORKERS, per_user=DEFAULT_PER_USER):
+        """Oldest queued job whose RM is under per_user running jobs, if fewer than workers are running.
+        Count + pick + mark happen in one write transaction, so concurrent runners cannot overshoot the caps"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            running = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (RUNNING,)).fetchone()[0]
+            row = None
+            if running < workers:
+                row = conn.execute("""
+                    SELECT * FROM jobs q WHERE q.status = ? AND
+                        (SELECT COUNT(*) FROM jobs r WHERE r.status = ? AND r.user = q.user) < ?
+                    ORDER BY q.id LIMIT 1""", (QUEUED, RUNNING, per_user)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, rows_done = 0 "
+                             "WHERE id = ?", (RUNNING, time.time(), row['id']))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return None if row is None else self.get(row['id'])
+
+    def running(self):
+        return [dict(row) for row in self._conn().execute(
+            "SELECT id, pid, cancel_requested FROM jobs WHERE status = ?", (RUNNING,))]
+
+    def set_pid(self, job_id, pid):
+        self._conn().execute("UPDATE jobs SET pid = ? WHERE id = ?", (pid, job_id))
+
+    def set_progress(self, job_id, rows_done, rows_total):
+        """Called by the job after every shard. Returns True if a cancel was requested"""
+        conn = self._conn()
+        conn.execute("UPDATE jobs SET rows_done = ?, rows_total = ? WHERE id = ?", (rows_done, rows_total, job_id))
+        return conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()[0] is not None
+
+    def finish(self, job_id, status, message=""):
+        """Only a running job can finish, so a late update from a killed process cannot overwrite a retry"""
+        self._conn().execute("UPDATE jobs SET status = ?, message = ?, finished_at = ?, pid = NULL "
+                             "WHERE id = ? AND status = ?", (status, message, time.time(), job_id, RUNNING))
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: ONE JOB (runs in its own process)
+
+def run_job(queue, job_id):
+    """batch_score.run() for one claimed job, progress + cancel checks after every shard"""
+    from batch_score import DEFAULT_SHARD_ROWS, WorkDirMismatch, run
+
+    job = queue.get(job_id)
+    params = json.loads(job['params'])
+
+    def progress(rows_done, rows_total):
+        if queue.set_progress(job_id, rows_done, rows_total):
+            raise JobCancelled()
+
+    def score(restart):
+        run(job['input_path'], queue.output_path(job_id), work_dir=os.path.join(queue.job_dir(job_id), "parts"),
+            workers=params.get('workers', 1), shard_rows=params.get('shard_rows', DEFAULT_SHARD_ROWS),
+            sep=params.get('sep', ","), id_col=params.get('id_col'), restart=restart, progress=progress)
+
+    try:
+        try:
+            score(restart=False) # resumes the shards of an earlier attempt
+        except WorkDirMismatch:
+            print("Live model changed since the last attempt, starting over", flush=True)
+            score(restart=True)
+        queue.finish(job_id, DONE, f"{queue.get(job_id)['rows_total']:,} rows scored")
+    except JobCancelled:
+        queue.finish(job_id, CANCELLED, "cancelled, finished shards kept for a retry")
+    except (Exception, SystemExit) as e: # SystemExit: batch_score's own error messages
+        queue.finish(job_id, FAILED, str(e) or type(e).__name__)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: RUNNER (dispatcher thread)
+
+def process_alive(pid):
+    if os.name != "posix":
+        # os.kill(pid, 0) would TerminateProcess on Windows. No psutil: unknown, so never fail a job that may still run
+        return psutil.pid_exists(pid) if psutil is not None else True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True # exists, owned by someone else
+    return True
+
+
+def kill_job_process(process):
+    """Kill a job started by launch() together with batch_score's pool workers"""
+    if os.name == "posix":
+        os.killpg(process.pid, signal.SIGKILL) # own process group (start_new_session)
+        return
+    if psutil is not None:
+        try:
+            for child in psutil.Process(process.pid).children(recursive=True):
+                child.kill()
+        except psutil.NoSuchProcess:
+            pass
+    process.kill()
+
+
+class JobRunner:
+    """Starts claimed jobs as child processes and watches them. Several runners can share one jobs.db"""
+
+    def __init__(self, queue=None, workers=DEFAULT_WORKERS, per_user=DEFAULT_PER_USER,
+                 poll_seconds=DEFAULT_POLL_SECONDS):
+        self.queue = queue or JobQueue()
+        self.workers = workers
+        self.per_user = per_user
+        self.poll_seconds = poll_seconds
+        self.processes = {} # job id -> Popen, for the jobs this runner started
+        self._thread = None
+        self._stop = threading.Event()
+
+    def launch(self, job):
+        os.makedirs(self.queue.job_dir(job['id']), exist_ok=True)
+        with open(self.queue.log_path(job['id']), "a") as log:
+            process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--db", self.queue.path, "--jobs-dir", self.queue.jobs_dir,
+                 "run", str(job['id'])],
+                stdout=log, stderr=subprocess.STDOUT,
+                start_new_session=True) # own process group, so a kill also takes batch_score's pool workers
+        self.processes[job['id']] = process
+        self.queue.set_pid(job['id'], process.pid)
+
+    def reap(self):
+        """Forget finished children, fail running jobs whose process is gone, enforce the cancel grace period"""
+        for job_id, process in list(self.processes.items()):
+            if process.poll() is not None:
+                del self.processes[job_id]
+                # exited without marking itself done / failed / cancelled (killed, crashed interpreter)
+                self.queue.finish(job_id, FAILED, f"job process exited with code {process.returncode}")
+        now = time.time()
+        for job in self.queue.running():
+            if job['id'] in self.processes:
+                requested = job['cancel_requested']
+                if requested is not None and now - requested > CANCEL_GRACE_SECONDS:
+                    kill_job_process(self.processes[job['id']])
+                    self.processes.pop(job['id']).wait()
+                    self.queue.finish(job['id'], CANCELLED, "cancelled (stopped mid-shard)")
+            elif job['pid'] is not None and not process_alive(job['pid']):
+                # started by a runner that is gone, pid None = just claimed, launch has not set it yet
+                self.queue.finish(job['id'], FAILED, "job process is gone (server restarted?), retry to resume")
+
+    def tick(self):
+        self.reap()
+        while len(self.processes) < self.workers:
+            job = self.queue.claim(self.workers, self.per_user)
+            if job is None:
+                break
+            self.launch(job)
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.tick()
+            except sqlite3.OperationalError:
+                pass # database busy for longer than the timeout, try again next tick
+
+    def start(self):
+        """Background dispatcher (daemon, so it never keeps the process alive)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name="job-runner", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Background batch scoring jobs")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--jobs-dir", default=JOBS_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    submit = sub.add_parser("submit", help="queue a customer CSV for scoring")
+    submit.add_argument("csv")
+    submit.add_argument("--user", default="cli")
+    submit.add_argument("--sep", default=",")
+    submit.add_argument("--id-col", default=None)
+    submit.add_argument("--workers", type=int, default=1, help="processes for this one job")
+    submit.add_argument("--shard-rows", type=int, default=None, help="rows per checkpointed shard")
+    worker = sub.add_parser("worker", help="run queued jobs until stopped")
+    worker.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    worker.add_argument("--per-user", type=int, default=DEFAULT_PER_USER)
+    sub.add_parser("list", help="latest jobs")
+    for command in ("cancel", "retry"):
+        sub.add_parser(command).add_argument("job_id", type=int)
+    run = sub.add_parser("run", help="(internal) run one claimed job")
+    run.add_argument("job_id", type=int)
+    args = parser.parse_args(argv)
+
+    queue = JobQueue(args.db, args.jobs_dir)
+    if args.command == "submit":
+        job_id = queue.submit(args.user, args.csv,
+                              params={'sep': args.sep, 'id_col': args.id_col, 'workers': args.workers,
+                                      **({'shard_rows': args.shard_rows} if args.shard_rows else {})})
+        print(f"Queued job {job_id}")
+    elif args.command == "worker":
+        runner = JobRunner(queue, args.workers, args.per_user)
+        print(f"Running jobs from {args.db} ({args.workers} at a time, {args.per_user} per user), Ctrl+C to stop")
+        while True:
+            runner.tick()
+            time.sleep(runner.poll_seconds)
+    elif args.command == "list":
+        jobs = queue.jobs()
+        print(jobs[['id', 'user', 'name', 'status', 'rows_done', 'rows_total', 'attempts', 'message']].to_string(
+            index=False) if len(jobs) else "No jobs")
+    elif args.command == "cancel":
+        print(f"Job {args.job_id}: {queue.cancel(args.job_id)}")
+    elif args.command == "retry":
+        print(f"Job {args.job_id}: {'queued again' if queue.retry(args.job_id) else 'not failed or cancelled'}")
+    elif args.command == "run":
+        run_job(queue, args.job_id)
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
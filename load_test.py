@@ -0,0 +1,320 @@
+"""
+LOAD TEST FOR BANKCONVERT AI (simulated concurrent RMs against a real server)
+
+1. Why: rerun_benchmark.py times ONE session. We do not know how many RMs one app container can carry before the
+Predict button gets slow.
+
+2. How:
+   - starts `streamlit run streamlit_app.py` headless on a local port, then every simulated RM opens its own
+     websocket to /_stcore/stream and talks Streamlit's own protobuf messages (BackMsg rerun requests with widget
+     states in, ForwardMsg deltas out), exactly like a browser tab. AppTest cannot do this: it rebuilds the
+     runtime + recompiles the script on every run, which breaks as soon as two sessions run at once
+   - each RM signs in (sidebar RM ID), then every round: fills the Predict form with a synthetic but realistic
+     profile (encoding_benchmark.synthetic_customers, so levels + number ranges come from the training
+     artifacts) and clicks Run Prediction, toggles the theme and changes "Show top" on My Prospects
+     (switching tabs is browser-only in Streamlit, a widget on the tab is what reaches the server).
+     Widgets inside an st.fragment are rerun as that fragment, like the browser does
+   - latency of an interaction = request sent -> script_finished received
+   - run at increasing session counts (--sessions 1,2,4,8): per-interaction percentiles, SERVER process CPU
+     (cores busy + CPU seconds per session, from /proc) and resident memory per session (server RSS growth)
+   - saturation point = first level where interactions/second stop growing by 10%+ (CPU is full, extra RMs only
+     queue), and the largest level whose Run Prediction p95 stays under --slo-ms
+
+3. Note: Linux only (/proc), needs the websockets package (installed with recent streamlit versions) and speaks
+the wire protocol of the installed streamlit. Run from the folder that has the .pkl files, e.g.
+    python load_test.py --sessions 1,2,4,8,16 --rounds 5 --slo-ms 1500
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+from encoding_benchmark import synthetic_customers
+from scoring import load_artifacts
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+DEFAULT_PORT = 8599
+HEALTH_PATH = "/_stcore/health"
+STREAM_PATH = "/_stcore/stream"
+SERVER_START_SECONDS = 60
+
+WIDGET_TYPES = ('button', 'slider', 'selectbox', 'text_input', 'number_input')
+FORM_ID = "predict_form"
+# Predict form widget label -> raw customer column
+FORM_FIELDS = {
+    'Age': 'age', 'Occupation': 'job', 'Marital Status': 'marital', 'Education Level': 'education',
+    'Credit Default': 'default', 'Housing Loan': 'housing', 'Personal Loan': 'loan', 'Contact Method': 'contact',
+    'Last Contact Month': 'month', 'Last Contact Day': 'day_of_week', 'Days Since Last Contact': 'pdays',
+    'Previous Campaign Contacts': 'previous', 'Previous Campaign Outcome': 'poutcome',
+    'Employment Variation Rate': 'emp.var.rate', 'Consumer Price Index': 'cons.price.idx',
+    'Consumer Confidence Index': 'cons.conf.idx', 'Euribor 3-Month Rate': 'euribor3m',
+    'Employed (thousands)': 'nr.employed',
+}
+INTERACTIONS = ['first load', 'sign in', 'run prediction', 'theme toggle', 'prospects widget']
+SCALING_GAIN = 0.10 # throughput must grow by this much per level to count as "still scaling"
+RSS_SAMPLE_SECONDS = 0.2
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: SERVER
+
+def start_server(app_path, port):
+    """Headless streamlit server in its own process (its CPU/memory are what we measure)"""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.abspath(app_path), "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false", "--server.fileWatcherType", "none"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + SERVER_START_SECONDS
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://localhost:{port}{HEALTH_PATH}", timeout=1):
+                return server
+        except OSError:
+            if server.poll() is not None:
+                raise SystemExit(f"streamlit exited with code {server.returncode}")
+            time.sleep(0.5)
+    server.kill()
+    raise SystemExit(f"streamlit did not come up on port {port} within {SERVER_START_SECONDS}s")
+
+
+def cpu_seconds(pid):
+    """user + system CPU of a process (Linux /proc)"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: ONE SIMULATED RM (a browser tab, minus the browser)
+
+class SimulatedRM:
+    """One websocket session: keeps the widgets the server last rendered + the values this "user" has set"""
+
+    def __init__(self, socket, timeout):
+        self.socket = socket
+        self.timeout = timeout
+        self.widgets = {} # (type, label) -> (proto, fragment id), from the latest render
+        self.rendered = set() # widgets already seen in the current rerun (first one wins for repeated labels)
+        self.states = {} # widget id -> WidgetState, sent with every rerun like the browser does
+        self.errors = []
+
+    def rerun(self, triggers=(), fragment_id=""):
+        """Send a rerun with the current widget values (+ one-off button triggers) -> ms until the script finished"""
+        msg = BackMsg()
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.widget_states.widgets.extend(list(self.states.values()) + list(triggers))
+        if not fragment_id:
+            self.widgets.clear() # whole page is re-rendered, labels like the theme button change
+        self.rendered = set()
+        start = time.perf_counter()
+        self.socket.send(msg.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.socket.recv(timeout=self.timeout))
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                self.collect(forward.delta.new_element, forward.delta.fragment_id)
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return (time.perf_counter() - start) * 1000
+
+    def collect(self, element, fragment_id):
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors.append(element.exception.message)
+        elif kind in WIDGET_TYPES:
+            proto = getattr(element, kind)
+            if (kind, proto.label) not in self.rendered:
+                self.rendered.add((kind, proto.label))
+                self.widgets[(kind, proto.label)] = (proto, fragment_id)
+
+    def find(self, kind, label):
+        """First widget of this type whose label contains `label` -> (proto, fragment id)"""
+        for (widget_kind, widget_label), found in self.widgets.items():
+            if widget_kind == kind and label in widget_label:
+                return found
+        raise LookupError(f"No {kind} with label containing {label!r} (did the page render?)")
+
+    def set_state(self, proto, **value):
+        state = WidgetState(id=proto.id, **value)
+        self.states[proto.id] = state
+
+    def click(self, kind, label):
+        """Button press: only this rerun carries the trigger, then it is gone again"""
+        proto, fragment_id = self.find(kind, label)
+        return self.rerun([WidgetState(id=proto.id, trigger_value=True)], fragment_id)
+
+    def change(self, kind, label, **value):
+        proto, fragment_id = self.find(kind, label)
+        self.set_state(proto, **value)
+        return self.rerun(fragment_id=fragment_id)
+
+    def fill_form(self, profile, rng):
+        """Type one customer into the Predict form, values are only sent with the submit click"""
+        for (kind, label), (proto, _) in list(self.widgets.items()):
+            column = FORM_FIELDS.get(label)
+            if column is None or proto.form_id != FORM_ID:
+                continue
+            if kind == 'slider':
+                value = np.clip(round(float(profile[column]) / proto.step) * proto.step, proto.min, proto.max)
+                self.set_state(proto, double_array_value={'data': [round(float(value), 2)]})
+            elif kind == 'selectbox':
+                value = profile[column]
+                # synthetic "(first level)" is not an option, any level will do
+                self.set_state(proto, string_value=str(value if value in proto.options else rng.choice(proto.options)))
+
+
+def run_session(port, session, rounds, timeout, profiles, record):
+    """Sign in, then `rounds` x (fill form + Run Prediction -> theme toggle -> prospects widget)"""
+    rng = np.random.default_rng(session)
+    start = time.perf_counter()
+    with connect(f"ws://localhost:{port}{STREAM_PATH}", subprotocols=["streamlit"], max_size=None,
+                 open_timeout=timeout) as socket:
+        rm = SimulatedRM(socket, timeout)
+        rm.rerun()
+        record('first load', (time.perf_counter() - start) * 1000)
+        record('sign in', rm.change('text_input', "RM ID", string_value=f"LOAD{session:03d}"))
+        for i in range(rounds):
+            rm.fill_form(profiles.iloc[rng.integers(len(profiles))], rng)
+            record('run prediction', rm.click('button', "Run Prediction"))
+            record('theme toggle', rm.click('button', "Mode"))
+            proto, _ = rm.find('slider', "Show top")
+            option = proto.options[(i + 1) % len(proto.options)]
+            record('prospects widget', rm.change('slider', "Show top", string_array_value={'data': [option]}))
+        if rm.errors:
+            raise RuntimeError(rm.errors[0])
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: ONE LOAD LEVEL
+
+def run_level(server, port, sessions, rounds, timeout, profiles):
+    """`sessions` RMs at the same time -> latencies (ms) per interaction + server CPU / memory of the level"""
+    latencies = {name: [] for name in INTERACTIONS}
+    lock = threading.Lock()
+    errors = []
+
+    def record(name, ms):
+        with lock:
+            latencies[name].append(ms)
+
+    def session(i):
+        try:
+            run_session(port, i, rounds, timeout, profiles, record)
+        except Exception as e:
+            errors.append(f"session {i}: {e}")
+
+    # peak server RSS sampled on a side thread, per-session memory = growth above where the level started
+    rss_start = rss_mb(server.pid)
+    peak = [rss_start]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(RSS_SAMPLE_SECONDS):
+            peak[0] = max(peak[0], rss_mb(server.pid))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    cpu, wall = cpu_seconds(server.pid), time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cpu, wall = cpu_seconds(server.pid) - cpu, time.perf_counter() - wall
+    done.set()
+    sampler.join()
+
+    interactions = sum(len(v) for k, v in latencies.items() if k != 'first load')
+    return {
+        'sessions': sessions,
+        'errors': errors,
+        'latencies': latencies,
+        'throughput': interactions / wall,
+        'cores_busy': cpu / wall,
+        'cpu_s_per_session': cpu / sessions,
+        'mb_per_session': max(peak[0] - rss_start, 0) / sessions,
+        'peak_rss_mb': peak[0],
+    }
+
+
+def saturation(levels, slo_ms):
+    """(sessions where throughput stopped scaling or None, largest sessions within the SLO or None)"""
+    saturated = None
+    for previous, level in zip(levels, levels[1:]):
+        if level['throughput'] < previous['throughput'] * (1 + SCALING_GAIN):
+            saturated = previous['sessions']
+            break
+    within = [lv['sessions'] for lv in levels if lv['latencies']['run prediction'] and not lv['errors']
+              and np.percentile(lv['latencies']['run prediction'], 95) <= slo_ms]
+    return saturated, max(within) if within else None
+
+
+def report(level):
+    print(f"\n{level['sessions']} concurrent RMs: {level['throughput']:.1f} interactions/s, server "
+          f"{level['cores_busy']:.2f} cores busy, {level['cpu_s_per_session']:.2f} CPU s + "
+          f"{level['mb_per_session']:.1f} MB per session (peak RSS {level['peak_rss_mb']:.0f} MB)")
+    print(f"  {'interaction':<18}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, samples in level['latencies'].items():
+        if samples:
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            print(f"  {name:<18}{len(samples):>5}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}{max(samples):>10.0f}")
+    for error in level['errors']:
+        print(f"  ⚠️ {error}")
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated concurrent RMs against a local Streamlit server")
+    parser.add_argument("--app", default="streamlit_app.py", help="path to the Streamlit script")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--sessions", default="1,2,4,8", help="comma separated concurrent RM counts to try")
+    parser.add_argument("--rounds", type=int, default=5, help="predict/theme/prospects rounds per RM")
+    parser.add_argument("--slo-ms", type=float, default=2000, help="acceptable Run Prediction p95")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds before a rerun counts as hung")
+    parser.add_argument("--profiles", type=int, default=1000, help="synthetic customers to draw from")
+    args = parser.parse_args(argv)
+
+    _, scaler, feature_columns = load_artifacts()
+    profiles = synthetic_customers(args.profiles, feature_columns, scaler)
+    server = start_server(args.app, args.port)
+    try:
+        print(f"{os.cpu_count()} CPUs, {args.rounds} rounds per RM, SLO Run Prediction p95 <= "
+              f"{args.slo_ms:.0f} ms, server pid {server.pid}")
+        # one warm-up session, so model loading + caches are not billed to the first level
+        run_level(server, args.port, 1, 1, args.timeout, profiles)
+        levels = []
+        for sessions in (int(s) for s in args.sessions.split(",")):
+            levels.append(run_level(server, args.port, sessions, args.rounds, args.timeout, profiles))
+            report(levels[-1])
+    finally:
+        server.terminate()
+        server.wait()
+
+    saturated, within = saturation(levels, args.slo_ms)
+    print()
+    print(f"Saturation: throughput stops growing after {saturated} concurrent RMs" if saturated
+          else "Saturation: not reached, throughput still growing at the highest level")
+    print(f"Largest level within the SLO: {within} RMs" if within else "No level met the SLO")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
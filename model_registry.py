@@ -0,0 +1,348 @@
+"""
+MODEL REGISTRY + ZERO-DOWNTIME HOT SWAP FOR BANKCONVERT AI
+
+1. Why: load_models() is an st.cache_resource, so a new best_model.pkl was only picked up after restarting the app
+(or clearing the cache), which drops every RM's session.
+
+2. Registry layout (models/ next to the app):
+    models/v0001/best_model.pkl, scaler.pkl, feature_columns.pkl, thresholds.pkl, version.json (+ optional extras)
+    models/v0002/...
+    models/CURRENT          one line with the live version, replaced atomically (temp file + os.replace)
+    models/history.jsonl    append-only log of every pointer change (used for rollback)
+    models/SHADOW           optional candidate version scored alongside the live one (see shadow_scoring.py)
+   A version folder is filled under a temp name and renamed into place, so a half-copied version is never visible.
+
+3. ModelHandle (one per process): a background thread polls models/CURRENT, loads + warms the new version OFF the
+request path and then swaps one reference. Requests that already grabbed the old bundle finish on it.
+Without a models/ folder everything works as before from the flat .pkl files (version "local"), and replacing
+best_model.pkl is hot-swapped the same way.
+
+Usage:
+    python model_registry.py register --note "october retrain"    # snapshot the flat .pkl files as a new version
+    python model_registry.py list
+    python model_registry.py activate v0002
+    python model_registry.py rollback
+    python model_registry.py shadow v0003      # or: shadow --clear
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import joblib
+import numpy as np
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+REGISTRY_DIR = "models"
+POINTER = "CURRENT"
+SHADOW_POINTER = "SHADOW"
+HISTORY = "history.jsonl"
+VERSION_INFO = "version.json"
+LOCAL_VERSION = "local" # flat files next to the app, no registry
+
+# same file names as scoring.py (no import from there, scoring imports this module)
+MODEL_FILE = "best_model.pkl"
+CORE_ARTIFACTS = [MODEL_FILE, "scaler.pkl", "feature_columns.pkl", "thresholds.pkl"]
+# model-specific files from the other tools, copied along when they exist
+OPTIONAL_ARTIFACTS = ["decision_threshold.pkl", "drift_reference.pkl", "conformal.pkl", "similar_index.pkl",
+                      "feature_importance.pkl", "segment_report.pkl"]
+
+DEFAULT_POLL_SECONDS = 5
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: REGISTRY (versions + pointer)
+
+def read_pointer(registry=REGISTRY_DIR, pointer=POINTER):
+    """Live (or shadow) version name, or None when there is no registry / no shadow"""
+    try:
+        with open(os.path.join(registry, pointer)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_dir(version, registry=REGISTRY_DIR):
+    return os.path.join(registry, version)
+
+
+def list_versions(registry=REGISTRY_DIR):
+    """All complete versions, oldest first, with their version.json info"""
+    if not os.path.isdir(registry):
+        return []
+    versions = []
+    for name in sorted(os.listdir(registry)):
+        info_path = os.path.join(registry, name, VERSION_INFO)
+        if os.path.isfile(info_path):
+            with open(info_path) as f:
+                versions.append({'version': name, **json.load(f)})
+    return versions
+
+
+def read_history(registry=REGISTRY_DIR):
+    try:
+        with open(os.path.join(registry, HISTORY)) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _write_pointer(version, registry, action, pointer=POINTER):
+    tmp = os.path.join(registry, pointer + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(registry, pointer)) # atomic, readers see the old or the new name, never half
+    if pointer != POINTER:
+        return # history is only for the live pointer (rollback)
+    with open(os.path.join(registry, HISTORY), "a") as f:
+        f.write(json.dumps({'time': time.strftime("%Y-%m-%d %H:%M:%S"), 'action': action, 'version': version}) + "\n")
+
+
+def activate(version, registry=REGISTRY_DIR, action="activate"):
+    """Point CURRENT at an existing version, running processes pick it up on their next poll"""
+    if not os.path.isfile(os.path.join(version_dir(version, registry), VERSION_INFO)):
+        raise ValueError(f"Unknown model version {version!r}")
+    _write_pointer(version, registry, action)
+
+
+def set_shadow(version, registry=REGISTRY_DIR):
+    """Candidate version to score alongside the live one"""
+    if not os.path.isfile(os.path.join(version_dir(version, registry), VERSION_INFO)):
+        raise ValueError(f"Unknown model version {version!r}")
+    _write_pointer(version, registry, "shadow", pointer=SHADOW_POINTER)
+
+
+def clear_shadow(registry=REGISTRY_DIR):
+    try:
+        os.remove(os.path.join(registry, SHADOW_POINTER))
+    except FileNotFoundError:
+        pass
+
+
+def previous_version(registry=REGISTRY_DIR):
+    """Version that was live before the current one (rolling back twice undoes the rollback)"""
+    current = read_pointer(registry)
+    for entry in reversed(read_history(registry)):
+        if entry['version'] != current:
+            return entry['version']
+    return None
+
+
+def rollback(registry=REGISTRY_DIR):
+    """One-step rollback to the previously live version"""
+    version = previous_version(registry)
+    if version is None:
+        raise ValueError("Nothing to roll back to")
+    activate(version, registry, action="rollback")
+    return version
+
+
+def _next_version(registry):
+    numbers = [int(v['version'][1:]) for v in list_versions(registry) if v['version'][1:].isdigit()]
+    return f"v{max(numbers, default=0) + 1:04d}"
+
+
+def register(source_dir=".", registry=REGISTRY_DIR, model=None, note="", metrics=None, make_current=True,
+             copy_extras=True, overrides=None):
+    """Copy the artifacts in source_dir (or dump `model` instead of its best_model.pkl) into a new version.
+    copy_extras=False skips OPTIONAL_ARTIFACTS, e.g. when they were computed for a different model.
+    overrides: {artifact name: object} dumped instead of copying that file (e.g. a refreshed thresholds.pkl)"""
+    overrides = dict(overrides or {})
+    if model is not None:
+        overrides[MODEL_FILE] = model
+    os.makedirs(registry, exist_ok=True)
+    staging = os.path.join(registry, f".staging-{os.getpid()}-{time.time_ns()}")
+    os.makedirs(staging)
+    try:
+        for name in CORE_ARTIFACTS + (OPTIONAL_ARTIFACTS if copy_extras else []):
+            if name in overrides:
+                joblib.dump(overrides[name], os.path.join(staging, name))
+                continue
+            src = os.path.join(source_dir, name)
+            if os.path.exists(src):
+                shutil.copy2(src, os.path.join(staging, name))
+            elif name in CORE_ARTIFACTS and name != "thresholds.pkl":
+                raise FileNotFoundError(f"{src} is needed to register a model version")
+
+        with open(os.path.join(staging, MODEL_FILE), "rb") as f:
+            model_sha = hashlib.sha256(f.read()).hexdigest()
+        info = {'created': time.strftime("%Y-%m-%d %H:%M:%S"), 'note': note, 'metrics': metrics or {},
+                'model_sha256': model_sha}
+        with open(os.path.join(staging, VERSION_INFO), "w") as f:
+            json.dump(info, f, indent=2)
+
+        version = _next_version(registry)
+        os.rename(staging, version_dir(version, registry)) # the whole folder appears at once
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if make_current:
+        activate(version, registry, action="register")
+    return version
+
+
+def resolve_artifact(path, registry=REGISTRY_DIR):
+    """Bare artifact names (e.g. "best_model.pkl") point into the live registry version when there is one,
+    anything else (or a file the version does not have) is returned unchanged"""
+    version = read_pointer(registry)
+    if version is None or os.path.dirname(path):
+        return path
+    candidate = os.path.join(version_dir(version, registry), path)
+    return candidate if os.path.exists(candidate) else path
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: LOADING + WARMING A VERSION
+
+def pointer_signature(registry=REGISTRY_DIR, pointer=POINTER):
+    """What the poller compares: the registry pointer, or the flat model file's mtime without a registry"""
+    version = read_pointer(registry, pointer)
+    if version is not None or pointer != POINTER:
+        return version
+    try:
+        return f"{LOCAL_VERSION}@{os.stat(MODEL_FILE).st_mtime_ns}"
+    except FileNotFoundError:
+        return None
+
+
+def load_bundle(signature, registry=REGISTRY_DIR):
+    """Everything one prediction needs, from one version (so model and scaler can never come from different ones)"""
+    local = signature.startswith(LOCAL_VERSION)
+    folder = "." if local else version_dir(signature, registry)
+    path = lambda name: os.path.join(folder, name)
+
+    thresholds = None
+    if os.path.exists(path("thresholds.pkl")):
+        saved = joblib.load(path("thresholds.pkl"))
+        thresholds = (saved['emp_median'], saved['nr_median'])
+    return {
+        'version': LOCAL_VERSION if local else signature,
+        'folder': folder,
+        'model': joblib.load(path(MODEL_FILE)),
+        'scaler': joblib.load(path("scaler.pkl")),
+        'feature_columns': joblib.load(path("feature_columns.pkl")),
+        'thresholds': thresholds,
+        'loaded_at': time.strftime("%H:%M:%S"),
+    }
+
+
+def warm_up(bundle):
+    """One throwaway prediction so the first real request does not pay for page faults / lazy setup"""
+    X = np.zeros((1, len(bundle['feature_columns'])))
+    model = bundle['model']
+    model.predict_proba(X) if hasattr(model, 'predict_proba') else model.predict(X)
+    return bundle
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: HOT-SWAP HANDLE
+
+class ModelHandle:
+    """Holds the live (or shadow) bundle and swaps it when the registry pointer changes.
+    get() is just an attribute read, so requests never wait on a load"""
+
+    def __init__(self, registry=REGISTRY_DIR, poll_seconds=DEFAULT_POLL_SECONDS, pointer=POINTER):
+        self.registry = registry
+        self.pointer = pointer
+        self.poll_seconds = poll_seconds
+        self.bundle = None
+        self.signature = None
+        self.last_error = None
+        self._failed = None # signature that failed to load
+        self._load_lock = threading.Lock() # only one load at a time, never held by get()
+        self._thread = None
+        self._stop = threading.Event()
+        self.check() # first load happens in the foreground, there is nothing to serve yet
+
+    def get(self):
+        return self.bundle
+
+    def check(self):
+        """Load + warm + swap if the pointer moved. Returns True if a new version went live"""
+        with self._load_lock:
+            signature = pointer_signature(self.registry, self.pointer)
+            if signature is None and self.pointer != POINTER:
+                self.bundle = self.signature = None # shadow switched off
+                return False
+            if signature == self.signature:
+                self.last_error = self._failed = None # pointer is back on the live version
+                return False
+            if signature is None or signature == self._failed:
+                return False # versions are published whole, so a broken one is not retried until the pointer moves
+            try:
+                bundle = warm_up(load_bundle(signature, self.registry))
+            except Exception as e:
+                # keep serving the old version
+                self.last_error, self._failed = f"{signature}: {e}", signature
+                return False
+            self.bundle, self.signature, self.last_error, self._failed = bundle, signature, None, None
+            return True
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def start(self):
+        """Background poller (daemon, so it never keeps the process alive)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name="model-hot-swap", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Versioned model registry")
+    parser.add_argument("--registry", default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    reg = sub.add_parser("register", help="snapshot artifacts as a new version and make it live")
+    reg.add_argument("--from", dest="source", default=".", help="folder with the .pkl files")
+    reg.add_argument("--note", default="")
+    reg.add_argument("--no-activate", action="store_true", help="register without making it live")
+    sub.add_parser("list", help="show all versions")
+    act = sub.add_parser("activate", help="make a version live")
+    act.add_argument("version")
+    sub.add_parser("rollback", help="go back to the previously live version")
+    shadow = sub.add_parser("shadow", help="score a candidate version alongside the live one")
+    shadow.add_argument("version", nargs="?")
+    shadow.add_argument("--clear", action="store_true", help="stop shadow scoring")
+    args = parser.parse_args(argv)
+
+    if args.command == "register":
+        version = register(args.source, args.registry, note=args.note, make_current=not args.no_activate)
+        print(f"Registered {version}" + ("" if args.no_activate else " (live)"))
+    elif args.command == "list":
+        current = read_pointer(args.registry)
+        shadow = read_pointer(args.registry, SHADOW_POINTER)
+        for v in list_versions(args.registry):
+            marker = "*" if v['version'] == current else ("s" if v['version'] == shadow else " ")
+            print(f"{marker} {v['version']}  {v['created']}  {v['note']}")
+    elif args.command == "activate":
+        activate(args.version, args.registry)
+        print(f"{args.version} is live")
+    elif args.command == "shadow":
+        if args.clear or args.version is None:
+            clear_shadow(args.registry)
+            print("Shadow scoring off")
+        else:
+            set_shadow(args.version, args.registry)
+            print(f"{args.version} is the shadow candidate")
+    else:
+        print(f"Rolled back to {rollback(args.registry)}")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
@@ -0,0 +1,90 @@
+"""
+RERUN CPU BENCHMARK FOR BANKCONVERT AI
+
+1. Drives streamlit_app.py headlessly with streamlit.testing AppTest and measures CPU time (process_time) the
+server spends per interaction: first load, changing a Predict widget, clicking Run Prediction, toggling theme.
+
+2. Note: AppTest always reruns the WHOLE script, so numbers for Run Prediction are an upper bound when the Predict
+tab is an st.fragment. Widgets inside an st.form send nothing to the server until submit, so a widget change there
+is left out of the report (only measured when the widget is outside a form), instead of timing an AppTest rerun
+that a real browser would never trigger.
+
+3. Run from the folder that has the .pkl files, e.g.
+    python rerun_benchmark.py --app streamlit_app.py --repeats 20
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+import statistics
+import time
+
+from streamlit.testing.v1 import AppTest
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: INTERACTIONS
+
+def timed(action):
+    """CPU ms + wall ms for one interaction"""
+    cpu, wall = time.process_time(), time.perf_counter()
+    action()
+    return (time.process_time() - cpu) * 1000, (time.perf_counter() - wall) * 1000
+
+
+def find_button(at, label):
+    """Button (or form submit button) by label, since the app does not give keys to every button"""
+    for button in at.button:
+        if label in button.label:
+            return button
+    raise LookupError(f"No button with label containing {label!r}")
+
+
+def run_session(app_path, repeats, timeout):
+    """One simulated RM: load app, then repeat widget change -> predict -> theme toggle"""
+    results = {'first load': [], 'widget change': [], 'run prediction': [], 'theme toggle': []}
+
+    # absolute path since AppTest resolves relative paths against this file, not the cwd
+    at = AppTest.from_file(os.path.abspath(app_path), default_timeout=timeout)
+    results['first load'].append(timed(at.run))
+
+    for i in range(repeats):
+        age = at.slider[0]
+        if age.form_id:
+            # inside st.form: browser keeps the value until submit, nothing to measure on the server
+            age.set_value(25 + i % 50)
+        else:
+            results['widget change'].append(timed(lambda: age.set_value(25 + i % 50).run()))
+        results['run prediction'].append(timed(lambda: find_button(at, "Run Prediction").click().run()))
+        results['theme toggle'].append(timed(lambda: find_button(at, "Mode").click().run()))
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return results
+
+
+def summarise(results):
+    """Median CPU/wall ms per interaction"""
+    print(f"{'interaction':<16}{'n':>5}{'cpu ms':>10}{'wall ms':>10}")
+    for name, samples in results.items():
+        if not samples: # e.g. widget change when the widget sits in a form
+            continue
+        cpu = statistics.median(s[0] for s in samples)
+        wall = statistics.median(s[1] for s in samples)
+        print(f"{name:<16}{len(samples):>5}{cpu:>10.1f}{wall:>10.1f}")
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure server CPU per interaction for the Streamlit app")
+    parser.add_argument("--app", default="streamlit_app.py", help="path to the Streamlit script")
+    parser.add_argument("--repeats", type=int, default=20, help="interactions of each kind")
+    parser.add_argument("--timeout", type=float, default=30, help="seconds before a rerun counts as hung")
+    args = parser.parse_args(argv)
+    summarise(run_session(args.app, args.repeats, args.timeout))
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
@@ -0,0 +1,194 @@
+"""
+WARM-START MONTHLY RETRAINING FOR BANKCONVERT AI
+
+1. Why: a retrain today means re-running the whole notebook (4 model families + RandomizedSearchCV) from scratch.
+But the tuned Random Forest does not need re-tuning every month, it just needs to learn the latest outcomes.
+
+2. How:
+   - load best_model.pkl and keep its tuned hyperparameters (max_depth=15, class_weight='balanced' etc.)
+   - warm_start=True: ONLY the new trees are fitted, on the latest month's labelled customers
+   - the forest has a fixed tree budget, so the oldest trees are dropped once it is full
+     (estimators_ keeps fit order, so the oldest trees are at the front)
+   - same persisted scaler.pkl / feature_columns.pkl / thresholds.pkl for encoding, nothing is refitted there
+   - the refreshed forest and the current best_model.pkl are both scored on a holdout, and the new one only
+     replaces best_model.pkl if it is at least as good (the old file is kept as best_model.prev.pkl)
+
+Usage:
+    python retrain.py campaign-2026-10.csv --new-trees 20
+    python retrain.py all-campaigns.csv --month oct --dry-run
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import copy
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import average_precision_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.utils.class_weight import compute_class_weight
+
+from model_registry import read_pointer, register, resolve_artifact
+from scoring import (MODEL_PATH, RANDOM_STATE, TEST_SIZE, load_artifacts, load_labelled_data, load_thresholds,
+                     predict_probability, preprocess_batch)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+DEFAULT_NEW_TREES = 20 # trees fitted per retrain, i.e. the latest month gets 20% of the votes in a 100-tree forest
+BACKUP_SUFFIX = ".prev.pkl"
+METRICS = {
+    'f1': lambda y, p: f1_score(y, p > 0.5, zero_division=0),
+    'recall': lambda y, p: recall_score(y, p > 0.5, zero_division=0),
+    'precision': lambda y, p: precision_score(y, p > 0.5, zero_division=0),
+    'roc_auc': roc_auc_score,
+    'average_precision': average_precision_score,
+}
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: WARM START
+
+def grow_forest(model, X_new, y_new, new_trees=DEFAULT_NEW_TREES, max_trees=None, seed=None, n_jobs=-1):
+    """Copy of the forest with new_trees more trees fitted on (X_new, y_new), oldest trees dropped past max_trees"""
+    if not hasattr(model, 'estimators_') or not hasattr(model, 'warm_start'):
+        raise TypeError(f"Warm start needs a fitted forest, got {type(model).__name__}")
+    if y_new.nunique() < 2:
+        raise ValueError("New data needs both subscribers and non-subscribers to fit trees on")
+
+    max_trees = max_trees or len(model.estimators_)
+    grown = copy.deepcopy(model)
+    class_weight = grown.class_weight
+    # new seed per retrain, otherwise the same random_state would redraw the same bootstrap seeds every month
+    grown.set_params(warm_start=True, n_estimators=len(grown.estimators_) + new_trees, n_jobs=n_jobs,
+                     random_state=seed)
+    if class_weight == 'balanced':
+        # sklearn only warns about the 'balanced' preset with warm_start (weights come from this fit's data alone),
+        # explicit weights from the new month avoid that warning and keep its weighting deterministic
+        weights = compute_class_weight('balanced', classes=np.array([0, 1]), y=y_new)
+        grown.set_params(class_weight={0: weights[0], 1: weights[1]})
+    grown.fit(X_new, y_new) # warm_start: existing trees are kept, only the extra ones are fitted
+
+    if len(grown.estimators_) > max_trees:
+        grown.estimators_ = grown.estimators_[-max_trees:] # evict the oldest
+    grown.set_params(n_estimators=len(grown.estimators_), warm_start=False, class_weight=class_weight)
+    return grown
+
+
+def data_seed(X):
+    """Deterministic seed from the data itself, so the same month always gives the same trees"""
+    return int(pd.util.hash_pandas_object(X, index=False).sum() % (2 ** 32))
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: COMPARE + PROMOTE
+
+def evaluate(model, X, y):
+    """All METRICS for one model on encoded holdout rows"""
+    probability = predict_probability(model, X)
+    return {name: float(metric(y, probability)) for name, metric in METRICS.items()}
+
+
+def should_promote(current, candidate, metric='f1', min_gain=0.0):
+    """Candidate must be at least min_gain better on the chosen metric"""
+    return candidate[metric] >= current[metric] + min_gain
+
+
+def promote(model, model_path=MODEL_PATH, note="", metrics=None):
+    """With a models/ registry: new version that goes live (running apps hot-swap to it, rollback is one step).
+    Without one: keep the old model as .prev.pkl, then swap the new one in with temp file + rename"""
+    if read_pointer() is not None and model_path == MODEL_PATH:
+        source = os.path.dirname(resolve_artifact(MODEL_PATH)) # scaler etc. come from the live version
+        # decision_threshold.pkl / drift_reference.pkl / conformal.pkl belong to the old model, so they are not copied
+        return register(source, model=model, note=note, metrics=metrics, copy_extras=False)
+    if os.path.exists(model_path):
+        shutil.copy2(model_path, model_path.replace(".pkl", BACKUP_SUFFIX))
+    tmp = model_path + ".tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, model_path)
+    return model_path
+
+
+def retrain(csv_path, sep=";", month=None, holdout_path=None, new_trees=DEFAULT_NEW_TREES, max_trees=None,
+            metric='f1', min_gain=0.0, model_path=MODEL_PATH, dry_run=False, n_jobs=-1):
+    """Whole job: load -> encode with persisted artifacts -> grow -> compare -> maybe promote"""
+    model, scaler, feature_columns = load_artifacts(model_path)
+    emp_median, nr_median = load_thresholds()
+
+    X, y = load_labelled_data(csv_path, sep)
+    if month is not None:
+        keep = X['month'] == month
+        X, y = X[keep], y[keep]
+    if holdout_path is not None:
+        X_hold, y_hold = load_labelled_data(holdout_path, sep)
+    else:
+        # hold back part of the new month, same split settings as the notebook
+        X, X_hold, y, y_hold = train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=y)
+
+    encode = lambda frame: preprocess_batch(frame, feature_columns, scaler, emp_median, nr_median)
+    X_fit, X_eval = encode(X), encode(X_hold)
+
+    start = time.perf_counter()
+    candidate = grow_forest(model, X_fit, y, new_trees, max_trees, data_seed(X), n_jobs)
+    fit_seconds = time.perf_counter() - start
+
+    current_scores = evaluate(model, X_eval, y_hold)
+    candidate_scores = evaluate(candidate, X_eval, y_hold)
+    promoted = should_promote(current_scores, candidate_scores, metric, min_gain)
+    promoted_to = None
+    if promoted and not dry_run:
+        promoted_to = promote(candidate, model_path, f"warm-start +{new_trees} trees on {os.path.basename(csv_path)}",
+                              candidate_scores)
+
+    return {
+        'fit_rows': len(X_fit), 'holdout_rows': len(X_eval), 'fit_seconds': fit_seconds,
+        'trees': len(candidate.estimators_), 'current': current_scores, 'candidate': candidate_scores,
+        'promoted': promoted_to, 'would_promote': promoted,
+    }
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grow the Random Forest on the latest month's outcomes")
+    parser.add_argument("csv", help="labelled customers in the bank-additional-full.csv format")
+    parser.add_argument("--sep", default=";")
+    parser.add_argument("--month", help="only use rows of this month (e.g. oct)")
+    parser.add_argument("--holdout", help="separate labelled CSV to compare on (default: 30%% of the new data)")
+    parser.add_argument("--new-trees", type=int, default=DEFAULT_NEW_TREES)
+    parser.add_argument("--max-trees", type=int, help="tree budget (default: current forest size)")
+    parser.add_argument("--metric", default="f1", choices=sorted(METRICS), help="metric that decides promotion")
+    parser.add_argument("--min-gain", type=float, default=0.0, help="how much better the new forest must be")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--dry-run", action="store_true", help="compare only, never replace the model")
+    args = parser.parse_args(argv)
+
+    result = retrain(args.csv, args.sep, args.month, args.holdout, args.new_trees, args.max_trees, args.metric,
+                     args.min_gain, args.model, args.dry_run, args.n_jobs)
+
+    print(f"Fitted {args.new_trees} new trees on {result['fit_rows']:,} rows in {result['fit_seconds']:.1f}s "
+          f"-> {result['trees']} trees")
+    table = pd.DataFrame({'current': result['current'], 'candidate': result['candidate']})
+    table['change'] = table['candidate'] - table['current']
+    print(f"Holdout ({result['holdout_rows']:,} rows):")
+    print(table.round(4).to_string())
+    if result['promoted'] == args.model:
+        print(f"Promoted -> {args.model} (previous kept as {args.model.replace('.pkl', BACKUP_SUFFIX)})")
+    elif result['promoted']:
+        print(f"Promoted -> registry version {result['promoted']} (live, undo with: python model_registry.py rollback)")
+        print("Remember to rebuild decision_threshold.pkl, drift_reference.pkl, conformal.pkl, similar_index.pkl, "
+              "feature_importance.pkl and segment_report.pkl for the new model")
+    elif result['would_promote']:
+        print("Would promote (dry run, nothing written)")
+    else:
+        print(f"Kept current model: candidate {args.metric} not better by {args.min_gain}")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
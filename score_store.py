@@ -0,0 +1,216 @@
+"""
+PERSISTENT SCORE STORE FOR BANKCONVERT AI (SQLite, WAL mode)
+
+1. Why: predictions vanished after every Streamlit rerun, so RMs re-scored the same customers every day.
+
+2. How:
+   - scores.db keeps one row per (customer, model version): rm id, hash of the 18 raw inputs, probability, label, time
+   - WAL mode so the app can read "my top prospects" while a batch job is writing
+   - index (rm_id, probability DESC) -> top prospects is an index range scan, no sort, no model call
+   - unique index (customer_id, model_version) -> upserts + "is this score still valid?" lookups
+   - scores are keyed on the model version + sha256 of best_model.pkl / thresholds.pkl (version_key), so a model
+     replaced in place (no registry, version 'local') does not re-serve the old model's scores
+   - score_customers() only sends rows to the model whose input hash or model version changed since last time,
+     writes go in batches through executemany inside one transaction per batch
+
+Usage:
+    python score_store.py score customers.csv --id-col customer_id --rm-col rm_id
+    python score_store.py top RM001 --limit 20
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from scoring import RAW_COLUMNS, score_frame
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+DB_PATH = "scores.db"
+WRITE_BATCH = 5000 # rows per executemany / transaction
+DEFAULT_TOP = 20
+
+NUMERIC_INPUTS = ['age', 'pdays', 'previous', 'emp.var.rate', 'cons.price.idx', 'cons.conf.idx',
+                  'euribor3m', 'nr.employed']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    customer_id   TEXT    NOT NULL,
+    rm_id         TEXT,
+    model_version TEXT    NOT NULL,
+    input_hash    INTEGER NOT NULL,
+    probability   REAL    NOT NULL,
+    label         INTEGER NOT NULL,
+    scored_at     REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scores_rm_probability ON scores (rm_id, probability DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scores_customer_version ON scores (customer_id, model_version);
+"""
+
+UPSERT = """
+INSERT INTO scores (customer_id, rm_id, model_version, input_hash, probability, label, scored_at)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (customer_id, model_version) DO UPDATE SET
+    rm_id = excluded.rm_id, input_hash = excluded.input_hash, probability = excluded.probability,
+    label = excluded.label, scored_at = excluded.scored_at
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: INPUT HASH
+
+def input_hashes(customers):
+    """64-bit hash of each row's 18 raw inputs (numbers as float64, the rest as text, so 35 and 35.0 match)"""
+    normalised = pd.DataFrame({
+        col: customers[col].astype(np.float64) if col in NUMERIC_INPUTS else customers[col].astype(str)
+        for col in RAW_COLUMNS
+    })
+    # sqlite INTEGER is signed 64-bit, so reinterpret the uint64 hash
+    return pd.util.hash_pandas_object(normalised, index=False).to_numpy().view(np.int64)
+
+
+def version_key(model_version, model_sha256, thresholds_sha256):
+    """What saved scores are stored under. The version name alone is 'local' for every flat best_model.pkl, so the
+    sha256 of the model and thresholds files go in too: replacing either one never re-serves old scores"""
+    return f"{model_version}@{model_sha256[:16]}.{(thresholds_sha256 or 'none')[:16]}"
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: STORE
+
+class ScoreStore:
+    """One SQLite file shared by the app (many threads) and batch jobs, one connection per thread"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL") # readers do not block the writer and vice versa
+            conn.execute("PRAGMA synchronous=NORMAL") # safe with WAL, far fewer fsyncs
+            self._local.conn = conn
+        return conn
+
+    def stale_mask(self, customer_ids, hashes, model_version):
+        """True for rows that have no score for this model version, or whose inputs changed since"""
+        conn = self._conn()
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (pos INTEGER, customer_id TEXT, input_hash INTEGER)")
+        conn.execute("DELETE FROM incoming")
+        conn.executemany("INSERT INTO incoming VALUES (?, ?, ?)",
+                         zip(range(len(customer_ids)), map(str, customer_ids), map(int, hashes)))
+        # one join on the (customer_id, model_version) index instead of one lookup per customer
+        fresh = conn.execute("""
+            SELECT i.pos FROM incoming i
+            JOIN scores s ON s.customer_id = i.customer_id AND s.model_version = ?
+            WHERE s.input_hash = i.input_hash""", (model_version,)).fetchall()
+        conn.execute("DELETE FROM incoming")
+        mask = np.ones(len(customer_ids), dtype=bool)
+        mask[[pos for (pos,) in fresh]] = False
+        return mask
+
+    def write(self, customer_ids, rm_ids, hashes, probabilities, model_version, decision=0.5):
+        """Batched upserts, one transaction per WRITE_BATCH rows"""
+        now = time.time()
+        rows = list(zip(map(str, customer_ids), (None if pd.isna(r) else str(r) for r in rm_ids),
+                        [model_version] * len(customer_ids), map(int, hashes), map(float, probabilities),
+                        (int(p > decision) for p in probabilities), [now] * len(customer_ids)))
+        conn = self._conn()
+        for start in range(0, len(rows), WRITE_BATCH):
+            with conn: # commit per batch
+                conn.executemany(UPSERT, rows[start:start + WRITE_BATCH])
+        return len(rows)
+
+    def top_prospects(self, rm_id, model_version, limit=DEFAULT_TOP):
+        """Highest-probability customers of one RM, straight off the (rm_id, probability DESC) index"""
+        return pd.read_sql_query("""
+            SELECT customer_id, probability, label, scored_at FROM scores
+            WHERE rm_id = ? AND model_version = ?
+            ORDER BY probability DESC LIMIT ?""", self._conn(), params=(rm_id, model_version, limit))
+
+    def probabilities(self, model_version, rm_id=None):
+        """Every saved probability of one model version (one RM's if rm_id), e.g. as a campaign pool"""
+        query, params = "SELECT probability FROM scores WHERE model_version = ?", (model_version,)
+        if rm_id:
+            query, params = query + " AND rm_id = ?", params + (rm_id,)
+        return np.array([row[0] for row in self._conn().execute(query, params)], dtype=np.float64)
+
+    def lookup(self, customer_id, model_version):
+        """Stored score for one customer, or None"""
+        return self._conn().execute(
+            "SELECT probability, label, input_hash, scored_at FROM scores WHERE customer_id = ? AND model_version = ?",
+            (str(customer_id), model_version)).fetchone()
+
+    def prune(self, keep_version):
+        """Drop scores from other model versions (they are never served again)"""
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM scores WHERE model_version != ?", (keep_version,)).rowcount
+
+    def score_customers(self, customers, model, scaler, feature_columns, emp_median, nr_median, model_version,
+                        id_col="customer_id", rm_col="rm_id"):
+        """Score only new/changed customers and store them. Returns (rows scored, rows reused)"""
+        hashes = input_hashes(customers)
+        ids = customers[id_col].to_numpy()
+        stale = self.stale_mask(ids, hashes, model_version)
+        if stale.any():
+            changed = customers[stale]
+            probability, _ = score_frame(changed, model, scaler, feature_columns, emp_median, nr_median)
+            rm_ids = changed[rm_col].to_numpy() if rm_col in changed else [None] * len(changed)
+            self.write(ids[stale], rm_ids, hashes[stale], probability, model_version)
+        return int(stale.sum()), int((~stale).sum())
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent per-RM score store")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    score = sub.add_parser("score", help="score a customer CSV, re-using unchanged scores")
+    score.add_argument("csv")
+    score.add_argument("--sep", default=",")
+    score.add_argument("--id-col", default="customer_id")
+    score.add_argument("--rm-col", default="rm_id")
+    top = sub.add_parser("top", help="an RM's top prospects")
+    top.add_argument("rm_id")
+    top.add_argument("--limit", type=int, default=DEFAULT_TOP)
+    sub.add_parser("prune", help="drop scores of models that are no longer live")
+    args = parser.parse_args(argv)
+
+    from score_table import current_identity # imports this module, so only here
+    from scoring import load_artifacts, load_thresholds
+    identity = current_identity()
+    model_version = version_key(identity['model_version'], identity['model_sha256'], identity['thresholds_sha256'])
+    store = ScoreStore(args.db)
+
+    if args.command == "score":
+        model, scaler, feature_columns = load_artifacts()
+        emp_median, nr_median = load_thresholds()
+        customers = pd.read_csv(args.csv, sep=args.sep)
+        start = time.perf_counter()
+        scored, reused = store.score_customers(customers, model, scaler, feature_columns, emp_median, nr_median,
+                                               model_version, args.id_col, args.rm_col)
+        print(f"Model {model_version}: scored {scored:,}, reused {reused:,} unchanged "
+              f"in {time.perf_counter() - start:.2f}s")
+    elif args.command == "top":
+        start = time.perf_counter()
+        prospects = store.top_prospects(args.rm_id, model_version, args.limit)
+        print(prospects.to_string(index=False))
+        print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    else:
+        print(f"Removed {store.prune(model_version):,} scores from old model versions")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
@@ -0,0 +1,236 @@
+"""
+PRE-SCORED CUSTOMER BOOK FOR BANKCONVERT AI (columnar, delta refresh)
+
+1. Why: most customers' inputs do not change from one day to the next, yet looking one up in the Predict tab means
+typing all 18 fields and running the model again. The whole book can be scored once offline instead.
+
+2. How:
+   - score_table.parquet: one row per customer id -> segment, input fingerprint, probability (float32),
+     label (int8), scored_at. Rows are sorted by (segment, probability desc), so the top N of a segment is just
+     the first N rows of its range, no sort at read time
+   - 'by_id' column = row positions in customer id order -> a lookup by id is one binary search (searchsorted)
+   - the model version + sha256 of best_model.pkl and thresholds.pkl are kept in the Parquet metadata
+   - refresh: the book is read in chunks, each row's fingerprint (input_hashes from score_store.py) is compared
+     with last run's, and only new or changed rows go to the model. If the model version/file or
+     thresholds.pkl changed, every row is re-scored (economic_condition depends on the thresholds).
+     Customers no longer in the book are dropped
+   - written to a temp file + rename, so the app never reads a half-written table
+
+Usage (nightly):
+    python score_table.py refresh customers.csv --id-col customer_id --segment-col rm_id
+    python score_table.py lookup 12345
+    python score_table.py top RM001 --limit 20
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from batch_score import file_fingerprint
+from model_registry import LOCAL_VERSION, read_pointer, resolve_artifact
+from score_store import input_hashes
+from scoring import MODEL_PATH, THRESHOLDS_PATH, iter_csv_chunks, load_artifacts, load_thresholds, score_frame
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+TABLE_PATH = "score_table.parquet"
+DEFAULT_SEGMENT_COL = "rm_id" # each RM's book is their own segment
+NO_SEGMENT = "all" # segment of every row when the book has no segment column
+DEFAULT_TOP = 20
+META_KEY = b"score_table"
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: READ
+
+class ScoreTable:
+    """Loaded table: lookup by id + top N per segment, both without scanning the rows"""
+
+    def __init__(self, frame, meta):
+        self.frame = frame
+        self.meta = meta
+        ids = frame['customer_id'].to_numpy()
+        self.by_id = frame['by_id'].to_numpy()
+        self.sorted_ids = ids[self.by_id]
+        # rows are sorted by segment, so each segment is one contiguous range
+        segments, starts = np.unique(frame['segment'].to_numpy(), return_index=True)
+        ends = np.append(starts[1:], len(frame))
+        order = np.argsort(starts)
+        self.ranges = {segments[i]: (starts[i], ends[i]) for i in order}
+
+    def lookup(self, customer_id):
+        """Saved row for one customer (+ its rank in its segment) as a dict, or None"""
+        customer_id = str(customer_id)
+        i = np.searchsorted(self.sorted_ids, customer_id)
+        if i == len(self.sorted_ids) or self.sorted_ids[i] != customer_id:
+            return None
+        row = self.by_id[i]
+        record = self.frame.iloc[row].to_dict()
+        start, end = self.ranges[record['segment']]
+        record.update(rank=int(row - start) + 1, segment_rows=int(end - start))
+        return record
+
+    def top(self, segment, limit=DEFAULT_TOP):
+        start, end = self.ranges.get(segment, (0, 0))
+        return self.frame.iloc[start:min(start + limit, end)].drop(columns=['by_id', 'fingerprint'])
+
+    def segments(self):
+        return list(self.ranges)
+
+
+def read_meta(path=TABLE_PATH):
+    """Identity + stats of the saved table without reading its rows, or None"""
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except FileNotFoundError:
+        return None
+    return json.loads(metadata[META_KEY]) if META_KEY in metadata else None
+
+
+def load_table(path=TABLE_PATH):
+    """ScoreTable, or None if the book has not been scored yet"""
+    try:
+        frame = pq.read_table(path).to_pandas()
+    except FileNotFoundError:
+        return None
+    return ScoreTable(frame, read_meta(path))
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: DELTA REFRESH
+
+def current_identity():
+    """What every saved score depends on besides the customer's own inputs"""
+    thresholds_path = resolve_artifact(THRESHOLDS_PATH)
+    return {
+        'model_version': read_pointer() or LOCAL_VERSION,
+        'model_sha256': file_fingerprint(resolve_artifact(MODEL_PATH)),
+        'thresholds_sha256': file_fingerprint(thresholds_path) if os.path.exists(thresholds_path) else None,
+    }
+
+
+def write_table(frame, meta, path=TABLE_PATH):
+    """Sorted by (segment, probability desc) + by_id positions, temp file + rename"""
+    frame = frame.sort_values(['segment', 'probability'], ascending=[True, False], kind='stable',
+                              ignore_index=True)
+    frame['by_id'] = np.argsort(frame['customer_id'].to_numpy(), kind='stable').astype(np.int32)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), META_KEY: json.dumps(meta).encode()})
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return frame
+
+
+def refresh(book_path, path=TABLE_PATH, id_col="customer_id", segment_col=DEFAULT_SEGMENT_COL, sep=",",
+            full=False):
+    """Re-score new/changed customers of the book (all of them if the model or thresholds changed) -> meta"""
+    model, scaler, feature_columns = load_artifacts()
+    emp_median, nr_median = load_thresholds()
+    identity = current_identity()
+
+    previous, previous_meta = None, read_meta(path)
+    if full:
+        reason = "forced"
+    elif previous_meta is None:
+        reason = "first run"
+    elif any(previous_meta.get(k) != v for k, v in identity.items()):
+        reason = "model/thresholds changed"
+    else:
+        reason = None
+        previous = pq.read_table(path, columns=['customer_id', 'fingerprint', 'probability', 'label',
+                                                'scored_at']).to_pandas()
+    if previous is not None:
+        previous_index = pd.Index(previous['customer_id'])
+        previous_columns = {c: previous[c].to_numpy() for c in ['fingerprint', 'probability', 'label', 'scored_at']}
+
+    now = int(time.time())
+    parts, rescored = [], 0
+    for chunk in iter_csv_chunks(book_path, sep=sep):
+        ids = chunk[id_col].astype(str).to_numpy()
+        fingerprint = input_hashes(chunk)
+        probability = np.zeros(len(chunk), dtype=np.float32)
+        label = np.zeros(len(chunk), dtype=np.int8)
+        scored_at = np.full(len(chunk), now, dtype=np.int64)
+        stale = np.ones(len(chunk), dtype=bool)
+        if previous is not None:
+            positions = previous_index.get_indexer(ids)
+            found = positions >= 0
+            stale[found] = previous_columns['fingerprint'][positions[found]] != fingerprint[found]
+            keep = ~stale
+            for column, values in (('probability', probability), ('label', label), ('scored_at', scored_at)):
+                values[keep] = previous_columns[column][positions[keep]]
+        if stale.any():
+            p, y = score_frame(chunk[stale], model, scaler, feature_columns, emp_median, nr_median)
+            probability[stale], label[stale] = p, y
+            rescored += int(stale.sum())
+        segment = chunk[segment_col].astype(str).to_numpy() if segment_col in chunk else NO_SEGMENT
+        parts.append(pd.DataFrame({'customer_id': ids, 'segment': segment, 'fingerprint': fingerprint,
+                                   'probability': probability, 'label': label, 'scored_at': scored_at}))
+    if not parts:
+        raise SystemExit(f"{book_path} has no rows")
+
+    # a customer listed twice keeps its last row, ids must be unique for the lookup
+    frame = pd.concat(parts, ignore_index=True).drop_duplicates('customer_id', keep='last')
+    meta = dict(identity, built=now, rows=len(frame), rescored=rescored, reason=reason or "delta",
+                segment_col=segment_col, source=os.path.abspath(book_path))
+    write_table(frame, meta, path)
+    return meta
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-scored customer book with delta refresh")
+    parser.add_argument("--table", default=TABLE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("refresh", help="re-score new/changed customers of the book")
+    p.add_argument("book", help="customer CSV, the whole book")
+    p.add_argument("--id-col", default="customer_id")
+    p.add_argument("--segment-col", default=DEFAULT_SEGMENT_COL, help="top-N groups (skipped if not in the CSV)")
+    p.add_argument("--sep", default=",")
+    p.add_argument("--full", action="store_true", help="re-score every row even if nothing changed")
+
+    p = sub.add_parser("lookup", help="saved score of one customer")
+    p.add_argument("customer_id")
+
+    p = sub.add_parser("top", help="best prospects of one segment")
+    p.add_argument("segment")
+    p.add_argument("--limit", type=int, default=DEFAULT_TOP)
+
+    args = parser.parse_args(argv)
+    if args.command == "refresh":
+        start = time.perf_counter()
+        meta = refresh(args.book, args.table, args.id_col, args.segment_col, args.sep, args.full)
+        print(f"{meta['rows']:,} customers, re-scored {meta['rescored']:,} ({meta['reason']}) with model "
+              f"{meta['model_version']} in {time.perf_counter() - start:.1f}s -> {args.table}")
+        return
+
+    table = load_table(args.table)
+    if table is None:
+        raise SystemExit(f"{args.table} not found, run: python score_table.py refresh <book.csv>")
+    if args.command == "lookup":
+        start = time.perf_counter()
+        record = table.lookup(args.customer_id)
+        lookup_ms = (time.perf_counter() - start) * 1000
+        if record is None:
+            raise SystemExit(f"Customer {args.customer_id} is not in the table")
+        print(f"{record['customer_id']}: {record['probability']:.1%} (label {record['label']}), rank "
+              f"{record['rank']:,} of {record['segment_rows']:,} in {record['segment']}, scored "
+              f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(record['scored_at']))} [{lookup_ms:.3f} ms]")
+    else:
+        print(table.top(args.segment, args.limit).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
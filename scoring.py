@@ -0,0 +1,228 @@
+"""
+HEADLESS SCORING HELPERS FOR BANKCONVERT AI
+
+1. Same feature engineering + encoding as streamlit_app.py / jupyter notebook, but vectorised so can score
+a whole DataFrame of customers at once instead of one row from the Predict form.
+
+2. No streamlit import here on purpose, so batch jobs and CLI tools can reuse it without starting the app.
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from model_registry import resolve_artifact
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+# artifact files saved by the jupyter notebook
+MODEL_PATH = "best_model.pkl"
+SCALER_PATH = "scaler.pkl"
+FEATURE_COLUMNS_PATH = "feature_columns.pkl"
+THRESHOLDS_PATH = "thresholds.pkl"
+
+# same hardcoded last fallback as load_thresholds() in the app
+DEFAULT_EMP_MEDIAN = 1.1
+DEFAULT_NR_MEDIAN = 5191.0
+
+# 18 raw input columns (same as the Predict form, duration & campaign dropped for data leakage)
+RAW_COLUMNS = ['age', 'job', 'marital', 'education', 'default', 'housing', 'loan', 'contact',
+               'month', 'day_of_week', 'pdays', 'previous', 'poutcome', 'emp.var.rate',
+               'cons.price.idx', 'cons.conf.idx', 'euribor3m', 'nr.employed']
+
+# same split settings as the jupyter notebook
+TEST_SIZE = 0.3
+RANDOM_STATE = 2025
+
+# columns that get one-hot encoded (13 = 10 raw + 3 engineered)
+CATEGORICAL_COLS = ['job', 'marital', 'education', 'default', 'housing',
+                    'loan', 'contact', 'month', 'day_of_week', 'poutcome',
+                    'age_group', 'economic_condition', 'contact_recency']
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: LOADING ARTIFACTS (no streamlit)
+
+def load_artifacts(model_path=MODEL_PATH, scaler_path=SCALER_PATH, feature_columns_path=FEATURE_COLUMNS_PATH):
+    """Load model, scaler and feature column names saved by the notebook
+    (from the live models/ registry version when there is one, see model_registry.py)"""
+    model = joblib.load(resolve_artifact(model_path))
+    scaler = joblib.load(resolve_artifact(scaler_path))
+    feature_columns = joblib.load(resolve_artifact(feature_columns_path))
+    return model, scaler, feature_columns
+
+
+def load_thresholds(thresholds_path=THRESHOLDS_PATH):
+    """Load emp/nr medians for economic_condition, falls back to the hardcoded defaults"""
+    try:
+        thresholds = joblib.load(resolve_artifact(thresholds_path))
+        return thresholds['emp_median'], thresholds['nr_median']
+    except FileNotFoundError:
+        return DEFAULT_EMP_MEDIAN, DEFAULT_NR_MEDIAN
+
+
+def load_labelled_data(csv_path='bank-additional-full.csv', sep=';'):
+    """Same cleaning as the notebook -> X (raw columns), y. Works for the original dataset and for new campaign
+    exports in the same format"""
+    df = pd.read_csv(csv_path, sep=sep) # original dataset
+    df = df.drop_duplicates() # Removing duplicate rows
+    df = df.drop(['duration', 'campaign'], axis=1, errors='ignore') # Removing data leakage columns
+    y = (df['y'] == 'yes').astype(int) # Encoding target: yes to 1, no to 0
+    X = df.drop('y', axis=1)
+    return X, y
+
+
+def load_dataset_split(csv_path='bank-additional-full.csv', sep=';', test_size=TEST_SIZE, random_state=RANDOM_STATE):
+    """Same cleaning + stratified split as the notebook -> X_train, X_test, y_train, y_test (raw columns)"""
+    from sklearn.model_selection import train_test_split
+
+    X, y = load_labelled_data(csv_path, sep)
+    return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: VECTORISED FEATURE ENGINEERING
+
+def engineer_features(input_data, emp_median, nr_median):
+    """Adds the 5 engineered features to every row at once (same rules as create_feature_engineering)"""
+    df = input_data.copy() # avoid modifying og data
+
+    age = df['age'].to_numpy()
+    pdays = df['pdays'].to_numpy()
+    emp = df['emp.var.rate'].to_numpy()
+    nr = df['nr.employed'].to_numpy()
+
+    # Feature 1: Age Group (<=30 Young, <=45 Middle, <=60 Senior, else Elderly)
+    df['age_group'] = np.select([age <= 30, age <= 45, age <= 60], ['Young', 'Middle', 'Senior'], 'Elderly')
+
+    # Feature 2: Contacted Before
+    df['contacted_before'] = (pdays != 999).astype(int)
+
+    # Feature 3: Previous Success
+    df['prev_success'] = (df['poutcome'].to_numpy() == 'success').astype(int)
+
+    # Feature 4: Economic Condition (both above median Good, both at/below Bad, else Neutral)
+    emp_above = emp > emp_median
+    nr_above = nr > nr_median
+    df['economic_condition'] = np.select([emp_above & nr_above, ~emp_above & ~nr_above], ['Good', 'Bad'], 'Neutral')
+
+    # Feature 5: Contact Recency
+    df['contact_recency'] = np.select([pdays == 999, pdays <= 7, pdays <= 30], ['Never', 'Recent', 'Medium'], 'Long')
+
+    return df
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: ENCODING + SCALING
+
+def split_one_hot_column(col):
+    """'day_of_week_mon' -> ('day_of_week', 'mon'), returns None for non one-hot columns.
+    Longest prefix wins so that 'contact_recency_Never' is not read as contact = 'recency_Never'"""
+    matches = [c for c in CATEGORICAL_COLS if col.startswith(c + '_')]
+    if not matches:
+        return None
+    cat = max(matches, key=len)
+    return cat, col[len(cat) + 1:]
+
+
+def one_hot_levels(feature_columns, numerical_cols):
+    """{categorical: (its kept levels as a pd.Index, their positions in feature_columns)}"""
+    levels = {}
+    for i, col in enumerate(feature_columns):
+        parsed = None if col in numerical_cols else split_one_hot_column(col)
+        if parsed is not None:
+            levels.setdefault(parsed[0], ([], []))
+            levels[parsed[0]][0].append(parsed[1])
+            levels[parsed[0]][1].append(i)
+    return {cat: (pd.Index(names), np.asarray(positions, dtype=np.int32)) for cat, (names, positions) in levels.items()}
+
+
+def one_hot_positions(df, feature_columns, numerical_cols):
+    """(rows, categoricals) matrix: column of each row's level, -1 if the level was dropped by drop_first=True
+    (or never seen in training). Each column is factorized once, so only its few distinct values are looked up"""
+    blocks = []
+    for cat, (names, positions) in one_hot_levels(feature_columns, numerical_cols).items():
+        codes, uniques = pd.factorize(df[cat]) # missing values get code -1
+        found = names.get_indexer(uniques)
+        lookup = np.append(np.where(found >= 0, positions[found], -1), -1).astype(np.int32) # last slot for code -1
+        blocks.append(lookup[codes])
+    return np.column_stack(blocks) if blocks else np.empty((len(df), 0), dtype=np.int32)
+
+
+def encode_features(df, feature_columns, scaler, dtype=np.float64):
+    """Engineered DataFrame -> model matrix in feature_columns order.
+    Builds the one-hot columns directly from feature_columns instead of pd.get_dummies + reindex,
+    so the layout is always the training layout no matter which levels appear in the batch"""
+    X = np.zeros((len(df), len(feature_columns)), dtype=dtype)
+    numerical_cols = list(scaler.feature_names_in_)
+    position = {col: i for i, col in enumerate(feature_columns)}
+
+    # one-hot indicators (levels dropped by drop_first=True are simply all zeros)
+    hot = one_hot_positions(df, feature_columns, numerical_cols)
+    rows, cats = np.nonzero(hot >= 0)
+    X[rows, hot[rows, cats]] = 1
+
+    # scaling numerical since diff scale
+    scaled = scaler.transform(df[numerical_cols])
+    X[:, [position[c] for c in numerical_cols]] = scaled
+    return X
+
+
+def encode_features_sparse(df, feature_columns, scaler, dtype=np.float64):
+    """Same matrix as encode_features, built straight into scipy CSR: per row the 10 scaled numbers + one 1.0
+    per categorical whose level was kept (~20 stored values instead of 60), never a dense one-hot block"""
+    numerical_cols = list(scaler.feature_names_in_)
+    position = {col: i for i, col in enumerate(feature_columns)}
+    n_rows = len(df)
+
+    numeric_columns = np.broadcast_to(np.asarray([position[c] for c in numerical_cols], dtype=np.int32),
+                                      (n_rows, len(numerical_cols)))
+    hot = one_hot_positions(df, feature_columns, numerical_cols)
+    columns = np.hstack([numeric_columns, hot])
+    values = np.hstack([scaler.transform(df[numerical_cols]).astype(dtype, copy=False),
+                        np.ones(hot.shape, dtype=dtype)])
+
+    keep = columns >= 0 # row-major, so the kept entries come out grouped by row = CSR order
+    indptr = np.zeros(n_rows + 1, dtype=np.int32)
+    np.cumsum(keep.sum(axis=1), out=indptr[1:])
+    X = sparse.csr_matrix((values[keep], columns[keep], indptr), shape=(n_rows, len(feature_columns)))
+    X.sort_indices() # no-op for the notebook's column order, needed if feature_columns were ever reordered
+    return X
+
+
+def accepts_sparse(model):
+    """Linear models multiply CSR directly (only the stored values are touched). sklearn trees copy CSR into
+    their own float32 format and walk it slower than a dense row, so forests stay on the dense path"""
+    return hasattr(model, 'coef_')
+
+
+def preprocess_batch(input_data, feature_columns, scaler, emp_median, nr_median, sparse_output=False):
+    """Raw customer rows -> model matrix (batch version of preprocess_input in the app), CSR if sparse_output"""
+    df = engineer_features(input_data, emp_median, nr_median)
+    encode = encode_features_sparse if sparse_output else encode_features
+    return encode(df, feature_columns, scaler)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: SCORING
+
+def predict_probability(model, X):
+    """Probability of subscribing (class 1), same fallback as the app for models without predict_proba"""
+    if hasattr(model, 'predict_proba'):
+        return model.predict_proba(X)[:, 1]
+    return np.where(model.predict(X) == 1, 0.7, 0.3)
+
+
+def score_frame(input_data, model, scaler, feature_columns, emp_median, nr_median):
+    """Scores a DataFrame of raw customers, returns probability + label arrays"""
+    X = preprocess_batch(input_data, feature_columns, scaler, emp_median, nr_median, accepts_sparse(model))
+    probability = predict_probability(model, X)
+    prediction = (probability > 0.5).astype(int) # same tie-break as model.predict (argmax)
+    return probability, prediction
+
+
+def iter_csv_chunks(path, chunk_size=50000, **read_kwargs):
+    """Read a big customer file in chunks so memory stays bounded"""
+    return pd.read_csv(path, chunksize=chunk_size, **read_kwargs)
+#---------------------------------------------------------------------------------------------------------
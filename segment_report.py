@@ -0,0 +1,175 @@
+"""
+SEGMENT PERFORMANCE REPORT FOR BANKCONVERT AI
+
+1. Why: the Performance tab only has one recall / precision for the whole test set. A model can look fine overall
+and still miss most subscribers among e.g. students or telephone contacts, and a slice with 40 customers can
+look terrible by pure chance, so every number needs an uncertainty band.
+
+2. How:
+   - the live model scores the held-out 30% split once (same split as the notebook), at the 0.5 cut of model.predict
+   - every row belongs to one slice per dimension (job, age_group, contact, economic_condition). Each row gets an
+     outcome code (TN / FP / FN / TP) and all slices are counted in ONE groupby over a long frame of
+     (dimension, segment, outcome) -> recall, precision, support per slice
+   - bootstrap: ONE (n_boot x n) matrix of resampled row indices. Per dimension the resampled slice code and outcome
+     are folded into one integer (boot, slice, outcome) and counted with a single np.bincount, so all
+     n_boot x slices x 4 counts come out of one call, no Python loop over resamples or slices
+   - 95% percentile interval per slice; a slice is flagged when its whole recall interval sits below the overall
+     recall (the gap is not noise)
+   - saved as segment_report.pkl next to the live model with the model file's sha256, the app shows it in the
+     Performance tab when it belongs to the model being served
+
+Usage:
+    python segment_report.py bank-additional-full.csv --boot 1000
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from batch_score import file_fingerprint
+from model_registry import LOCAL_VERSION, read_pointer, resolve_artifact
+from scoring import MODEL_PATH, engineer_features, load_artifacts, load_dataset_split, load_thresholds, score_frame
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+REPORT_PATH = "segment_report.pkl"
+DIMENSIONS = ['job', 'age_group', 'contact', 'economic_condition']
+DEFAULT_BOOT = 1000
+DEFAULT_SEED = 0
+CONFIDENCE = 0.95
+TN, FP, FN, TP = range(4) # outcome code = 2 * actual + predicted
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: SLICE METRICS
+
+def slice_codes(frame, dimensions=DIMENSIONS):
+    """(rows x dimensions) int32 slice code per row + (dimension, segment) of every code, codes are global across
+    dimensions so one count array covers all slices"""
+    codes, keys, offset = [], [], 0
+    for dimension in dimensions:
+        code, segments = pd.factorize(frame[dimension].astype(str), sort=True)
+        codes.append(code + offset)
+        keys.extend((dimension, segment) for segment in segments)
+        offset += len(segments)
+    return np.column_stack(codes).astype(np.int32), pd.MultiIndex.from_tuples(keys, names=['dimension', 'segment'])
+
+
+def rates(counts):
+    """(..., 4) outcome counts -> recall, precision (NaN where undefined)"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tp = counts[..., TP]
+        return tp / (tp + counts[..., FN]), tp / (tp + counts[..., FP])
+
+
+def slice_metrics(frame, outcome, dimensions=DIMENSIONS):
+    """One groupby over (dimension, segment, outcome) for every slice -> rows, subscribers, recall, precision"""
+    long = pd.concat([pd.DataFrame({'dimension': d, 'segment': frame[d].astype(str).to_numpy(), 'outcome': outcome})
+                      for d in dimensions], ignore_index=True)
+    counts = (long.groupby(['dimension', 'segment', 'outcome']).size()
+              .unstack('outcome', fill_value=0).reindex(columns=range(4), fill_value=0))
+    recall, precision = rates(counts.to_numpy())
+    return pd.DataFrame({'rows': counts.sum(axis=1), 'subscribers': counts[TP] + counts[FN],
+                         'recall': recall, 'precision': precision}, index=counts.index)
+
+
+def bootstrap_intervals(codes, outcome, slices, n_boot=DEFAULT_BOOT, confidence=CONFIDENCE, seed=DEFAULT_SEED):
+    """Percentile intervals of recall + precision per slice from one (n_boot x n) resample matrix"""
+    rng = np.random.default_rng(seed)
+    n = len(outcome)
+    idx = rng.integers(0, n, (n_boot, n), dtype=np.int32)
+    resampled_outcome = outcome[idx] # (n_boot x n)
+    boot_base = (np.arange(n_boot, dtype=np.int64) * slices * 4)[:, None]
+    counts = np.zeros(n_boot * slices * 4, dtype=np.int64)
+    for d in range(codes.shape[1]):
+        # (boot, slice, outcome) -> one flat bin, slices of different dimensions never share a bin
+        counts += np.bincount((boot_base + codes[idx, d].astype(np.int64) * 4 + resampled_outcome).ravel(),
+                              minlength=counts.size)
+    recall, precision = rates(counts.reshape(n_boot, slices, 4))
+    tail = (1 - confidence) / 2 * 100
+    with np.errstate(invalid='ignore'):
+        recall_ci = np.nanpercentile(recall, [tail, 100 - tail], axis=0)
+        precision_ci = np.nanpercentile(precision, [tail, 100 - tail], axis=0)
+    return recall_ci, precision_ci
+
+
+def segment_report(frame, y, predicted, dimensions=DIMENSIONS, n_boot=DEFAULT_BOOT, seed=DEFAULT_SEED):
+    """Slice table with 95% intervals + the overall recall / precision"""
+    outcome = (2 * np.asarray(y, dtype=np.int8) + np.asarray(predicted, dtype=np.int8)).astype(np.int8)
+    codes, keys = slice_codes(frame, dimensions)
+    table = slice_metrics(frame, outcome, dimensions).reindex(keys)
+    recall_ci, precision_ci = bootstrap_intervals(codes, outcome, len(keys), n_boot, seed=seed)
+    table['recall_low'], table['recall_high'] = recall_ci
+    table['precision_low'], table['precision_high'] = precision_ci
+
+    overall_recall, overall_precision = rates(np.bincount(outcome, minlength=4))
+    table['below_overall'] = table['recall_high'] < overall_recall
+    columns = ['rows', 'subscribers', 'recall', 'recall_low', 'recall_high', 'precision', 'precision_low',
+               'precision_high', 'below_overall']
+    return table[columns].reset_index(), float(overall_recall), float(overall_precision)
+
+
+def save_report(result, path=REPORT_PATH):
+    tmp = path + ".tmp"
+    joblib.dump(result, tmp)
+    os.replace(tmp, path)
+
+
+def load_report(path=REPORT_PATH):
+    """Saved report, or None if segment_report.py has not been run for this model"""
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return None
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recall / precision per customer segment with bootstrap intervals")
+    parser.add_argument("csv", nargs="?", default="bank-additional-full.csv", help="original dataset")
+    parser.add_argument("--sep", default=";")
+    parser.add_argument("--boot", type=int, default=DEFAULT_BOOT, help="bootstrap resamples")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", default=None, help="default: segment_report.pkl next to the live model")
+    args = parser.parse_args(argv)
+
+    model_path = resolve_artifact(MODEL_PATH)
+    output = args.output or os.path.join(os.path.dirname(model_path), REPORT_PATH)
+    model, scaler, feature_columns = load_artifacts()
+    emp_median, nr_median = load_thresholds()
+    _, X_test, _, y_test = load_dataset_split(args.csv, args.sep)
+    _, predicted = score_frame(X_test, model, scaler, feature_columns, emp_median, nr_median)
+    frame = engineer_features(X_test, emp_median, nr_median) # age_group + economic_condition slices
+
+    start = time.perf_counter()
+    table, recall, precision = segment_report(frame, y_test.to_numpy(), predicted, n_boot=args.boot, seed=args.seed)
+    seconds = time.perf_counter() - start
+    save_report({
+        'model_version': read_pointer() or LOCAL_VERSION,
+        'model_sha256': file_fingerprint(model_path),
+        'rows': len(y_test), 'boot': args.boot, 'confidence': CONFIDENCE,
+        'recall': recall, 'precision': precision, 'table': table,
+        'built': time.strftime("%Y-%m-%d %H:%M:%S"), 'seconds': seconds,
+    }, output)
+
+    print(f"{len(table)} slices, {args.boot:,} resamples of {len(y_test):,} held-out rows in {seconds:.2f}s "
+          f"(overall recall {recall:.1%}, precision {precision:.1%})")
+    print(table.round(3).to_string(index=False))
+    flagged = table[table['below_overall']]
+    for row in flagged.itertuples():
+        print(f"⚠️ {row.dimension}={row.segment}: recall {row.recall:.1%} "
+              f"({row.recall_low:.1%}-{row.recall_high:.1%}) below overall {recall:.1%}")
+    print(f"Saved -> {output}")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
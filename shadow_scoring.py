@@ -0,0 +1,222 @@
+"""
+SHADOW SCORING FOR BANKCONVERT AI
+
+1. Why: before a retrained model is promoted it should see real traffic, not just a holdout split.
+
+2. How:
+   - the candidate is a registered but not live version named in models/SHADOW (python model_registry.py shadow v0003)
+   - Predict tab: the primary prediction is made as usual, then the same customer row is handed to a single background
+     thread that scores it with the candidate. The primary path only does a None check + executor submit, and if
+     the shadow thread falls behind, rows are dropped instead of queued forever
+   - batch_score.py: shadow shards are queued AFTER all primary shards, so the primary Parquet file is merged and
+     published first and the candidate runs on whatever CPU is left
+   - every pair is appended to shadow_log.bin as a fixed 21-byte record (time, source, both versions, both
+     probabilities), one write per batch under a cross-process file lock (the app and batch_score.py both append).
+     A torn record left by a crash mid-write is cut off before the next append, so later records stay aligned,
+     and read back with np.frombuffer
+   - summarise() turns the log into disagreement rate + probability deltas for the app's Drift tab
+
+Usage:
+    python shadow_scoring.py report
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from drift_monitor import state_lock
+from inference_governor import BATCH, GovernedModel, pin_model
+from model_registry import DEFAULT_POLL_SECONDS, REGISTRY_DIR, SHADOW_POINTER, ModelHandle
+from scoring import DEFAULT_EMP_MEDIAN, DEFAULT_NR_MEDIAN, accepts_sparse, predict_probability, preprocess_batch
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+SHADOW_LOG = "shadow_log.bin"
+SOURCE_APP, SOURCE_BATCH = 0, 1
+SOURCE_NAMES = {SOURCE_APP: "app", SOURCE_BATCH: "batch"}
+
+# packed record (numpy structured dtypes have no padding unless align=True) -> 21 bytes per scored customer
+RECORD = np.dtype([('time', '<f8'), ('source', 'u1'), ('primary_version', '<u2'), ('shadow_version', '<u2'),
+                   ('primary', '<f4'), ('shadow', '<f4')])
+
+DECISION = 0.5 # same cut as model.predict, a disagreement = the two models give different yes/no
+MAX_PENDING = 256 # Predict-tab rows waiting for the shadow thread before new ones are dropped
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: LOG (append-only fixed-size records)
+
+def version_number(version):
+    """'v0007' -> 7, anything else ('local') -> 0, so versions fit in 2 bytes"""
+    return int(version[1:]) if version and version[0] == "v" and version[1:].isdigit() else 0
+
+
+def make_records(primary, shadow, source, primary_version, shadow_version):
+    records = np.empty(len(primary), dtype=RECORD)
+    records['time'] = time.time()
+    records['source'] = source
+    records['primary_version'] = version_number(primary_version)
+    records['shadow_version'] = version_number(shadow_version)
+    records['primary'] = primary
+    records['shadow'] = shadow
+    return records
+
+
+def append_records(records, path=SHADOW_LOG):
+    """One write per batch in append mode, under <log>.lock so the app's shadow thread and batch_score.py runs never
+    interleave. A partial record from a crash is truncated first, else every later record would be misaligned"""
+    with state_lock(path), open(path, "ab") as f:
+        torn = f.seek(0, os.SEEK_END) % RECORD.itemsize
+        if torn:
+            f.truncate(f.tell() - torn)
+        f.write(records.tobytes())
+
+
+def read_records(path=SHADOW_LOG):
+    """Whole log as a structured array (a torn last record not yet cut off by the next append is ignored)"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return np.empty(0, dtype=RECORD)
+    whole = len(data) - len(data) % RECORD.itemsize
+    return np.frombuffer(data[:whole], dtype=RECORD)
+
+
+def summarise(records, decision=DECISION):
+    """Overall numbers + one row per (candidate version, source)"""
+    if not len(records):
+        return None, pd.DataFrame()
+    primary = records['primary'].astype(np.float64)
+    shadow = records['shadow'].astype(np.float64)
+    delta = shadow - primary
+    frame = pd.DataFrame({
+        'candidate': [f"v{v:04d}" for v in records['shadow_version']],
+        'source': pd.Series(records['source']).map(SOURCE_NAMES),
+        'disagree': (primary > decision) != (shadow > decision),
+        'up': (shadow > decision) & (primary <= decision), # candidate says yes, live model says no
+        'delta': delta,
+        'abs_delta': np.abs(delta),
+    })
+    overall = {
+        'rows': len(records),
+        'disagreement_rate': float(frame['disagree'].mean()),
+        'flips_up': int(frame['up'].sum()),
+        'flips_down': int((frame['disagree'] & ~frame['up']).sum()),
+        'mean_delta': float(delta.mean()),
+        'mean_abs_delta': float(frame['abs_delta'].mean()),
+        'p95_abs_delta': float(np.percentile(frame['abs_delta'], 95)),
+        'first': float(records['time'].min()),
+        'last': float(records['time'].max()),
+    }
+    by_group = frame.groupby(['candidate', 'source']).agg(
+        rows=('delta', 'size'), disagreement_rate=('disagree', 'mean'), mean_delta=('delta', 'mean'),
+        mean_abs_delta=('abs_delta', 'mean')).reset_index()
+    return overall, by_group
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: CANDIDATE SCORING
+
+def score_candidate(bundle, customers):
+    """Candidate probabilities with the candidate's OWN scaler / feature columns / thresholds"""
+    emp_median, nr_median = bundle['thresholds'] or (DEFAULT_EMP_MEDIAN, DEFAULT_NR_MEDIAN)
+    X = preprocess_batch(customers, bundle['feature_columns'], bundle['scaler'], emp_median, nr_median,
+                         accepts_sparse(bundle['model']))
+    return predict_probability(bundle['model'], X)
+
+
+class ShadowScorer:
+    """Background candidate scoring for a long-running process (the Streamlit app)"""
+
+    def __init__(self, log_path=SHADOW_LOG, registry=REGISTRY_DIR, poll_seconds=DEFAULT_POLL_SECONDS,
+                 max_pending=MAX_PENDING, governor=None):
+        self.log_path = log_path
+        self.max_pending = max_pending
+        self.governor = governor # if set, candidate scoring queues as batch work behind the RMs' requests
+        self.handle = ModelHandle(registry, poll_seconds, pointer=SHADOW_POINTER)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        self.handle.start()
+        return self
+
+    def candidate(self):
+        bundle = self.handle.get()
+        return None if bundle is None else bundle['version']
+
+    def submit(self, customers, primary_probabilities, primary_version, source=SOURCE_APP):
+        """Called on the primary path: never scores anything itself, returns straight away"""
+        if self.handle.get() is None:
+            return False
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.pending += 1
+        primary = np.asarray(primary_probabilities, dtype=np.float32).ravel()
+        self.executor.submit(self._score, customers, primary, primary_version, source)
+        return True
+
+    def _score(self, customers, primary, primary_version, source):
+        try:
+            bundle = self.handle.get()
+            if bundle is not None:
+                if self.governor is None:
+                    shadow = score_candidate(bundle, customers)
+                else:
+                    # encoded on this thread, predict_proba in BATCH_CHUNK_ROWS chunks so a big upload never holds a
+                    # batch worker for the whole list
+                    pin_model(bundle['model'])
+                    shadow = score_candidate({**bundle, 'model': GovernedModel(bundle['model'], self.governor, BATCH)},
+                                             customers)
+                append_records(make_records(primary, shadow, source, primary_version, bundle['version']),
+                               self.log_path)
+        except Exception:
+            self.errors += 1 # shadow problems must never reach the RM
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shadow model comparison log")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="summarise the shadow log")
+    report.add_argument("--log", default=SHADOW_LOG)
+    clear = sub.add_parser("clear", help="start a new shadow log")
+    clear.add_argument("--log", default=SHADOW_LOG)
+    args = parser.parse_args(argv)
+
+    if args.command == "clear":
+        if os.path.exists(args.log):
+            os.remove(args.log)
+        print(f"Removed {args.log}")
+        return
+
+    overall, by_group = summarise(read_records(args.log))
+    if overall is None:
+        raise SystemExit(f"No shadow records in {args.log}")
+    print(f"{overall['rows']:,} customers scored by both models | disagreement {overall['disagreement_rate']:.2%} "
+          f"({overall['flips_up']} candidate-only yes, {overall['flips_down']} live-only yes)")
+    print(f"probability delta (candidate - live): mean {overall['mean_delta']:+.4f}, "
+          f"mean |delta| {overall['mean_abs_delta']:.4f}, p95 |delta| {overall['p95_abs_delta']:.4f}")
+    print(by_group.round(4).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
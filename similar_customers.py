@@ -0,0 +1,230 @@
+"""
+SIMILAR-CUSTOMER INDEX FOR BANKCONVERT AI
+
+1. Why: RMs want "customers like this one who subscribed" next to a prediction. Scanning all 41k historical rows
+(60 encoded columns each) on every click costs a few ms per customer and grows with the history.
+
+2. How (built offline, queried in well under a millisecond):
+   - history is encoded exactly like the model input (engineer_features + encode_features with the live
+     feature_columns.pkl / scaler.pkl), so "similar" means close in the space the model sees
+   - PCA down to 16 dimensions (one SVD, ~80% of the variance) and a BallTree on that embedding, one for all
+     customers and one for subscribers only
+   - a query takes 10x the neighbours asked for from the small tree, then re-ranks those candidates by the real
+     distance over all 60 columns (approximate: a true neighbour is only missed if PCA squeezed it out of the
+     candidate list)
+   - saved as similar_index.pkl next to the model artifacts, with each historical customer's outcome + a few
+     profile columns to show. It is tied to the feature columns it was built with and to the sha256 of the model,
+     scaler and thresholds files (a retrain that refits scaler.pkl keeps the columns but moves every customer)
+
+Usage:
+    python similar_customers.py build bank-additional-full.csv --sep ";"
+    python similar_customers.py query customers.csv similar.parquet --k 10
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sklearn.neighbors import BallTree
+
+from batch_score import file_fingerprint
+from model_registry import resolve_artifact
+from scoring import (MODEL_PATH, SCALER_PATH, THRESHOLDS_PATH, iter_csv_chunks, load_artifacts, load_labelled_data,
+                     load_thresholds, preprocess_batch)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+INDEX_PATH = "similar_index.pkl"
+DEFAULT_DIMS = 16
+DEFAULT_K = 5
+CANDIDATE_FACTOR = 10 # candidates taken from the reduced tree per neighbour asked for
+QUERY_BLOCK_ROWS = 1024 # rows re-ranked at a time in bulk queries, keeps (rows x candidates x 60) small
+
+# artifact files the encoding (and so the index) depends on -> key of their sha256 in the index
+ENCODING_FILES = {'model_sha256': MODEL_PATH, 'scaler_sha256': SCALER_PATH, 'thresholds_sha256': THRESHOLDS_PATH}
+
+# shown next to each neighbour in the app
+PROFILE_COLUMNS = ['age', 'job', 'marital', 'education', 'contact', 'month', 'poutcome']
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: BUILD
+
+def build_index(X, y, profiles, feature_columns, dims=DEFAULT_DIMS, ids=None):
+    """X = encoded history (rows x feature_columns), y = 0/1 outcome, profiles = raw columns to show"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.int8)
+    mean = X.mean(axis=0)
+    _, singular, components = np.linalg.svd(X - mean, full_matrices=False)
+    projection = np.ascontiguousarray(components[:dims].T)
+    embedding = (X - mean) @ projection
+    subscribers = np.flatnonzero(y == 1)
+    return {
+        'feature_columns': list(feature_columns),
+        'mean': mean,
+        'projection': projection,
+        'explained': float((singular[:dims] ** 2).sum() / (singular ** 2).sum()),
+        'X': X,
+        'y': y,
+        'ids': np.arange(len(X)) if ids is None else np.asarray(ids),
+        'profiles': profiles.reset_index(drop=True),
+        'trees': {'all': BallTree(embedding), 'subscribed': BallTree(embedding[subscribers])},
+        'rows': {'all': np.arange(len(X)), 'subscribed': subscribers}, # tree position -> history row
+        'built': time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def save_index(index, path=INDEX_PATH):
+    tmp = path + ".tmp"
+    joblib.dump(index, tmp)
+    os.replace(tmp, path)
+
+
+def load_index(path=INDEX_PATH):
+    """Saved index, or None if it has not been built"""
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return None
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: QUERY
+
+def query_index(index, X, k=DEFAULT_K, subscribed_only=False):
+    """k nearest historical customers for every row of X (encoded) -> (history rows, distances), both (n x k),
+    nearest first"""
+    group = 'subscribed' if subscribed_only else 'all'
+    tree, tree_rows = index['trees'][group], index['rows'][group]
+    k = min(k, len(tree_rows))
+    n_candidates = min(k * CANDIDATE_FACTOR, len(tree_rows))
+    X = np.asarray(X, dtype=np.float32)
+    rows = np.empty((len(X), k), dtype=np.int64)
+    distances = np.empty((len(X), k))
+    for start in range(0, len(X), QUERY_BLOCK_ROWS):
+        block = slice(start, start + QUERY_BLOCK_ROWS)
+        embedded = (X[block] - index['mean']) @ index['projection']
+        # dual-tree walks the query rows as a tree too, ~25% faster for bulk blocks
+        candidates = tree_rows[tree.query(embedded, n_candidates, return_distance=False, dualtree=len(embedded) > 1)]
+        # re-rank on the full encoded vectors
+        full = np.sqrt(((index['X'][candidates] - X[block, None, :]) ** 2).sum(axis=2))
+        best = np.argsort(full, axis=1)[:, :k]
+        rows[block] = np.take_along_axis(candidates, best, axis=1)
+        distances[block] = np.take_along_axis(full, best, axis=1)
+    return rows, distances
+
+
+def neighbours_frame(index, rows, distances):
+    """One customer's neighbours as a small table for the app"""
+    frame = index['profiles'].iloc[rows].reset_index(drop=True)
+    frame.insert(0, 'distance', np.round(distances, 2))
+    frame['subscribed'] = np.where(index['y'][rows] == 1, "yes", "no")
+    return frame
+
+
+def encoding_fingerprints():
+    """sha256 of the live model / scaler / thresholds files (None for a missing one), stored in the index"""
+    fingerprints = {}
+    for key, name in ENCODING_FILES.items():
+        try:
+            fingerprints[key] = file_fingerprint(resolve_artifact(name))
+        except FileNotFoundError:
+            fingerprints[key] = None
+    return fingerprints
+
+
+def check_index(index, feature_columns, fingerprints):
+    """The index only makes sense in the encoding it was built with: same columns AND same scaler / thresholds /
+    model files (by sha256, an index from before this was stored never matches)"""
+    return (index is not None and index['feature_columns'] == list(feature_columns)
+            and all(index.get(key) == sha for key, sha in fingerprints.items()))
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: CLI
+
+def build(args):
+    _, scaler, feature_columns = load_artifacts()
+    emp_median, nr_median = load_thresholds()
+    X_raw, y = load_labelled_data(args.csv, args.sep)
+    X = preprocess_batch(X_raw, feature_columns, scaler, emp_median, nr_median)
+    ids = X_raw[args.id_col].to_numpy() if args.id_col else None
+    start = time.perf_counter()
+    index = build_index(X, y, X_raw[PROFILE_COLUMNS], feature_columns, args.dims, ids)
+    index.update(encoding_fingerprints())
+    save_index(index, args.output)
+    print(f"Indexed {len(y):,} customers ({int(y.sum()):,} subscribers) in {time.perf_counter() - start:.1f}s, "
+          f"{args.dims} dims keep {index['explained']:.0%} of the variance -> {args.output}")
+
+
+def query(args):
+    _, scaler, feature_columns = load_artifacts()
+    emp_median, nr_median = load_thresholds()
+    index = load_index(args.index)
+    if index is None:
+        raise SystemExit(f"{args.index} not found, run: python similar_customers.py build")
+    if not check_index(index, feature_columns, encoding_fingerprints()):
+        raise SystemExit(f"{args.index} was built with another model / scaler / feature columns, rebuild it for "
+                         f"this model")
+
+    tmp = args.output + ".tmp"
+    writer = None
+    rows_done = 0
+    start = time.perf_counter()
+    for chunk in iter_csv_chunks(args.input, sep=args.sep):
+        X = preprocess_batch(chunk, feature_columns, scaler, emp_median, nr_median)
+        rows, distances = query_index(index, X, args.k)
+        nearest, nearest_distance = query_index(index, X, 1, subscribed_only=True)
+        table = pa.table({
+            'row': np.arange(rows_done, rows_done + len(chunk), dtype=np.int64),
+            'similar_ids': pa.array(list(index['ids'][rows])),
+            'similar_subscribed': index['y'][rows].mean(axis=1), # share of the k nearest who subscribed
+            'nearest_subscriber_id': index['ids'][nearest[:, 0]],
+            'nearest_subscriber_distance': nearest_distance[:, 0],
+        })
+        if writer is None:
+            writer = pq.ParquetWriter(tmp, table.schema)
+        writer.write_table(table)
+        rows_done += len(chunk)
+    if writer is None:
+        raise SystemExit(f"{args.input} has no rows")
+    writer.close()
+    os.replace(tmp, args.output)
+    elapsed = time.perf_counter() - start
+    print(f"{rows_done:,} customers, {args.k} neighbours each in {elapsed:.1f}s "
+          f"({elapsed / max(rows_done, 1) * 1e3:.3f} ms per customer) -> {args.output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Approximate nearest-neighbour index over historical customers")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="index the labelled history with the live encoding")
+    p.add_argument("csv", nargs="?", default="bank-additional-full.csv")
+    p.add_argument("--sep", default=";")
+    p.add_argument("--dims", type=int, default=DEFAULT_DIMS, help="PCA dimensions of the tree")
+    p.add_argument("--id-col", default=None, help="customer id column to report instead of row numbers")
+    p.add_argument("--output", default=INDEX_PATH)
+
+    p = sub.add_parser("query", help="bulk neighbours for a customer CSV -> Parquet")
+    p.add_argument("input")
+    p.add_argument("output")
+    p.add_argument("--sep", default=",")
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--index", default=INDEX_PATH)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        build(args)
+    else:
+        query(args)
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
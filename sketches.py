@@ -0,0 +1,236 @@
+"""
+CONSTANT-MEMORY STREAMING SKETCHES FOR BANKCONVERT AI
+
+1. QuantileSketch: KLL-style quantile sketch for numerical columns. Memory stays around a few times k values no
+matter how many rows are added, answers quantile / cdf queries with small rank error, and two sketches built on
+different chunks (or processes) can be merged into one.
+
+2. CountingQuantile: exact quantiles from value counts for columns with few distinct values, turns into a
+QuantileSketch once there are too many, so memory stays bounded either way.
+
+3. CategoryCounter: counts per category level (a handful of levels per column, so constant memory too).
+
+4. All take whole numpy arrays / Series per update so they can sit on the batch scoring path cheaply.
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: QUANTILE SKETCH
+
+class QuantileSketch:
+    """KLL sketch: level h holds items that each stand for 2**h original values.
+    When a level gets too big it is sorted and every other item (random start) is promoted to the next level"""
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # top level gets k, each level below gets 2/3 of the one above (min 2)
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # odd item stays behind so total weight is kept exactly
+                keep = items[:1] if len(items) % 2 else items[:0]
+                pairs = items[len(keep):]
+                promoted = pairs[self._rng.integers(2)::2]
+                self.levels[level] = keep
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        """Add a batch of values (NaN are ignored)"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def update_counts(self, values, counts):
+        """Add each value counts times without expanding: bit h of a count puts one item on level h (weight 2**h)"""
+        values = np.asarray(values, dtype=np.float64)
+        counts = np.asarray(counts, dtype=np.int64)
+        if not counts.sum():
+            return self
+        self.count += int(counts.sum())
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        for h in range(int(counts.max()).bit_length()):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], values[((counts >> h) & 1) == 1]])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one (sketches from parallel chunks)"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind='mergesort')
+        return items[order], weights[order]
+
+    def cdf(self, x):
+        """Estimated fraction of values <= x (x can be an array)"""
+        x = np.asarray(x, dtype=np.float64)
+        if not self.count:
+            return np.zeros_like(x)
+        items, weights = self._weighted_items()
+        cumulative = np.concatenate([[0.0], np.cumsum(weights)])
+        return cumulative[np.searchsorted(items, x, side='right')] / cumulative[-1]
+
+    def quantile(self, q):
+        """Estimated q-quantile (q can be an array)"""
+        q = np.asarray(q, dtype=np.float64)
+        if not self.count:
+            return np.full_like(q, np.nan)
+        items, weights = self._weighted_items()
+        cumulative = np.cumsum(weights) / weights.sum()
+        idx = np.minimum(np.searchsorted(cumulative, q, side='left'), len(items) - 1)
+        result = items[idx]
+        # exact ends
+        return np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+
+    def size(self):
+        """Items held in memory"""
+        return sum(len(lvl) for lvl in self.levels)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_rng')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._rng = np.random.default_rng()
+
+
+class CountingQuantile:
+    """Exact value counts while a column has at most max_distinct distinct values (e.g. emp.var.rate and
+    nr.employed have ~10 in the bank data), switches to a QuantileSketch past that. Exact mode matters for
+    medians of tie-heavy columns: the true median can sit right at a step of the cdf, where any rank error
+    picks the neighbouring value"""
+
+    def __init__(self, k=200, max_distinct=1000, seed=None):
+        self.max_distinct = max_distinct
+        self.values = np.empty(0)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.sketch = None
+        self.k, self.seed = k, seed
+
+    def _add_counts(self, values, counts):
+        if self.sketch is not None:
+            self.sketch.update_counts(values, counts)
+            return
+        values, inverse = np.unique(np.concatenate([self.values, values]), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]),
+                                  minlength=len(values)).astype(np.int64)
+        self.values = values
+        if len(values) > self.max_distinct:
+            self.sketch = QuantileSketch(self.k, self.seed).update_counts(self.values, self.counts)
+            self.values, self.counts = np.empty(0), np.empty(0, dtype=np.int64)
+
+    def update(self, values):
+        """Add a batch of values (NaN are ignored)"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values, counts = np.unique(values[~np.isnan(values)], return_counts=True)
+        self._add_counts(values, counts)
+        return self
+
+    def merge(self, other):
+        if other.sketch is not None:
+            if self.sketch is None:
+                self.sketch = QuantileSketch(self.k, self.seed).update_counts(self.values, self.counts)
+                self.values, self.counts = np.empty(0), np.empty(0, dtype=np.int64)
+            self.sketch.merge(other.sketch)
+        else:
+            self._add_counts(other.values, other.counts)
+        return self
+
+    @property
+    def count(self):
+        return self.sketch.count if self.sketch is not None else int(self.counts.sum())
+
+    def is_exact(self):
+        return self.sketch is None
+
+    def quantile(self, q):
+        """Same as np.quantile / pandas .quantile (linear interpolation) in exact mode"""
+        if self.sketch is not None:
+            return self.sketch.quantile(q)
+        q = np.asarray(q, dtype=np.float64)
+        if not len(self.values):
+            return np.full_like(q, np.nan)
+        cumulative = np.cumsum(self.counts)
+        position = q * (cumulative[-1] - 1) # 0-based rank in the sorted column
+        below = self.values[np.searchsorted(cumulative, np.floor(position), side='right')]
+        above = self.values[np.searchsorted(cumulative, np.ceil(position), side='right')]
+        return below + (above - below) * (position - np.floor(position))
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: CATEGORY COUNTER
+
+class CategoryCounter:
+    """Counts per category level"""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=object).ravel()
+        if len(values) < 256:
+            # small batches (e.g. one row from the Predict tab), Counter is much cheaper than value_counts
+            counts = Counter(values).items()
+        else:
+            counts = pd.Series(values).value_counts(dropna=False).items()
+        for level, n in counts:
+            self.counts[level] = self.counts.get(level, 0) + int(n)
+        self.count += len(values)
+        return self
+
+    def merge(self, other):
+        for level, n in other.counts.items():
+            self.counts[level] = self.counts.get(level, 0) + n
+        self.count += other.count
+        return self
+
+    def proportions(self, levels):
+        """Share of each level in `levels` order"""
+        total = max(self.count, 1)
+        return np.array([self.counts.get(level, 0) / total for level in levels])
+#---------------------------------------------------------------------------------------------------------
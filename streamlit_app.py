@@ -14,6 +14,8 @@ Name is derived from the concept of helping banks convert potential customers in
 
 # Need import joblib to load the saved model files (.pkl) that trained in Jupyter notebook
 import joblib 
+import os
+import time
 
 # Need import streamlit since it is web framework to create web interface
 import streamlit as st
@@ -27,6 +29,53 @@ import pandas as pd
 # Need to also import plotly to creat the interactive gauge chart for visualising prediction probability
 import plotly.graph_objects as go # mainly for the visuals 
 
+# drift sketches of what RMs score vs the training data (see drift_monitor.py)
+from drift_monitor import REFERENCE_PATH, LiveDriftRecorder, compare, load_monitor
+
+# decision threshold for an RM's daily call budget (see threshold_optimizer.py)
+from threshold_optimizer import THRESHOLD_PATH, budget_threshold, load_decision_threshold
+
+# versioned models/ folder + background hot swap, so a new model goes live without restarting (see model_registry.py)
+from model_registry import ModelHandle, previous_version, read_pointer, resolve_artifact, rollback
+
+# candidate model scored next to the live one on a background thread (see shadow_scoring.py)
+from shadow_scoring import SHADOW_LOG, ShadowScorer, read_records, summarise
+
+# scores saved per customer + RM in SQLite, so nothing is re-scored unless inputs or the model changed
+from score_store import ScoreStore, input_hashes, version_key
+
+# one-hot + scaling shared with the batch tools
+from scoring import MODEL_PATH, THRESHOLDS_PATH, encode_features, load_dataset_split
+
+# tree-vote spread + calibrated intervals for the result card (see uncertainty.py)
+from uncertainty import CONFORMAL_PATH, conformal_interval, is_uncertain, load_conformal, predict_with_spread
+
+# nearest historical customers from an index built offline (see similar_customers.py)
+from similar_customers import ENCODING_FILES, INDEX_PATH, check_index, load_index, neighbours_frame, query_index
+
+# big uploads are scored by background job processes, the page only reads their status (see job_queue.py)
+from job_queue import ACTIVE, CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobRunner
+
+# whole customer book scored offline, looked up by id without running the model (see score_table.py)
+from score_table import TABLE_PATH, load_table
+
+# Monte Carlo campaign outcomes, model-ranked vs random calling (see campaign_simulator.py)
+from campaign_simulator import (BAND, WORKING_DAYS, calibration_table, conversion_chance, simulate_campaign,
+                                summarise as summarise_campaign)
+
+# every model call goes through one bounded pool of inference threads, single-row requests first (see inference_governor.py)
+from inference_governor import BATCH, INTERACTIVE, GovernedModel, InferenceGovernor, pin_model
+
+# grouped permutation importance of the live model, rebuilt per version (see feature_importance.py)
+from feature_importance import IMPORTANCE_PATH, load_importance
+from batch_score import file_fingerprint
+
+# recall / precision per customer segment with bootstrap intervals (see segment_report.py)
+from segment_report import REPORT_PATH, load_report
+
+# call outcomes RMs log against the ranked list, append-only + incrementally counted (see feedback_log.py)
+from feedback_log import FeedbackLog, online_metrics
+
 #---------------------------------------------------------------------------------------------------------
 
 # SECTION 2: PAGE CONFIG 
@@ -58,9 +107,9 @@ def get_theme():
 
 # SECTION 4: CSS STYLING for theme toggle
 
-def apply_theme():
-    theme = get_theme() # Firstly need to get the current theme (dark/light)
-    
+@st.cache_data # css only depends on the theme, so only build the big string once per theme
+def build_theme_css(theme):
+    """Returns the <style> block for 'dark' or 'light'"""
     # For dark mode 
     if theme == "dark":
         bg_primary = "#0B0F1E" # for main bg colour 
@@ -113,8 +162,8 @@ def apply_theme():
         action_bg = "rgba(94, 200, 200, 0.05)"
         action_border = "rgba(94, 200, 200, 0.25)"
 
-    # now need to inject css to page so that ui can appear nicely
-    st.markdown(f"""
+    # now need to build the css so that ui can appear nicely
+    return f"""
 <style>
     /* Firstly using the DM Sans font from Google Fonts for professional*/
     @import url('https://fonts.googleapis.com/css2?family=DM+Sans:ital,opsz,wght@0,9..40,300;0,9..40,400;0,9..40,500;0,9..40,600;0,9..40,700&display=swap');
@@ -695,7 +744,13 @@ def apply_theme():
         color: var(--text-primary) !important;
     }}
 </style>
-""", unsafe_allow_html=True)
+"""
+
+
+def apply_theme():
+    # inject the cached css for the current theme (dark/light), still need to inject on every full rerun
+    # since streamlit clears elements that are not re-sent, but the string itself is not rebuilt
+    st.markdown(build_theme_css(get_theme()), unsafe_allow_html=True)
 
 #---------------------------------------------------------------------------------------------------------
 
@@ -706,19 +761,30 @@ def apply_theme():
 
 # so that can load the trained model
 
-@st.cache_resource # Cache function so that only runs once, IMPORTATN
+@st.cache_resource # ONE pool of inference threads per server process, shared by every session
+def get_inference_governor():
+    return InferenceGovernor()
+
+
+@st.cache_resource # Cache so that only ONE handle per server process, IMPORTATN
+def get_model_handle():
+    """Loads the live model version once, then a background thread swaps in new versions by itself"""
+    return ModelHandle().start()
+
+
 def load_models():
-    """Firslty, have to load saved models using joblib"""
-    try:
-        model = joblib.load("best_model.pkl") # trained Random Forest model
-        scaler = joblib.load("scaler.pkl") # StandardScaler
-        feature_columns = joblib.load("feature_columns.pkl") # feature column names
-        return model, scaler, feature_columns
-    except FileNotFoundError:
+    """Firslty, have to load saved models using joblib (done by the handle: trained Random Forest model,
+    StandardScaler, feature column names + thresholds, all from the same version)"""
+    bundle = get_model_handle().get()
+    if bundle is None:
         # If file is missing, then for debug
         st.error("Model files not found. Please run Jupyter notebook first to generate .pkl files")
         st.info("Required files: best_model.pkl, scaler.pkl, feature_columns.pkl")
-        return None, None, None
+    else:
+        # the governor decides how many predictions run at once, so the forest must not spawn n_jobs=-1 threads
+        # inside each of them (cheap no-op once pinned, and a hot-swapped version gets pinned on first use)
+        pin_model(bundle['model'])
+    return bundle
 
 
 @st.cache_resource # Cache this function too
@@ -732,21 +798,151 @@ def load_thresholds():
     except FileNotFoundError:
         try:
             # Config a fallback such that if thresholds.pkl not found, recalculate from raw dataset
-            df = pd.read_csv('bank-additional-full.csv', sep=';') #original dataset
-            df = df.drop_duplicates() #Removing duplicate rows
-            df = df.drop(['duration', 'campaign'], axis=1) #Removing data leakage columns
-            df.loc[df['y'] == 'yes', 'y'] = 1 #Encoding target: yes to 1
-            df.loc[df['y'] == 'no', 'y'] = 0 #Encoding target: no to 0
-            df['y'] = df['y'].astype(int) #target to integer
-            X = df.drop('y', axis=1) #Separate features
-            y = df['y'] #target
-            from sklearn.model_selection import train_test_split
-            # redo train-test split
-            X_train, _, _, _ = train_test_split(X, y, test_size=0.3, random_state=2025, stratify=y)
+            # medians of the TRAINING split only (same cleaning + split as the notebook), i.e. the values the model
+            # was trained with, not of every row
+            X_train, _, _, _ = load_dataset_split('bank-additional-full.csv', sep=';')
             return X_train['emp.var.rate'].median(), X_train['nr.employed'].median()
         except FileNotFoundError:
             # last last falllback is hardcoded default values
             return 1.1, 5191.0 # never reaches here since have threshold 
+
+
+@st.cache_resource # ONE recorder shared by every session, so all predictions go into the same live window
+def get_drift_recorder():
+    return LiveDriftRecorder()
+
+
+@st.cache_resource(ttl=600) # re-read every 10 min, so a rebuilt reference is picked up without a restart
+def load_drift_reference():
+    """Training reference profile from drift_monitor.py build-reference (None if not built yet)"""
+    return load_monitor(resolve_artifact(REFERENCE_PATH))
+
+
+@st.cache_resource # ONE shadow thread per server process
+def get_shadow_scorer():
+    return ShadowScorer(governor=get_inference_governor()).start()
+
+
+@st.cache_resource # one store object, it opens a SQLite connection per session thread itself
+def get_score_store():
+    return ScoreStore()
+
+
+@st.cache_resource
+def get_feedback_log():
+    return FeedbackLog()
+
+
+@st.cache_data(ttl=60) # keyed on the counters' mtime + segment names, so only re-read after a new outcome
+def load_feedback_metrics(log_signature):
+    """Saved counters + outcomes logged since the last compaction, never the full history"""
+    return online_metrics(get_feedback_log().counts())
+
+
+@st.cache_resource # ONE dispatcher thread per server process, it starts the job processes
+def get_job_runner():
+    return JobRunner().start()
+
+
+@st.cache_resource(max_entries=1) # keyed on size + mtime, so a nightly refresh is read once, then served from memory
+def load_score_table(table_signature):
+    return load_table(TABLE_PATH)
+
+
+def get_score_table():
+    """Pre-scored customer book from score_table.py refresh (None if it has not been built)"""
+    try:
+        stat = os.stat(TABLE_PATH)
+    except FileNotFoundError:
+        return None
+    return load_score_table((stat.st_size, stat.st_mtime_ns))
+
+
+@st.cache_data(ttl=60) # keyed on the log's size + mtime, so it is only re-read when something was appended
+def load_shadow_summary(log_signature):
+    return summarise(read_records(SHADOW_LOG))
+
+
+@st.cache_resource(ttl=600)
+def load_call_budget(model_folder):
+    """Saved held-out precision/recall curve + default budget for this model version, else the flat file
+    (None if threshold_optimizer.py not run yet)"""
+    return load_decision_threshold(os.path.join(model_folder, THRESHOLD_PATH)) or load_decision_threshold()
+
+
+def live_call_budget(bundle):
+    """Call budget curve only when it was computed for the model file being served (retrain.py does not copy it,
+    so the flat file can hold an earlier forest's curve), else None"""
+    budget = load_call_budget(bundle['folder'])
+    return budget if budget is not None and matches_live_model(budget, bundle) else None
+
+
+@st.cache_data(ttl=60) # campaign pool only, a minute old is fine
+def load_saved_probabilities(model_version):
+    return get_score_store().probabilities(model_version)
+
+
+@st.cache_resource(ttl=600)
+def load_conformal_calibration(model_folder):
+    """Split-conformal q + beta for this model version, else the flat file (None if uncertainty.py not run yet)"""
+    return load_conformal(os.path.join(model_folder, CONFORMAL_PATH)) or load_conformal()
+
+
+@st.cache_resource(ttl=600)
+def load_feature_importance(model_folder):
+    """Permutation importance for this model version, else the flat file (None if feature_importance.py not run yet)"""
+    return load_importance(os.path.join(model_folder, IMPORTANCE_PATH)) or load_importance()
+
+
+@st.cache_resource(ttl=600)
+def load_segment_report(model_folder):
+    """Per-segment metrics for this model version, else the flat file (None if segment_report.py not run yet)"""
+    return load_report(os.path.join(model_folder, REPORT_PATH)) or load_report()
+
+
+@st.cache_data # keyed on path + mtime, so each model / thresholds file is only hashed once
+def model_file_sha256(path, mtime_ns):
+    return file_fingerprint(path)
+
+
+def score_version(bundle):
+    """Key of this bundle's rows in the score store: version + sha256 of its model and thresholds files
+    (the version alone is 'local' for every flat model, even after best_model.pkl was replaced)"""
+    shas = []
+    for name in (MODEL_PATH, THRESHOLDS_PATH):
+        path = os.path.join(bundle['folder'], name)
+        try:
+            shas.append(model_file_sha256(path, os.stat(path).st_mtime_ns))
+        except FileNotFoundError:
+            shas.append(None)
+    return version_key(bundle['version'], *shas)
+
+
+def matches_live_model(saved, bundle):
+    """True if a saved report was computed for the model file being served (its sha256 is kept in the report)"""
+    model_path = os.path.join(bundle['folder'], MODEL_PATH)
+    try:
+        return saved.get('model_sha256') == model_file_sha256(model_path, os.stat(model_path).st_mtime_ns)
+    except FileNotFoundError:
+        return False
+
+
+def encoding_fingerprints(bundle):
+    """sha256 of this bundle's model / scaler / thresholds files, what similar_index.pkl was encoded with"""
+    fingerprints = {}
+    for key, name in ENCODING_FILES.items():
+        path = os.path.join(bundle['folder'], name)
+        try:
+            fingerprints[key] = model_file_sha256(path, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            fingerprints[key] = None
+    return fingerprints
+
+
+@st.cache_resource(ttl=600)
+def load_similar_index(model_folder):
+    """Similar-customer index for this model version, else the flat file (None if not built yet)"""
+    return load_index(os.path.join(model_folder, INDEX_PATH)) or load_index()
 #---------------------------------------------------------------------------------------------------------
 
 
@@ -757,12 +953,13 @@ def load_thresholds():
 
 # for plotly gauge chart for prediction probability
 
-def create_gauge_chart(probability):
-    """Need this for the visuals so that have plotly gauge chart for probability visual"""
+@st.cache_data # gauge look never changes, so only build + validate the plotly figure once
+def gauge_template():
+    """Plotly gauge chart as a dict with value 0, create_gauge_chart patches in the probability"""
     fig = go.Figure(go.Indicator(
         mode="gauge+number", # so that can show gauge and number
 
-        value=probability * 100, # this is so that converting the probability to %
+        value=0, # patched per prediction
         domain={'x': [0, 1], 'y': [0, 1]},
         number={
             'suffix': '%', # after n.o. %
@@ -788,7 +985,7 @@ def create_gauge_chart(probability):
             'threshold': {
                 'line': {'color': '#5EFCE8', 'width': 3},
                 'thickness': 0.8,
-                'value': probability * 100
+                'value': 0 # patched per prediction
             }
         }
     ))
@@ -799,7 +996,19 @@ def create_gauge_chart(probability):
         paper_bgcolor='rgba(0,0,0,0)',
         plot_bgcolor='rgba(0,0,0,0)'
     )
-    return fig
+    return fig.to_dict()
+
+
+def create_gauge_chart(probability, band=None):
+    """Need this for the visuals so that have plotly gauge chart for probability visual.
+    band = (lower, upper) uncertainty range, drawn as a thin arc on the outer edge"""
+    spec = gauge_template() # cache_data gives back a fresh copy each call, so safe to patch per session
+    spec['data'][0]['value'] = probability * 100 # this is so that converting the probability to %
+    spec['data'][0]['gauge']['threshold']['value'] = probability * 100
+    if band is not None:
+        spec['data'][0]['gauge']['steps'].append(
+            {'range': [band[0] * 100, band[1] * 100], 'color': 'rgba(94, 252, 232, 0.45)', 'thickness': 0.12})
+    return go.Figure(spec, _validate=False) # template was validated when it was built, no need again
 #---------------------------------------------------------------------------------------------------------
 
 
@@ -866,25 +1075,9 @@ def preprocess_input(input_data, feature_columns, scaler, emp_median, nr_median)
     # Step 1: Firstly, need to apply 5 engineered features
     df = create_feature_engineering(input_data, emp_median, nr_median)
 
-    # Step 2: One-Hot Encoding
-    categorical_cols = ['job', 'marital', 'education', 'default', 'housing',
-                       'loan', 'contact', 'month', 'day_of_week', 'poutcome',
-                       'age_group', 'economic_condition', 'contact_recency']
-    df_encoded = pd.get_dummies(df, columns=categorical_cols, drop_first=True)
-
-    # Step 3: same col
-    for col in feature_columns:
-        if col not in df_encoded.columns:
-            df_encoded[col] = 0
-
-    df_encoded = df_encoded[feature_columns]
-
-    # Step 5: Scaling numerical since diff scale
-    numerical_cols = list(scaler.feature_names_in_)
-    df_scaled = df_encoded.copy()
-    df_scaled[numerical_cols] = scaler.transform(df_encoded[numerical_cols])
-
-    return df_scaled.values
+    # Step 2-5: One-Hot Encoding + same col order + scaling, built straight from feature_columns
+    # (pd.get_dummies(drop_first=True) on ONE row dropped every category's only level -> all indicators were 0)
+    return encode_features(df, feature_columns, scaler)
 #---------------------------------------------------------------------------------------------------------
 
 
@@ -964,89 +1157,41 @@ def generate_recommendations(prediction, probability, age, job, poutcome, emp_va
 
 
 #---------------------------------------------------------------------------------------------------------
-# SECTION 8: MAIN APP
-
-def main():
-    # Firslty, need to load all model files
-    model, scaler, feature_columns = load_models()
-    emp_median, nr_median = load_thresholds() # and economic condition thresholds
-
-    # also need to apply CSS theme so can use dark and light 
-    apply_theme()
-
-    # SIDEBAR
-    with st.sidebar:
-        st.markdown("""
-        <div style="text-align:center; padding: 1rem 0 1.2rem;">
-            <div style="font-size:2rem; margin-bottom:0.3rem;">🤖</div>
-            <div style="font-size:1.4rem; font-weight:700; background: linear-gradient(135deg, #5EFCE8, #6C63FF);
-            -webkit-background-clip: text; -webkit-text-fill-color: transparent;">BankConvert AI</div>
-            <div style="font-size:0.75rem; color:rgba(255,255,255,0.4) !important; margin-top:0.2rem;
-            letter-spacing:0.08em; text-transform:uppercase;">ML Prediction Engine</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-        st.markdown("---") # divider line for neat
-
-        # Theme toggle but show current state first
-        theme_label = "🌙 Dark Mode" if get_theme() == "dark" else "☀️ Light Mode"
-        if st.button(theme_label, key="theme_toggle"):            
-            st.session_state.theme = "light" if st.session_state.theme == "dark" else "dark"
-            st.rerun() # Rerun to apply new theme
-
-        st.markdown("---")
-
-        # MODEL STATS so that can know 
-        st.markdown("""
-        <div class="sb-card"><span class="sb-label">Model</span><span class="sb-value">Random Forest</span></div>
-        <div class="sb-card"><span class="sb-label">F1-Score</span><span class="sb-value">48.58%</span></div>
-        <div class="sb-card"><span class="sb-label">Recall</span><span class="sb-value">52.37%</span></div>
-        <div class="sb-card"><span class="sb-label">Test Results</span><span class="sb-value">729 / 1,392</span></div>
-        """, unsafe_allow_html=True)
-
-        st.markdown("---")
+# SECTION 8: PREDICT TAB
+# runs as a fragment so that clicking Run Prediction only reruns this tab, not the whole app
+# (theme CSS, sidebar and the static Performance/How It Works/About tabs are left as they are)
 
-        # for me 
-        st.markdown("### Developer")
-        st.markdown("**Melissa Kuah** (2404487G)  \nML for Developers (P01) \nTemasek Polytechnic")
+@st.fragment
+def render_predict_tab():
+    # model is fetched HERE and not passed in from main(), since fragment reruns reuse main()'s old arguments
+    # and would keep predicting with a model that has already been hot-swapped out
+    bundle = load_models()
 
-        st.markdown("---")
+    # model must be loaded successfully first
+    if bundle is None:
+        st.warning("⚠️ Model not loaded. Ensure best_model.pkl, scaler.pkl, and feature_columns.pkl are in the same directory as this app.")
+        return # cant continue
 
-        # Model improvement summary so that can pitch better 
-        st.markdown("### Improvement")
-        st.markdown("""
-        Recall: **31.68% => 52.37%**  
-        Finding **+288 more** subscribers  
-        F1: **39.52% => 48.58%**
-        """)
+    # everything from ONE bundle, so a swap in the middle of this run cannot mix versions
+    model, scaler, feature_columns = bundle['model'], bundle['scaler'], bundle['feature_columns']
+    emp_median, nr_median = bundle['thresholds'] or load_thresholds()
 
-    # HERO HEADER
     st.markdown("""
-    <div class="hero">
-        <h1>BankConvert AI</h1>
-        <div class="subtitle">Predict term deposit subscription likelihood before the call</div>
-        <div class="badge">🤖 Random Forest · Tuned · class_weight='balanced'</div>
+    <div class="section-header">
+        <h3>Enter Customer Information</h3>
+        <p>Fill in the customer details below to predict their likelihood of subscribing to a term deposit.
+        Adjust the sliders and dropdowns, then click <strong>Run Prediction</strong> to see results.</p>
     </div>
     """, unsafe_allow_html=True)
 
-    # TABS
-    tab1, tab2, tab3, tab4 = st.tabs(["🔮  Predict", "📊  Performance", "🧠  How It Works", "📋  About"])
+    render_book_lookup(bundle)
 
-    # TAB 1: PREDICT
-    # To allow user to input customer data and get a prediction
-    with tab1:
-        # model must be loaded successfully first
-        if model is None:
-            st.warning("⚠️ Model not loaded. Ensure best_model.pkl, scaler.pkl, and feature_columns.pkl are in the same directory as this app.")
-            return # cant continue
-
-        st.markdown("""
-        <div class="section-header">
-            <h3>Enter Customer Information</h3>
-            <p>Fill in the customer details below to predict their likelihood of subscribing to a term deposit.
-            Adjust the sliders and dropdowns, then click <strong>Run Prediction</strong> to see results.</p>
-        </div>
-        """, unsafe_allow_html=True)
+    # inputs are inside a form so that moving a slider or dropdown does not rerun anything,
+    # values are only sent to the server when Run Prediction is clicked
+    with st.form("predict_form", border=False):
+        # optional, with an id the score is saved under the RM's id and re-used next time if nothing changed
+        customer_id = st.text_input("Customer ID (optional)", help="Saves this score to My Prospects. "
+                                    "If the same customer is entered again with the same details, the saved score is re-used")
 
         # Demographics Section
         st.markdown('<div class="section-label">👤 Customer Demographics</div>', unsafe_allow_html=True)
@@ -1116,187 +1261,960 @@ def main():
 
         st.markdown("---")
 
+        # Daily call budget, only if the held-out curve has been saved for this model
+        budget = live_call_budget(bundle)
+        if budget is not None:
+            st.markdown('<div class="section-label">📞 Daily Call Capacity</div>', unsafe_allow_html=True)
+            col9, col10 = st.columns(2)
+            with col9:
+                calls_per_day = st.number_input("Calls I can make today", 1, 1000, int(budget['calls_per_day']),
+                                                help="How many customers you have time to call today")
+            with col10:
+                leads_per_day = st.number_input("Customers due for a call today", 1, 10000, int(budget['leads_per_day']),
+                                                help="Size of today's call list before filtering")
+            st.markdown("---")
+
         # Predict Button
-        if st.button("Run Prediction"):
-
-            # INPUT VALIDATION
-            # To warn user potentially contradictory inputs
-            has_warning = False
-
-            # Check: pdays set but previous = 0 
-            if pdays != 999 and previous == 0:
-                st.warning("⚠️ **Input Check:** You set days since last contact but previous contacts is 0. If the customer was contacted before, previous contacts should be ≥ 1.")
-                has_warning = True
-
-            # Check: previous outcome = success but never contacted
-            if poutcome == 'success' and pdays == 999:
-                st.warning("⚠️ **Input Check:** Previous outcome is 'success' but days since contact is 999 (never contacted). These are contradictory - please verify.")
-                has_warning = True
-
-            # Check: previous outcome set but previous contacts = 0
-            if poutcome != 'nonexistent' and previous == 0:
-                st.warning("⚠️ **Input Check:** Previous outcome is set but previous contacts is 0. If there was a previous campaign, contacts should be ≥ 1.")
-                has_warning = True
-
-            # Check: very young person but if job retired
-            if age < 25 and job == 'retired':
-                st.warning("⚠️ **Input Check:** Customer is under 25 but listed as retired - please verify age and occupation.")
-                has_warning = True
-
-            # Check: elderly person listed as student
-            if age > 65 and job == 'student':
-                st.warning("⚠️ **Input Check:** Customer is over 65 but listed as student - please verify age and occupation.")
-                has_warning = True
-
-            # data frame need for user input
-            
-            input_data = pd.DataFrame({
-                'age': [age], 'job': [job], 'marital': [marital], 'education': [education],
-                'default': [default], 'housing': [housing], 'loan': [loan], 'contact': [contact],
-                'month': [month], 'day_of_week': [day_of_week], 'pdays': [pdays],
-                'previous': [previous], 'poutcome': [poutcome], 'emp.var.rate': [emp_var_rate],
-                'cons.price.idx': [cons_price_idx], 'cons.conf.idx': [cons_conf_idx],
-                'euribor3m': [euribor3m], 'nr.employed': [nr_employed]
-            })
-
-            try:
+        submitted = st.form_submit_button("Run Prediction")
+
+    if submitted:
+
+        # INPUT VALIDATION
+        # To warn user potentially contradictory inputs
+        has_warning = False
+
+        # Check: pdays set but previous = 0 
+        if pdays != 999 and previous == 0:
+            st.warning("⚠️ **Input Check:** You set days since last contact but previous contacts is 0. If the customer was contacted before, previous contacts should be ≥ 1.")
+            has_warning = True
+
+        # Check: previous outcome = success but never contacted
+        if poutcome == 'success' and pdays == 999:
+            st.warning("⚠️ **Input Check:** Previous outcome is 'success' but days since contact is 999 (never contacted). These are contradictory - please verify.")
+            has_warning = True
+
+        # Check: previous outcome set but previous contacts = 0
+        if poutcome != 'nonexistent' and previous == 0:
+            st.warning("⚠️ **Input Check:** Previous outcome is set but previous contacts is 0. If there was a previous campaign, contacts should be ≥ 1.")
+            has_warning = True
+
+        # Check: very young person but if job retired
+        if age < 25 and job == 'retired':
+            st.warning("⚠️ **Input Check:** Customer is under 25 but listed as retired - please verify age and occupation.")
+            has_warning = True
+
+        # Check: elderly person listed as student
+        if age > 65 and job == 'student':
+            st.warning("⚠️ **Input Check:** Customer is over 65 but listed as student - please verify age and occupation.")
+            has_warning = True
+
+        # data frame need for user input
+
+        input_data = pd.DataFrame({
+            'age': [age], 'job': [job], 'marital': [marital], 'education': [education],
+            'default': [default], 'housing': [housing], 'loan': [loan], 'contact': [contact],
+            'month': [month], 'day_of_week': [day_of_week], 'pdays': [pdays],
+            'previous': [previous], 'poutcome': [poutcome], 'emp.var.rate': [emp_var_rate],
+            'cons.price.idx': [cons_price_idx], 'cons.conf.idx': [cons_conf_idx],
+            'euribor3m': [euribor3m], 'nr.employed': [nr_employed]
+        })
+
+        try:
+            # same customer, same inputs, same model version as a saved score -> no need to run the model again
+            customer_id = customer_id.strip()
+            store = get_score_store()
+            input_hash = input_hashes(input_data)[0]
+            saved = store.lookup(customer_id, score_version(bundle)) if customer_id else None
+
+            spread = processed = None # only known when the model actually ran
+            if saved is not None and saved[2] == input_hash:
+                probability, prediction = saved[0], saved[1]
+                st.caption(f"♻️ Re-used the saved score from {time.strftime('%d %b %H:%M', time.localtime(saved[3]))} "
+                           f"(same details, same model {bundle['version']})")
+            else:
                 # RUN PREDICTION
                 with st.spinner("Analysing customer profile..."):
-                    
+
                     processed = preprocess_input(input_data, feature_columns, scaler, emp_median, nr_median)
-                    
-                    prediction = model.predict(processed)[0]
-                    # model probability after predict
-                    probability = model.predict_proba(processed)[0][1] if hasattr(model, 'predict_proba') else (0.7 if prediction == 1 else 0.3)
-
-                # CUSTOMER PROFILE SUMMARY                
-                st.markdown("---")
-                pdays_display = "Never contacted" if pdays == 999 else f"{pdays} days ago"
-                st.markdown(f"""
-                <div class="profile-summary">
-                    <div class="profile-title">👤 Customer Profile Summary</div>
-                    <div class="profile-grid">
-                        <div class="profile-item">
-                            <span class="p-label">Age</span>
-                            <span class="p-value">{age}</span>
-                        </div>
-                        <div class="profile-item">
-                            <span class="p-label">Job</span>
-                            <span class="p-value">{job}</span>
-                        </div>
-                        <div class="profile-item">
-                            <span class="p-label">Marital</span>
-                            <span class="p-value">{marital}</span>
-                        </div>
-                        <div class="profile-item">
-                            <span class="p-label">Education</span>
-                            <span class="p-value">{education}</span>
-                        </div>
-                        <div class="profile-item">
-                            <span class="p-label">Credit Default</span>
-                            <span class="p-value">{default}</span>
-                        </div>
-                        <div class="profile-item">
-                            <span class="p-label">Housing Loan</span>
-                            <span class="p-value">{housing}</span>
-                        </div>
-                        <div class="profile-item">
-                            <span class="p-label">Personal Loan</span>
-                            <span class="p-value">{loan}</span>
-                        </div>
-                        <div class="profile-item">
-                            <span class="p-label">Contact</span>
-                            <span class="p-value">{contact}</span>
-                        </div>
-                        <div class="profile-item">
-                            <span class="p-label">Last Contact</span>
-                            <span class="p-value">{pdays_display}</span>
-                        </div>
-                        <div class="profile-item">
-                            <span class="p-label">Previous Outcome</span>
-                            <span class="p-value">{poutcome}</span>
-                        </div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
 
-                # PREDICTION RESULTS
-                st.markdown("### Prediction Results")
-                r1, r2 = st.columns([1, 1]) 
-
-                with r1: 
-                    st.plotly_chart(create_gauge_chart(probability), use_container_width=True)
-
-                with r2: 
-                    if prediction == 1: # YES
-                        st.markdown(f"""
-                        <div class="result-yes">
-                            <h2>✅ LIKELY TO SUBSCRIBE</h2>
-                            <div class="conf">{probability*100:.1f}% confidence</div>
-                            <p>High potential - prioritise this customer for follow-up calls</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    else: # NO
-                        st.markdown(f"""
-                        <div class="result-no">
-                            <h2>❌ UNLIKELY TO SUBSCRIBE</h2>
-                            <div class="conf">{(1-probability)*100:.1f}% confidence (non-subscription)</div>
-                            <p>Low potential - deprioritise and focus on higher-probability prospects</p>
-                        </div>
-                        """, unsafe_allow_html=True)
-                # RECOMMENDED ACTIONS
-                st.markdown("---")
-                actions = generate_recommendations(
-                    prediction, probability, age, job, poutcome, emp_var_rate,
-                    pdays, previous, default, housing, loan, contact, education
-                )
-                action_label = "🟢 Recommended Actions - High Potential" if prediction == 1 else "🔴 Recommended Actions - Low Potential"
-            
-                actions_html = "".join([
-                    f'<div class="action-item"><span class="action-bullet">→</span><span class="action-text">{a}</span></div>'
-                    for a in actions
-                ])
-                st.markdown(f"""
-                <div class="action-card">
-                    <div class="action-title">{action_label}</div>
-                    {actions_html}
+                    # probability = mean of the tree votes and spread = their std, from the same pass over the trees
+                    # (spread is None for non-forest models)
+                    # runs on the shared inference pool, ahead of any list uploads waiting there
+                    probabilities, spreads = get_inference_governor().run(predict_with_spread, model, processed,
+                                                                          priority=INTERACTIVE)
+                    probability = float(probabilities[0])
+                    spread = None if spreads is None else float(spreads[0])
+                    prediction = int(probability > 0.5) # same as model.predict (argmax of the two classes)
+
+                if customer_id:
+                    store.write([customer_id], [st.session_state.get('rm_id') or None], [input_hash], [probability],
+                                score_version(bundle))
+                try:
+                    get_drift_recorder().record(input_data, [probability]) # for the Drift tab
+                except OSError:
+                    pass # drift tracking should never block a prediction
+                # shadow candidate (if any) scores the same row on its own thread, this call only queues it
+                get_shadow_scorer().submit(input_data, [probability], bundle['version'])
+
+            # CUSTOMER PROFILE SUMMARY                
+            st.markdown("---")
+            pdays_display = "Never contacted" if pdays == 999 else f"{pdays} days ago"
+            st.markdown(f"""
+            <div class="profile-summary">
+                <div class="profile-title">👤 Customer Profile Summary</div>
+                <div class="profile-grid">
+                    <div class="profile-item">
+                        <span class="p-label">Age</span>
+                        <span class="p-value">{age}</span>
+                    </div>
+                    <div class="profile-item">
+                        <span class="p-label">Job</span>
+                        <span class="p-value">{job}</span>
+                    </div>
+                    <div class="profile-item">
+                        <span class="p-label">Marital</span>
+                        <span class="p-value">{marital}</span>
+                    </div>
+                    <div class="profile-item">
+                        <span class="p-label">Education</span>
+                        <span class="p-value">{education}</span>
+                    </div>
+                    <div class="profile-item">
+                        <span class="p-label">Credit Default</span>
+                        <span class="p-value">{default}</span>
+                    </div>
+                    <div class="profile-item">
+                        <span class="p-label">Housing Loan</span>
+                        <span class="p-value">{housing}</span>
+                    </div>
+                    <div class="profile-item">
+                        <span class="p-label">Personal Loan</span>
+                        <span class="p-value">{loan}</span>
+                    </div>
+                    <div class="profile-item">
+                        <span class="p-label">Contact</span>
+                        <span class="p-value">{contact}</span>
+                    </div>
+                    <div class="profile-item">
+                        <span class="p-label">Last Contact</span>
+                        <span class="p-value">{pdays_display}</span>
+                    </div>
+                    <div class="profile-item">
+                        <span class="p-label">Previous Outcome</span>
+                        <span class="p-value">{poutcome}</span>
+                    </div>
                 </div>
-                """, unsafe_allow_html=True)
+            </div>
+            """, unsafe_allow_html=True)
 
-                # BUSINESS INSIGHT CARDS
-                st.markdown("### Business Insights")
-                i1, i2 = st.columns(2)
-                with i1: 
+            # PREDICTION RESULTS
+            st.markdown("### Prediction Results")
+            r1, r2 = st.columns([1, 1]) 
+
+            # UNCERTAINTY
+            # calibrated interval if conformal.pkl was calibrated on the model file being served (by sha256, another
+            # forest's q + beta cover nothing), else +- one std of the tree votes
+            band, band_note = None, ""
+            if spread is not None:
+                calibration = load_conformal_calibration(bundle['folder'])
+                if calibration is not None and matches_live_model(calibration, bundle):
+                    lower, upper = (float(v) for v in conformal_interval(probability, spread, calibration))
+                    band = (lower, upper)
+                    band_note = (f"{1 - calibration['alpha']:.0%} interval {lower*100:.0f}% - {upper*100:.0f}%"
+                                 + (" · uncertain, could go either way" if is_uncertain(lower, upper) else ""))
+                else:
+                    band = (max(probability - spread, 0.0), min(probability + spread, 1.0))
+                    band_note = f"trees agree within ±{spread*100:.0f}%"
+
+            with r1: 
+                st.plotly_chart(create_gauge_chart(probability, band), use_container_width=True)
+                if band_note:
+                    st.caption(f"Uncertainty: {band_note}")
+
+            with r2: 
+                if prediction == 1: # YES
                     st.markdown(f"""
-                    <div class="card">
-                        <h4>📋 Campaign History</h4>
-                        <p>Previous outcome: <strong>{poutcome}</strong><br>
-                        {'✅ Prior success - strong positive signal for subscription' if poutcome == 'success'
-                         else '📌 No prior success - focus on relationship building first'}</p>
+                    <div class="result-yes">
+                        <h2>✅ LIKELY TO SUBSCRIBE</h2>
+                        <div class="conf">{probability*100:.1f}% confidence</div>
+                        <p>High potential - prioritise this customer for follow-up calls</p>
                     </div>
                     """, unsafe_allow_html=True)
-
-                with i2: 
+                else: # NO
                     st.markdown(f"""
-                    <div class="card">
-                        <h4>🌍 Economic Context</h4>
-                        <p>Employment Variation Rate: <strong>{emp_var_rate}</strong><br>
-                        {'⚠️ Strong economy - customers may prefer higher-risk investments over term deposits' if emp_var_rate > 0
-                         else '✅ Weaker economy - customers seek safe investments like term deposits'}</p>
+                    <div class="result-no">
+                        <h2>❌ UNLIKELY TO SUBSCRIBE</h2>
+                        <div class="conf">{(1-probability)*100:.1f}% confidence (non-subscription)</div>
+                        <p>Low potential - deprioritise and focus on higher-probability prospects</p>
                     </div>
                     """, unsafe_allow_html=True)
+            # CALL BUDGET CUT
+            # held-out curve -> lowest probability that still fits today's calls (searchsorted, so instant)
+            if budget is not None:
+                cut = budget_threshold(budget['curve'], calls_per_day, leads_per_day)
+                if probability >= cut['threshold']:
+                    budget_note = f"✅ This customer ({probability*100:.1f}%) makes today's call list"
+                else:
+                    budget_note = f"⏸️ This customer ({probability*100:.1f}%) is below today's cut - call when capacity frees up"
+                if cut['over_budget']:
+                    budget_note += (f"<br>⚠️ The top-scored customers alone need ~{cut['expected_calls']:.1f} calls, "
+                                    f"more than today's {calls_per_day}")
+                st.markdown(f"""
+                <div class="card">
+                    <h4>📞 Today's Call Budget</h4>
+                    <p>With <strong>{calls_per_day}</strong> calls for <strong>{leads_per_day}</strong> customers, call everyone at
+                    <strong>{cut['threshold']*100:.1f}%</strong> or above (~{cut['expected_subscribers']:.1f} subscribers expected,
+                    {cut['precision']*100:.1f}% of calls convert, {cut['lift']:.1f}x better than calling at random).<br>
+                    {budget_note}</p>
+                </div>
+                """, unsafe_allow_html=True)
+
+            # SIMILAR CUSTOMERS
+            # nearest past customers in the model's own encoded space, from the prebuilt index (well under 1 ms)
+            similar = load_similar_index(bundle['folder'])
+            if check_index(similar, feature_columns, encoding_fingerprints(bundle)):
+                if processed is None: # re-used score, encode just for the lookup
+                    processed = preprocess_input(input_data, feature_columns, scaler, emp_median, nr_median)
+                rows, _ = query_index(similar, processed, 10)
+                subscriber_rows, subscriber_distances = query_index(similar, processed, 5, subscribed_only=True)
+                st.markdown(f"""
+                <div class="card">
+                    <h4>👥 Customers Like This One</h4>
+                    <p><strong>{int(similar['y'][rows[0]].sum())} of the 10</strong> most similar past customers subscribed.
+                    The closest ones who did (smaller distance = more alike):</p>
+                </div>
+                """, unsafe_allow_html=True)
+                st.dataframe(neighbours_frame(similar, subscriber_rows[0], subscriber_distances[0]), hide_index=True,
+                             use_container_width=True)
+
+            # RECOMMENDED ACTIONS
+            st.markdown("---")
+            actions = generate_recommendations(
+                prediction, probability, age, job, poutcome, emp_var_rate,
+                pdays, previous, default, housing, loan, contact, education
+            )
+            action_label = "🟢 Recommended Actions - High Potential" if prediction == 1 else "🔴 Recommended Actions - Low Potential"
+
+            actions_html = "".join([
+                f'<div class="action-item"><span class="action-bullet">→</span><span class="action-text">{a}</span></div>'
+                for a in actions
+            ])
+            st.markdown(f"""
+            <div class="action-card">
+                <div class="action-title">{action_label}</div>
+                {actions_html}
+            </div>
+            """, unsafe_allow_html=True)
+
+            # BUSINESS INSIGHT CARDS
+            st.markdown("### Business Insights")
+            i1, i2 = st.columns(2)
+            with i1: 
+                st.markdown(f"""
+                <div class="card">
+                    <h4>📋 Campaign History</h4>
+                    <p>Previous outcome: <strong>{poutcome}</strong><br>
+                    {'✅ Prior success - strong positive signal for subscription' if poutcome == 'success'
+                     else '📌 No prior success - focus on relationship building first'}</p>
+                </div>
+                """, unsafe_allow_html=True)
+
+            with i2: 
+                st.markdown(f"""
+                <div class="card">
+                    <h4>🌍 Economic Context</h4>
+                    <p>Employment Variation Rate: <strong>{emp_var_rate}</strong><br>
+                    {'⚠️ Strong economy - customers may prefer higher-risk investments over term deposits' if emp_var_rate > 0
+                     else '✅ Weaker economy - customers seek safe investments like term deposits'}</p>
+                </div>
+                """, unsafe_allow_html=True)
+
+        except Exception as e:
+            # anything goes wrong during prediction
+            st.error(f"❌ Prediction error: {str(e)}")
+            st.info("💡 Please ensure all model files (best_model.pkl, scaler.pkl, feature_columns.pkl) are present and the input values are valid.")
+#---------------------------------------------------------------------------------------------------------
+
+
 
-            except Exception as e:
-                # anything goes wrong during prediction
-                st.error(f"❌ Prediction error: {str(e)}")
-                st.info("💡 Please ensure all model files (best_model.pkl, scaler.pkl, feature_columns.pkl) are present and the input values are valid.")
 
 
+#---------------------------------------------------------------------------------------------------------
+# SECTION 9: MY PROSPECTS TAB
+# served from the score store's (rm_id, probability DESC) index, the model only runs for new/changed customers
+
+@st.fragment
+def render_prospects_tab():
+    st.markdown("""
+    <div class="section-header">
+        <h3>My Top Prospects</h3>
+        <p>Your saved customer scores, highest probability first. Upload today's call list and only new or changed customers are scored again.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    rm_id = (st.session_state.get('rm_id') or "").strip()
+    if not rm_id:
+        st.info("💡 Enter your RM ID in the sidebar to see your prospects.")
+        return
+
+    bundle = load_models()
+    if bundle is None:
+        return
+    store = get_score_store()
+
+    with st.form("prospects_upload", border=False):
+        upload = st.file_uploader("Customer list (CSV with customer_id + the 18 customer fields)", type="csv")
+        if st.form_submit_button("Score List") and upload is not None:
+            customers = pd.read_csv(upload)
+            if 'customer_id' not in customers:
+                st.error("❌ The CSV needs a customer_id column")
+            else:
+                if 'rm_id' not in customers:
+                    customers['rm_id'] = rm_id # list belongs to whoever uploaded it
+                emp_median, nr_median = bundle['thresholds'] or load_thresholds()
+                with st.spinner("Scoring new and changed customers..."):
+                    # batch priority + chunks, so RMs on the Predict tab are not stuck behind this list
+                    model = GovernedModel(bundle['model'], get_inference_governor(), BATCH)
+                    scored, reused = store.score_customers(customers, model, bundle['scaler'],
+                                                           bundle['feature_columns'], emp_median, nr_median,
+                                                           score_version(bundle))
+                st.success(f"✅ Scored {scored:,} new/changed customers, re-used {reused:,} saved scores")
+
+    limit = st.select_slider("Show top", [10, 20, 50, 100], value=20)
+    start = time.perf_counter()
+    prospects = store.top_prospects(rm_id, score_version(bundle), limit)
+    query_ms = (time.perf_counter() - start) * 1000
+
+    if prospects.empty:
+        st.info(f"💡 No saved scores for {rm_id} with model {bundle['version']} yet. Upload a list or predict with a Customer ID.")
+        return
+    prospects['probability'] = (prospects['probability'] * 100).round(1)
+    prospects['label'] = prospects['label'].map({1: "✅ Likely", 0: "❌ Unlikely"})
+    prospects['scored_at'] = pd.to_datetime(prospects['scored_at'], unit='s').dt.strftime("%d %b %H:%M")
+    st.dataframe(prospects.rename(columns={'customer_id': "Customer ID", 'probability': "Probability (%)",
+                                           'label': "Prediction", 'scored_at': "Scored"}),
+                 hide_index=True, use_container_width=True)
+    st.caption(f"Model {bundle['version']} · loaded in {query_ms:.1f} ms from saved scores")
+
+
+@st.fragment # typing an id only reruns this box, not the whole Predict tab
+def render_book_lookup(bundle):
+    table = get_score_table()
+    if table is None:
+        return # book not pre-scored, the form below is the only way
+    with st.expander("🔎 Look up a pre-scored customer", expanded=False):
+        customer_id = st.text_input("Customer ID", key="book_lookup_id",
+                                    help="Scored overnight by score_table.py, no need to fill in the form")
+        if not customer_id.strip():
+            return
+        start = time.perf_counter()
+        record = table.lookup(customer_id.strip())
+        lookup_ms = (time.perf_counter() - start) * 1000
+        if record is None:
+            st.info(f"💡 {customer_id} is not in the pre-scored book. Fill in the form below to score them.")
+            return
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Probability", f"{record['probability']*100:.1f}%")
+        c2.metric("Prediction", "✅ Likely" if record['label'] == 1 else "❌ Unlikely")
+        c3.metric(f"Rank in {record['segment']}", f"{record['rank']:,} / {record['segment_rows']:,}")
+        st.caption(f"Scored {time.strftime('%d %b %H:%M', time.localtime(record['scored_at']))} with model "
+                   f"{table.meta['model_version']} · found in {lookup_ms:.2f} ms")
+        if not matches_live_model(table.meta, bundle): # by sha256, a replaced flat model is still 'local'
+            st.warning(f"⚠️ The book was scored with another model ({table.meta['model_version']}) than the live "
+                       f"one ({bundle['version']}). Run `python score_table.py refresh` to re-score it.")
+
+
+@st.fragment
+def render_book_section():
+    rm_id = (st.session_state.get('rm_id') or "").strip()
+    table = get_score_table()
+    if not rm_id or table is None:
+        return
+    st.markdown("""
+    <div class="section-header">
+        <h3>Pre-scored Book</h3>
+        <p>The whole customer book, scored overnight. Only customers whose details changed are re-scored each night.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    segments = table.segments()
+    c1, c2 = st.columns([2, 1])
+    segment = c1.selectbox("Segment", segments, index=segments.index(rm_id) if rm_id in segments else 0,
+                           key="book_segment")
+    limit = c2.select_slider("Show top", [10, 20, 50, 100], value=20, key="book_limit")
+    top = table.top(segment, limit)
+    top['probability'] = (top['probability'] * 100).round(1)
+    top['label'] = top['label'].map({1: "✅ Likely", 0: "❌ Unlikely"})
+    top['scored_at'] = pd.to_datetime(top['scored_at'], unit='s').dt.strftime("%d %b %H:%M")
+    st.dataframe(top.drop(columns='segment').rename(columns={'customer_id': "Customer ID",
+                                                             'probability': "Probability (%)",
+                                                             'label': "Prediction", 'scored_at': "Scored"}),
+                 hide_index=True, use_container_width=True)
+    meta = table.meta
+    st.caption(f"{meta['rows']:,} customers · model {meta['model_version']} · last refresh "
+               f"{time.strftime('%d %b %H:%M', time.localtime(meta['built']))} re-scored {meta['rescored']:,} "
+               f"({meta['reason']})")
+
+    # outcomes go with the score + model version the RM saw when deciding to call
+    with st.form("call_outcome_form", clear_on_submit=True):
+        st.markdown("**📞 Log a call outcome**")
+        c1, c2, c3 = st.columns([2, 2, 1])
+        customer_id = c1.selectbox("Customer ID", top['customer_id'].tolist(), key="outcome_customer")
+        outcome = c2.radio("Outcome", ["Subscribed", "Not subscribed"], horizontal=True, key="outcome_value")
+        c3.markdown("<br>", unsafe_allow_html=True)
+        logged = c3.form_submit_button("Save", use_container_width=True)
+    if logged and customer_id is not None:
+        record = table.lookup(customer_id)
+        get_feedback_log().append([customer_id], [record['probability']], meta['model_version'],
+                                  [int(outcome == "Subscribed")])
+        st.success(f"✅ Logged {customer_id}: {outcome.lower()}")
+
+
+JOB_STATUS_ICONS = {QUEUED: "⏳ queued", RUNNING: "⚙️ running", DONE: "✅ done", FAILED: "❌ failed",
+                    CANCELLED: "🚫 cancelled"}
+
+
+@st.fragment # Refresh / Cancel / Retry only rerun this section
+def render_jobs_section():
+    rm_id = (st.session_state.get('rm_id') or "").strip()
+    if not rm_id:
+        return # render_prospects_tab already asks for the RM ID
+
+    st.markdown("---")
+    st.markdown("""
+    <div class="section-header">
+        <h3>Large Files</h3>
+        <p>Big customer files are scored in the background, so you can keep predicting. Come back here for progress and the download.</p>
+    </div>
+    """, unsafe_allow_html=True)
+    queue = get_job_runner().queue
+
+    with st.form("job_upload", border=False):
+        upload = st.file_uploader("Customer file (CSV with the 18 customer fields, optional customer_id)", type="csv",
+                                  key="job_file")
+        if st.form_submit_button("Queue Scoring Job") and upload is not None:
+            header = upload.getvalue()[:65536].split(b"\n", 1)[0].decode(errors="ignore")
+            sep = ";" if header.count(";") > header.count(",") else "," # UCI exports use ';'
+            columns = [col.strip().strip('"') for col in header.split(sep)]
+            job_id = queue.submit(rm_id, upload, upload.name,
+                                  {'sep': sep, 'id_col': "customer_id" if "customer_id" in columns else None})
+            st.success(f"✅ Job #{job_id} queued - it starts as soon as a slot is free")
+
+    jobs = queue.jobs(rm_id, limit=10)
+    if jobs.empty:
+        st.caption("No jobs yet.")
+        return
+    st.button("🔄 Refresh", key="jobs_refresh") # clicking any button reruns the fragment with fresh status
+
+    for job in jobs.to_dict('records'):
+        c1, c2, c3 = st.columns([3, 3, 2])
+        submitted = time.strftime('%d %b %H:%M', time.localtime(job['submitted_at']))
+        c1.markdown(f"**#{job['id']} {job['name']}** · {JOB_STATUS_ICONS[job['status']]}")
+        c1.caption(f"Submitted {submitted}" + (f" · {job['message']}" if job['message'] else ""))
+        if job['status'] == RUNNING and pd.notna(job['rows_total']) and job['rows_total'] > 0:
+            c2.progress(min(job['rows_done'] / job['rows_total'], 1.0),
+                        text=f"{job['rows_done']:,.0f} / {job['rows_total']:,.0f} rows")
+        if job['status'] in ACTIVE:
+            if c3.button("Cancel", key=f"job_cancel_{job['id']}"):
+                queue.cancel(job['id'])
+                st.rerun(scope="fragment")
+        elif job['status'] in (FAILED, CANCELLED):
+            if c3.button("Retry", key=f"job_retry_{job['id']}"):
+                queue.retry(job['id'])
+                st.rerun(scope="fragment")
+        elif os.path.exists(queue.output_path(job['id'])):
+            with open(queue.output_path(job['id']), "rb") as f:
+                c3.download_button("⬇️ Download", f.read(), file_name=f"scores-{job['id']}.parquet",
+                                   key=f"job_download_{job['id']}")
+#---------------------------------------------------------------------------------------------------------
+
+
+
+
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 10: DRIFT TAB (+ shadow model comparison)
+# also fragments, so Refresh / Reset only rerun this tab
+
+DRIFT_STATUS_ICONS = {"major": "🔴 major", "moderate": "🟠 moderate", "stable": "🟢 stable",
+                      "not enough data": "⚪ not enough data"}
+
+
+@st.fragment
+def render_drift_tab():
+    st.markdown("""
+    <div class="section-header">
+        <h3>Data Drift Monitor</h3>
+        <p>Customers scored in the app and by batch jobs vs the training data. PSI &lt; 0.1 is stable, 0.1-0.25 moderate shift, &gt; 0.25 major shift.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    reference = load_drift_reference()
+    if reference is None:
+        st.info("💡 No reference profile yet. Run `python drift_monitor.py build-reference` after training the model.")
+        return
+
+    # clicking a button inside a fragment already reruns it, so Refresh needs no code of its own
+    recorder = get_drift_recorder()
+    b1, b2, _ = st.columns([1, 1, 3])
+    b1.button("🔄 Refresh", key="drift_refresh")
+    if b2.button("🗑️ Reset window", key="drift_reset"):
+        recorder.reset()
+
+    live = recorder.snapshot()
+    if live.rows == 0:
+        st.info("💡 No customers scored since the last reset. Run some predictions or a batch job first.")
+        return
+
+    report = compare(reference, live)
+    major = report.loc[report['status'] == "major", 'column'].tolist()
+    moderate = report.loc[report['status'] == "moderate", 'column'].tolist()
+
+    # alert banner
+    if major:
+        st.error(f"🚨 **Major drift:** {', '.join(major)} - predictions may be unreliable, consider retraining.")
+    if moderate:
+        st.warning(f"⚠️ **Moderate drift:** {', '.join(moderate)} - keep an eye on these.")
+    if not major and not moderate:
+        st.success("✅ All monitored inputs and scores look like the training data.")
+
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Customers in window", f"{live.rows:,}")
+    c2.metric("Reference rows", f"{reference.rows:,}")
+    c3.metric("Columns drifting", len(major) + len(moderate))
+
+    table = report.assign(status=report['status'].map(DRIFT_STATUS_ICONS)).rename(columns={
+        'column': "Column", 'type': "Type", 'psi': "PSI", 'ks': "KS", 'live_rows': "Rows", 'status': "Status"})
+    st.dataframe(table, hide_index=True, use_container_width=True,
+                 column_config={"PSI": st.column_config.NumberColumn(format="%.3f"),
+                                "KS": st.column_config.NumberColumn(format="%.3f")})
+
+
+@st.fragment
+def render_shadow_section():
+    st.markdown("""
+    <div class="section-header">
+        <h3>Shadow Model</h3>
+        <p>A candidate model scores the same customers in the background (Predict tab + batch jobs) without affecting any result, so it can be checked on real traffic before promotion.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    scorer = get_shadow_scorer()
+    candidate = scorer.candidate()
+    try:
+        stat = os.stat(SHADOW_LOG)
+        overall, by_group = load_shadow_summary((stat.st_size, stat.st_mtime_ns))
+    except FileNotFoundError:
+        overall, by_group = None, None
+
+    if candidate is None and overall is None:
+        st.info("💡 No shadow candidate. Register a model with `python model_registry.py register --no-activate`, "
+                "then `python model_registry.py shadow <version>`.")
+        return
+    if overall is None:
+        st.info(f"💡 Shadow candidate **{candidate}** is loaded. Run some predictions to compare it.")
+        return
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Candidate", candidate or "off")
+    c2.metric("Customers compared", f"{overall['rows']:,}")
+    c3.metric("Yes/No disagreement", f"{overall['disagreement_rate']*100:.1f}%")
+    c4.metric("Mean |Δ probability|", f"{overall['mean_abs_delta']*100:.1f} pts")
+    st.caption(f"Candidate says yes where live says no: {overall['flips_up']:,} · the other way: "
+               f"{overall['flips_down']:,} · mean Δ {overall['mean_delta']*100:+.1f} pts · "
+               f"p95 |Δ| {overall['p95_abs_delta']*100:.1f} pts")
+
+    st.dataframe(by_group.rename(columns={'candidate': "Candidate", 'source': "Source", 'rows': "Rows",
+                                          'disagreement_rate': "Disagreement", 'mean_delta': "Mean Δ",
+                                          'mean_abs_delta': "Mean |Δ|"}),
+                 hide_index=True, use_container_width=True,
+                 column_config={"Disagreement": st.column_config.NumberColumn(format="%.3f"),
+                                "Mean Δ": st.column_config.NumberColumn(format="%.4f"),
+                                "Mean |Δ|": st.column_config.NumberColumn(format="%.4f")})
+    if scorer.dropped or scorer.errors:
+        st.caption(f"⚠️ Shadow thread skipped {scorer.dropped:,} rows (busy) and failed on {scorer.errors:,}")
+
+
+@st.fragment
+def render_inference_section():
+    st.markdown("""
+    <div class="section-header">
+        <h3>Inference Load</h3>
+        <p>Every prediction in this server process shares one pool of inference threads. Interactive requests wait ahead of list uploads; growing waits mean the container needs more CPUs (or INFERENCE_WORKERS).</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    stats = get_inference_governor().stats()
+    queues = stats['queues']
+    interactive = queues.loc[queues['queue'] == "interactive"].iloc[0]
+    st.button("🔄 Refresh", key="inference_refresh")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Workers", f"{stats['workers']} × {stats['blas_threads']} BLAS")
+    c2.metric("Queued now", int(queues['depth'].sum()))
+    c3.metric("Interactive wait p95", f"{interactive['wait_p95_ms']:.0f} ms")
+    c4.metric("Interactive predict p95", f"{interactive['service_p95_ms']:.0f} ms")
+    st.dataframe(queues.rename(columns={'queue': "Queue", 'depth': "Depth", 'max_depth': "Max depth",
+                                        'running': "Running", 'completed': "Completed",
+                                        'wait_p50_ms': "Wait p50 (ms)", 'wait_p95_ms': "Wait p95 (ms)",
+                                        'service_p50_ms': "Run p50 (ms)", 'service_p95_ms': "Run p95 (ms)"}),
+                 hide_index=True, use_container_width=True,
+                 column_config={c: st.column_config.NumberColumn(format="%.1f")
+                                for c in ["Wait p50 (ms)", "Wait p95 (ms)", "Run p50 (ms)", "Run p95 (ms)"]})
+#---------------------------------------------------------------------------------------------------------
+
+
+
+
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 11: BUSINESS IMPACT (feature importance, segments, live results + campaign simulator, Performance tab)
+
+# short description next to each field in the importance cards
+FIELD_DESCRIPTIONS = {
+    'age': "Customer age", 'job': "Type of job", 'marital': "Marital status", 'education': "Education level",
+    'default': "Has credit in default", 'housing': "Has a housing loan", 'loan': "Has a personal loan",
+    'contact': "Cellular or telephone", 'month': "Month of last contact", 'day_of_week': "Day of last contact",
+    'campaign': "Contacts in this campaign", 'pdays': "Days since previous campaign",
+    'previous': "Contacts before this campaign", 'poutcome': "Previous campaign outcome",
+    'emp.var.rate': "Employment variation rate", 'cons.price.idx': "Consumer price index",
+    'cons.conf.idx': "Consumer confidence index", 'euribor3m': "European interbank interest rate",
+    'nr.employed': "Employment level in economy",
+}
+
+
+def render_importance_cards(bundle):
+    """Top features + engineered features cards from feature_importance.py, True if they were drawn
+    (False = nothing saved for the live model, the caller keeps the notebook figures)"""
+    saved = load_feature_importance(bundle['folder'])
+    if saved is None or not matches_live_model(saved, bundle): # computed for another model, don't show its numbers
+        return False
+
+    table = saved['table']
+    raw = table[table['kind'] != 'engineered'].head(5)
+    engineered = table[table['kind'] == 'engineered']
+    economic_share = table.loc[table['kind'] == 'economic', 'share'].sum()
+    top_lines = "".join(f"<strong>{i}. {row.field}</strong> - {FIELD_DESCRIPTIONS.get(row.field, '')} "
+                        f"({row.share:.1%})<br>" for i, row in enumerate(raw.itertuples(), 1))
+    engineered_lines = "".join(f"<strong>{row.field}</strong> - {row.share:.1%} importance<br>"
+                               for row in engineered.itertuples())
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.markdown(f"""
+        <div class="card">
+            <h4>🏆 Top Predictive Features</h4>
+            <p>
+            {top_lines}<br>
+            <em>Economic indicators account for ~{economic_share:.0%} of total importance - economic conditions heavily influence whether customers invest in term deposits.</em>
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+    with c2:
+        st.markdown(f"""
+        <div class="card">
+            <h4>🔧 Engineered Features (~{engineered['share'].sum():.1%} Total)</h4>
+            <p>
+            {engineered_lines}<br>
+            <em>Share of the held-out {saved['metric']} lost when the feature is shuffled.</em>
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    st.caption(f"Permutation importance of model {saved['model_version']} on {saved['rows']:,} held-out customers "
+               f"({saved['repeats']} shuffles per field, categorical fields shuffled with all their one-hot columns "
+               f"together), computed {saved['built']}.")
+    with st.expander("All fields"):
+        st.dataframe(table.assign(share=(table['share'] * 100).round(1)).round(4).rename(columns={
+            'field': "Field", 'kind': "Kind", 'importance': f"{saved['metric']} drop", 'std': "Std",
+            'share': "Share %"}), hide_index=True, use_container_width=True)
+    return True
+
+
+def create_segment_chart(table, overall_recall):
+    """Recall per segment with its bootstrap interval, overall recall as a dashed line"""
+    colors = np.where(table['below_overall'], '#F87171', '#6C63FF')
+    fig = go.Figure(go.Bar(
+        x=table['recall'] * 100, y=table['segment'], orientation='h', marker_color=colors,
+        error_x=dict(type='data', symmetric=False, array=(table['recall_high'] - table['recall']) * 100,
+                     arrayminus=(table['recall'] - table['recall_low']) * 100, color='rgba(255,255,255,0.5)'),
+        customdata=table[['rows', 'subscribers']],
+        hovertemplate="%{y}: %{x:.1f}% recall<br>%{customdata[1]} of %{customdata[0]} customers subscribed"
+                      "<extra></extra>",
+    ))
+    fig.add_vline(x=overall_recall * 100, line_dash='dash', line_color='#5EFCE8',
+                  annotation_text=f"Overall {overall_recall:.0%}", annotation_position='top')
+    fig.update_layout(
+        height=max(220, 34 * len(table) + 60),
+        margin=dict(l=20, r=20, t=30, b=15),
+        font=dict(family='DM Sans', size=13, color='rgba(255,255,255,0.6)'),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        xaxis_title="Recall (%)", yaxis=dict(autorange='reversed'),
+    )
+    return fig
+
+
+@st.fragment # switching the segment only reruns this section
+def render_segment_section():
+    st.markdown("""
+    <div class="section-header">
+        <h3>Performance by Segment</h3>
+        <p>Recall and precision per customer group on the held-out test set. Bars show 95% bootstrap intervals, red segments are reliably below the overall recall.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    bundle = load_models()
+    if bundle is None:
+        return
+    saved = load_segment_report(bundle['folder'])
+    if saved is None or not matches_live_model(saved, bundle):
+        st.info("💡 No segment report for the live model yet. Run `python segment_report.py` to build it.")
+        return
+
+    table = saved['table']
+    flagged = table[table['below_overall']]
+    for row in flagged.itertuples():
+        st.warning(f"⚠️ **{row.dimension} = {row.segment}**: recall {row.recall:.1%} "
+                   f"({row.recall_low:.1%}-{row.recall_high:.1%}) vs {saved['recall']:.1%} overall")
+
+    dimension = st.selectbox("Segment by", list(table['dimension'].unique()), key="segment_dimension")
+    sliced = table[table['dimension'] == dimension]
+    st.plotly_chart(create_segment_chart(sliced, saved['recall']), use_container_width=True)
+
+    shown = pd.DataFrame({
+        "Segment": sliced['segment'], "Customers": sliced['rows'], "Subscribers": sliced['subscribers'],
+        "Recall": [f"{r:.1%} ({lo:.1%}-{hi:.1%})" for r, lo, hi in
+                   zip(sliced['recall'], sliced['recall_low'], sliced['recall_high'])],
+        "Precision": [f"{p:.1%} ({lo:.1%}-{hi:.1%})" for p, lo, hi in
+                      zip(sliced['precision'], sliced['precision_low'], sliced['precision_high'])],
+    })
+    st.dataframe(shown, hide_index=True, use_container_width=True)
+    st.caption(f"Model {saved['model_version']} on {saved['rows']:,} held-out customers, {saved['boot']:,} bootstrap "
+               f"resamples, computed {saved['built']}.")
+
+
+@st.fragment
+def render_feedback_section():
+    st.markdown("""
+    <div class="section-header">
+        <h3>Live Results</h3>
+        <p>Real call outcomes logged by RMs in My Prospects. Only called customers have an outcome, so recall here is the share of called subscribers the model flagged.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    log = get_feedback_log()
+    metrics = load_feedback_metrics(log.signature())
+    if metrics.empty:
+        st.info("💡 No call outcomes logged yet. Log them under the Pre-scored Book in My Prospects or with "
+                "`python feedback_log.py import outcomes.csv`.")
+        return
+
+    bundle = load_models()
+    live = metrics[metrics['model_version'] == bundle['version']] if bundle is not None else metrics.iloc[:0]
+    if len(live):
+        row = live.iloc[0]
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Calls logged", f"{int(row['outcomes']):,}")
+        c2.metric("Conversion rate", f"{row['conversion_rate']:.1%}")
+        c3.metric("Live precision", "-" if pd.isna(row['precision']) else f"{row['precision']:.1%}")
+        c4.metric("Live recall", "-" if pd.isna(row['recall']) else f"{row['recall']:.1%}")
+
+    st.dataframe(metrics.rename(columns={
+        'model_version': "Model", 'outcomes': "Calls", 'subscribers': "Subscribed",
+        'conversion_rate': "Conversion rate", 'precision': "Precision", 'recall': "Recall"}).round(3),
+        hide_index=True, use_container_width=True)
+    st.caption(f"{len(log.pending())} outcome batches since the last `python feedback_log.py compact`.")
+
+
+def create_campaign_chart(daily):
+    """Cumulative conversions per working day, mean line + 5-95% band for both strategies"""
+    fig = go.Figure()
+    for strategy, name, color, fill in (('random', "Random calling", '#F87171', 'rgba(248, 113, 113, 0.15)'),
+                                        ('model', "Model-ranked", '#6C63FF', 'rgba(108, 99, 255, 0.2)')):
+        fig.add_trace(go.Scatter(x=daily['day'], y=daily[f'{strategy}_high'], mode='lines', line={'width': 0},
+                                 showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=daily['day'], y=daily[f'{strategy}_low'], mode='lines', line={'width': 0},
+                                 fill='tonexty', fillcolor=fill, showlegend=False, hoverinfo='skip'))
+        fig.add_trace(go.Scatter(x=daily['day'], y=daily[f'{strategy}_mean'], mode='lines', name=name,
+                                 line={'color': color, 'width': 3}))
+    fig.update_layout(
+        height=320,
+        margin=dict(l=20, r=20, t=25, b=15),
+        font=dict(family='DM Sans', size=13, color='rgba(255,255,255,0.6)'),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        xaxis_title="Working day", yaxis_title="Deposits so far",
+        legend=dict(orientation='h', y=1.1),
+    )
+    return fig
+
+
+@st.fragment # moving a slider only reruns the simulator
+def render_campaign_simulator():
+    st.markdown("""
+    <div class="section-header">
+        <h3>Business Impact Simulator</h3>
+        <p>Simulates thousands of campaigns on real scored customers: call the model's top customers first vs call at random. Bands show the 5th-95th percentile of outcomes.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    bundle = load_models()
+    if bundle is None:
+        return
+    pools = {}
+    table = get_score_table()
+    if table is not None and matches_live_model(table.meta, bundle): # 'local' == 'local' says nothing, the sha does
+        pools[f"Pre-scored book ({len(table.frame):,} customers)"] = table.frame['probability'].to_numpy()
+    saved = load_saved_probabilities(score_version(bundle))
+    if len(saved):
+        pools[f"Saved scores ({len(saved):,} customers)"] = saved
+    if not pools:
+        st.info("💡 No scored customers for this model yet. Run `python score_table.py refresh <book.csv>` or "
+                "upload a list in My Prospects.")
+        return
+
+    c1, c2, c3, c4, c5 = st.columns([2, 1, 1, 1, 1])
+    pool = c1.selectbox("Customers to call", list(pools), key="campaign_pool")
+    rms = c2.slider("RMs", 1, 10, 3, key="campaign_rms")
+    calls_per_day = c3.slider("Calls / RM / day", 10, 80, 40, 5, key="campaign_calls")
+    weeks = c4.slider("Weeks", 1, 12, 4, key="campaign_weeks")
+    runs = c5.select_slider("Simulated runs", [500, 1000, 2000, 5000], value=1000, key="campaign_runs")
+
+    # forest scores are not conversion chances (class_weight='balanced'), map them through the held-out curve
+    budget = live_call_budget(bundle)
+    if budget is None:
+        chances = pools[pool]
+        st.warning("⚠️ No held-out curve for this model (run `python threshold_optimizer.py`), raw scores are used as "
+                   "conversion chances so the totals below are too high.")
+    else:
+        chances = conversion_chance(pools[pool], calibration_table(budget['curve']))
+
+    start = time.perf_counter()
+    daily, totals = summarise_campaign(simulate_campaign(chances, rms, calls_per_day, weeks, runs))
+    simulate_ms = (time.perf_counter() - start) * 1000
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Model-ranked deposits", f"{totals['model_mean']:,.0f}",
+              help=f"{BAND[0]}-{BAND[1]}%: {totals['model_low']:,.0f} - {totals['model_high']:,.0f}")
+    m2.metric("Random calling deposits", f"{totals['random_mean']:,.0f}",
+              help=f"{BAND[0]}-{BAND[1]}%: {totals['random_low']:,.0f} - {totals['random_high']:,.0f}")
+    m3.metric("Lift", f"{totals['lift']:.1f}×")
+    m4.metric("Model beats random", f"{totals['model_wins']:.0%} of runs")
+    st.plotly_chart(create_campaign_chart(daily), use_container_width=True)
+    planned = rms * calls_per_day * weeks * WORKING_DAYS
+    st.caption(f"{totals['calls']:,} calls"
+               + (f" (the pool runs out before the planned {planned:,})" if totals['calls'] < planned else "")
+               + f" · model-ranked {totals['model_low']:,.0f}-{totals['model_high']:,.0f}, random "
+               f"{totals['random_low']:,.0f}-{totals['random_high']:,.0f} deposits ({BAND[0]}-{BAND[1]}%) · "
+               f"{runs:,} campaigns simulated in {simulate_ms:.0f} ms")
+#---------------------------------------------------------------------------------------------------------
+
+
+
+
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 12: MAIN APP
+
+def main():
+    # Firslty, need to load all model files (kept loaded + hot-swapped by the handle)
+    handle = get_model_handle()
+
+    # also need to apply CSS theme so can use dark and light 
+    apply_theme()
+
+    # SIDEBAR
+    with st.sidebar:
+        st.markdown("""
+        <div style="text-align:center; padding: 1rem 0 1.2rem;">
+            <div style="font-size:2rem; margin-bottom:0.3rem;">🤖</div>
+            <div style="font-size:1.4rem; font-weight:700; background: linear-gradient(135deg, #5EFCE8, #6C63FF);
+            -webkit-background-clip: text; -webkit-text-fill-color: transparent;">BankConvert AI</div>
+            <div style="font-size:0.75rem; color:rgba(255,255,255,0.4) !important; margin-top:0.2rem;
+            letter-spacing:0.08em; text-transform:uppercase;">ML Prediction Engine</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown("---") # divider line for neat
+
+        # Theme toggle but show current state first
+        theme_label = "🌙 Dark Mode" if get_theme() == "dark" else "☀️ Light Mode"
+        if st.button(theme_label, key="theme_toggle"):            
+            st.session_state.theme = "light" if st.session_state.theme == "dark" else "dark"
+            st.rerun() # Rerun to apply new theme
+
+        st.markdown("---")
+
+        # MODEL STATS so that can know 
+        st.markdown("""
+        <div class="sb-card"><span class="sb-label">Model</span><span class="sb-value">Random Forest</span></div>
+        <div class="sb-card"><span class="sb-label">F1-Score</span><span class="sb-value">48.58%</span></div>
+        <div class="sb-card"><span class="sb-label">Recall</span><span class="sb-value">52.37%</span></div>
+        <div class="sb-card"><span class="sb-label">Test Results</span><span class="sb-value">729 / 1,392</span></div>
+        """, unsafe_allow_html=True)
+
+        # live model version + one-click rollback (rollback only with a models/ registry)
+        bundle = handle.get()
+        if bundle is not None:
+            st.markdown(f"""
+            <div class="sb-card"><span class="sb-label">Version</span><span class="sb-value">{bundle['version']} · {bundle['loaded_at']}</span></div>
+            """, unsafe_allow_html=True)
+        previous = previous_version() if read_pointer() else None
+        if previous and st.button(f"↩️ Roll back to {previous}", key="model_rollback"):
+            rollback()
+            handle.check() # load it now instead of waiting for the next poll
+            st.rerun()
+        if handle.last_error:
+            st.caption(f"⚠️ New model not loaded, still serving the old one ({handle.last_error})")
+
+        st.markdown("---")
+
+        # which RM is using the app, for saved scores + My Prospects
+        st.text_input("Your RM ID", key="rm_id", placeholder="e.g. RM007")
 
+        st.markdown("---")
+
+        # for me 
+        st.markdown("### Developer")
+        st.markdown("**Melissa Kuah** (2404487G)  \nML for Developers (P01) \nTemasek Polytechnic")
 
+        st.markdown("---")
 
-    # TAB 2: PERFORMANCE
+        # Model improvement summary so that can pitch better 
+        st.markdown("### Improvement")
+        st.markdown("""
+        Recall: **31.68% => 52.37%**  
+        Finding **+288 more** subscribers  
+        F1: **39.52% => 48.58%**
+        """)
+
+    # HERO HEADER
+    st.markdown("""
+    <div class="hero">
+        <h1>BankConvert AI</h1>
+        <div class="subtitle">Predict term deposit subscription likelihood before the call</div>
+        <div class="badge">🤖 Random Forest · Tuned · class_weight='balanced'</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # TABS
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["🔮  Predict", "⭐  My Prospects", "📊  Performance", "📡  Drift",
+                                                  "🧠  How It Works", "📋  About"])
+
+    # TAB 1: PREDICT
+    # To allow user to input customer data and get a prediction
+    with tab1:
+        render_predict_tab()
+
+
+    # TAB 2: MY PROSPECTS
     with tab2:
+        render_prospects_tab()
+        render_book_section()
+        render_jobs_section()
+
+    # TAB 3: PERFORMANCE
+    with tab3:
         st.markdown("""
         <div class="section-header">
             <h3>Model Performance</h3>
@@ -1372,37 +2290,42 @@ def main():
 
         st.markdown("---")
 
-        c1, c2 = st.columns(2)
-        with c1: # show user top predictive features
-            st.markdown("""
-            <div class="card">
-                <h4>🏆 Top Predictive Features</h4>
-                <p>
-                <strong>1. euribor3m</strong> - European interbank interest rate<br>
-                <strong>2. nr.employed</strong> - Employment level in economy<br>
-                <strong>3. emp.var.rate</strong> - Employment variation rate<br>
-                <strong>4. cons.conf.idx</strong> - Consumer confidence index<br>
-                <strong>5. age</strong> - Customer age<br><br>
-                <em>Economic indicators dominate ~40% of total importance - this makes business sense since economic conditions heavily influence whether customers invest in term deposits.</em>
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
+        # live numbers for the served model once feature_importance.py has run, else the notebook's figures
+        bundle = load_models()
+        if bundle is None or not render_importance_cards(bundle):
+            c1, c2 = st.columns(2)
+            with c1: # show user top predictive features
+                st.markdown("""
+                <div class="card">
+                    <h4>🏆 Top Predictive Features</h4>
+                    <p>
+                    <strong>1. euribor3m</strong> - European interbank interest rate<br>
+                    <strong>2. nr.employed</strong> - Employment level in economy<br>
+                    <strong>3. emp.var.rate</strong> - Employment variation rate<br>
+                    <strong>4. cons.conf.idx</strong> - Consumer confidence index<br>
+                    <strong>5. age</strong> - Customer age<br><br>
+                    <em>Economic indicators dominate ~40% of total importance - this makes business sense since economic conditions heavily influence whether customers invest in term deposits.</em>
+                    </p>
+                </div>
+                """, unsafe_allow_html=True)
 
 
-        with c2: # ngineered features importance
-            st.markdown("""
-            <div class="card">
-                <h4>🔧 Engineered Features (~11.5% Total)</h4>
-                <p>
-                <strong>age_group</strong> - 3.1% importance<br>
-                <strong>contact_recency</strong> - 2.9% importance<br>
-                <strong>contacted_before</strong> - 2.3% importance<br>
-                <strong>economic_condition</strong> - 1.7% importance<br>
-                <strong>prev_success</strong> - 1.5% importance<br><br>
-                <em>All 5 engineered features add meaningful predictive signal that raw features alone cannot capture.</em>
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
+            with c2: # ngineered features importance
+                st.markdown("""
+                <div class="card">
+                    <h4>🔧 Engineered Features (~11.5% Total)</h4>
+                    <p>
+                    <strong>age_group</strong> - 3.1% importance<br>
+                    <strong>contact_recency</strong> - 2.9% importance<br>
+                    <strong>contacted_before</strong> - 2.3% importance<br>
+                    <strong>economic_condition</strong> - 1.7% importance<br>
+                    <strong>prev_success</strong> - 1.5% importance<br><br>
+                    <em>All 5 engineered features add meaningful predictive signal that raw features alone cannot capture.</em>
+                    </p>
+                </div>
+                """, unsafe_allow_html=True)
+            st.caption("Figures from the training notebook. Run `python feature_importance.py` to compute them "
+                       "for the live model.")
 
         st.markdown("---")
 
@@ -1419,8 +2342,24 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
-    # TAB 3: HOW IT WORKS
-    with tab3:
+        st.markdown("---")
+        render_segment_section()
+
+        st.markdown("---")
+        render_feedback_section()
+
+        st.markdown("---")
+        render_campaign_simulator()
+
+    # TAB 4: DRIFT
+    # live inputs + scores vs training data
+    with tab4:
+        render_drift_tab()
+        render_shadow_section()
+        render_inference_section()
+
+    # TAB 5: HOW IT WORKS
+    with tab5:
         st.markdown("""
         <div class="section-header">
             <h3>How BankConvert AI Works</h3>
@@ -1564,8 +2503,8 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
-    # TAB 4: ABOUT
-    with tab4:
+    # TAB 6: ABOUT
+    with tab6:
         st.markdown("""
         <div class="section-header">
             <h3>About This Project</h3>
@@ -0,0 +1,181 @@
+"""
+CAPACITY-AWARE DECISION THRESHOLD FOR BANKCONVERT AI
+
+1. Why: the app says "LIKELY TO SUBSCRIBE" whenever the probability is over 0.5, but an RM does not have a 0.5
+problem, they have a "I can make N calls today" problem. The right cut depends on how many calls they can make.
+
+2. How:
+   - score the held-out 30% split once, sort the probabilities ONCE and get the whole precision / recall / F1 / lift
+     curve from cumulative sums (O(n log n) for every threshold at the same time, not one evaluation per threshold)
+   - for a budget of calls_per_day out of leads_per_day customers, the best cut is the lowest threshold whose call
+     share still fits the budget -> found with searchsorted on the curve, so the app can redo it instantly
+   - the chosen threshold + the curve are saved next to the other .pkl files (decision_threshold.pkl) with the sha256
+     of the model file they were computed for, a curve from an earlier forest is never used for the current one
+
+Usage:
+    python threshold_optimizer.py bank-additional-full.csv --calls-per-day 40 --leads-per-day 200
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+THRESHOLD_PATH = "decision_threshold.pkl"
+DEFAULT_THRESHOLD = 0.5 # model's own cut, used when decision_threshold.pkl has not been built
+
+# one RM's day: customers due for a call (leads) vs calls they can actually make
+DEFAULT_CALLS_PER_DAY = 40
+DEFAULT_LEADS_PER_DAY = 200
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: CURVE (one sorted pass)
+
+def threshold_curve(y_true, probabilities):
+    """Every distinct probability as a threshold (call if probability >= threshold), highest first.
+    Columns: threshold, call_rate, subscriber_rate (subscribers reached / all customers), precision, recall, f1, lift"""
+    y_true = np.asarray(y_true, dtype=np.int64)
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    n = len(y_true)
+    positives = max(int(y_true.sum()), 1)
+
+    order = np.argsort(-probabilities, kind='mergesort')
+    p_sorted = probabilities[order]
+    tp = np.cumsum(y_true[order])
+    calls = np.arange(1, n + 1)
+
+    # tied probabilities are called together, so only the last row of each tie is a real threshold
+    last_of_tie = np.r_[p_sorted[1:] != p_sorted[:-1], True]
+    p_sorted, tp, calls = p_sorted[last_of_tie], tp[last_of_tie], calls[last_of_tie]
+
+    precision = tp / calls
+    recall = tp / positives
+    with np.errstate(invalid='ignore', divide='ignore'):
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+    return pd.DataFrame({
+        'threshold': p_sorted,
+        'call_rate': calls / n,
+        'subscriber_rate': tp / n,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1,
+        'lift': precision / (positives / n), # vs calling customers at random
+    })
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: BUDGET CUT
+
+def budget_threshold(curve, calls_per_day, leads_per_day):
+    """Threshold that reaches the most subscribers without going over calls_per_day.
+    call_rate and subscriber_rate only go up as the threshold goes down, so:
+    1. last row that fits the budget = most subscribers reachable
+    2. first row with that many subscribers = same subscribers for the fewest calls"""
+    call_share = min(calls_per_day / max(leads_per_day, 1), 1.0)
+    call_rate = curve['call_rate'].to_numpy()
+    subscriber_rate = curve['subscriber_rate'].to_numpy()
+
+    last = np.searchsorted(call_rate, call_share + 1e-12, side='right') - 1
+    over_budget = last < 0 # budget smaller than the top tie: still call the top customers, but say so
+    last = max(last, 0)
+    best = int(np.searchsorted(subscriber_rate, subscriber_rate[last], side='left'))
+
+    row = curve.iloc[best]
+    return {
+        'threshold': float(row['threshold']),
+        'calls_per_day': calls_per_day,
+        'leads_per_day': leads_per_day,
+        'expected_calls': float(row['call_rate'] * leads_per_day), # real calls, can be > calls_per_day
+        'over_budget': bool(over_budget),
+        'expected_subscribers': float(row['subscriber_rate'] * leads_per_day),
+        'precision': float(row['precision']),
+        'recall': float(row['recall']),
+        'f1': float(row['f1']),
+        'lift': float(row['lift']),
+    }
+
+
+def threshold_summary(curve, threshold):
+    """Curve row for an arbitrary threshold (e.g. the default 0.5) to compare against"""
+    idx = np.searchsorted(-curve['threshold'].to_numpy(), -threshold, side='right') - 1
+    if idx < 0:
+        return None # nobody would be called
+    return curve.iloc[idx].to_dict()
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: SAVE / LOAD
+
+def save_decision_threshold(choice, curve, path=THRESHOLD_PATH):
+    """Chosen cut + the curve (so the app can redo the cut for any budget), temp file + rename"""
+    tmp = path + ".tmp"
+    joblib.dump({**choice, 'curve': curve}, tmp)
+    os.replace(tmp, path)
+
+
+def load_decision_threshold(path=THRESHOLD_PATH):
+    """Saved cut + curve, or None if threshold_optimizer.py has not been run yet"""
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return None
+
+
+def load_model_threshold(model_sha256, path=THRESHOLD_PATH):
+    """Saved cut + curve only if it was computed for the model file with this sha256, else None
+    (retrain.py does not copy decision_threshold.pkl, so a found file can belong to an earlier forest)"""
+    saved = load_decision_threshold(path)
+    return saved if saved is not None and saved.get('model_sha256') == model_sha256 else None
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pick the decision threshold for an RM's daily call budget")
+    parser.add_argument("csv", nargs="?", default="bank-additional-full.csv", help="original dataset")
+    parser.add_argument("--sep", default=";")
+    parser.add_argument("--calls-per-day", type=int, default=DEFAULT_CALLS_PER_DAY)
+    parser.add_argument("--leads-per-day", type=int, default=DEFAULT_LEADS_PER_DAY)
+    parser.add_argument("--output", default=THRESHOLD_PATH)
+    args = parser.parse_args(argv)
+
+    from batch_score import file_fingerprint
+    from model_registry import resolve_artifact
+    from scoring import MODEL_PATH, load_artifacts, load_dataset_split, load_thresholds, score_frame
+    model, scaler, feature_columns = load_artifacts()
+    emp_median, nr_median = load_thresholds()
+    _, X_test, _, y_test = load_dataset_split(args.csv, args.sep)
+    probabilities, _ = score_frame(X_test, model, scaler, feature_columns, emp_median, nr_median)
+
+    curve = threshold_curve(y_test, probabilities)
+    choice = budget_threshold(curve, args.calls_per_day, args.leads_per_day)
+    choice['model_sha256'] = file_fingerprint(resolve_artifact(MODEL_PATH))
+    save_decision_threshold(choice, curve, args.output)
+
+    best_f1 = curve.iloc[int(curve['f1'].to_numpy().argmax())]
+    default = threshold_summary(curve, np.nextafter(DEFAULT_THRESHOLD, 1)) # app uses probability > 0.5
+    print(f"Held-out rows: {len(y_test):,} | thresholds on curve: {len(curve):,}")
+    print(f"Budget {args.calls_per_day} calls / {args.leads_per_day} leads per day -> call if probability >= "
+          f"{choice['threshold']:.3f}: ~{choice['expected_calls']:.1f} calls, "
+          f"~{choice['expected_subscribers']:.1f} subscribers, precision {choice['precision']:.1%}, "
+          f"lift {choice['lift']:.2f}x")
+    if choice['over_budget']:
+        print(f"⚠️ Budget too small: the top-scored tie group alone needs ~{choice['expected_calls']:.1f} calls, "
+              f"more than the {args.calls_per_day} allowed")
+    if default is not None:
+        print(f"Default 0.5 cut: ~{default['call_rate'] * args.leads_per_day:.1f} calls, "
+              f"~{default['subscriber_rate'] * args.leads_per_day:.1f} subscribers, precision {default['precision']:.1%}")
+    print(f"Best F1 cut: {best_f1['threshold']:.3f} (F1 {best_f1['f1']:.1%})")
+    print(f"Saved -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
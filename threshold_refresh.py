@@ -0,0 +1,192 @@
+"""
+STREAMING THRESHOLD REFRESH FOR BANKCONVERT AI
+
+1. Why: economic_condition compares every customer against emp_median / nr_median from thresholds.pkl. Refreshing
+them used to mean loading the whole CSV into pandas, deduplicating and redoing train_test_split, which does not
+scale with years of campaign history.
+
+2. How:
+   - every cut point is a quantile of one raw column (CUT_POINTS, today the two medians) from a mergeable
+     CountingQuantile (sketches.py): exact value counts while a column has <= 1000 distinct values (true for the
+     bank's macro columns), a KLL QuantileSketch past that, so memory is bounded however many rows
+   - each input file is split into row-range shards (same byte-offset plan as batch_score.py), every shard is
+     sketched in its own process reading only the needed columns, and the partial sketches are merged at the end
+   - thresholds.pkl is rewritten (temp file + rename) with a version number, the row count and the sources,
+     and the old file is kept as thresholds.vN.pkl. With --register the new cut points become a new registry
+     version instead (not live until activated / shadowed, since the model was trained with the old cuts)
+
+3. Differences vs the notebook: all rows of the given files are used (no dedup or train split, neither can be done
+in constant memory), and only in sketch mode the median has a small rank error (about 1% of rows at k=400).
+The age / pdays bands in engineer_features are fixed business rules, not data cut points, so they stay as they are.
+
+Usage:
+    python threshold_refresh.py campaigns-2024.csv campaigns-2025.csv --sep ";" --workers 4
+    python threshold_refresh.py bank-additional-full.csv --sep ";" --register
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import pandas as pd
+
+from batch_score import plan_shards
+from model_registry import read_pointer, register, version_dir
+from scoring import THRESHOLDS_PATH, iter_csv_chunks
+from sketches import CountingQuantile
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+# thresholds.pkl key -> (raw column, quantile)
+CUT_POINTS = {
+    'emp_median': ('emp.var.rate', 0.5),
+    'nr_median': ('nr.employed', 0.5),
+}
+SKETCH_COLUMNS = sorted({col for col, _ in CUT_POINTS.values()})
+DEFAULT_K = 400
+DEFAULT_SHARD_ROWS = 200000
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: PARTIAL SKETCHES
+
+def new_sketches(k=DEFAULT_K, seed=None):
+    return {col: CountingQuantile(k, seed=seed) for col in SKETCH_COLUMNS}
+
+
+def sketch_frame(frame, sketches):
+    for col, sketch in sketches.items():
+        sketch.update(frame[col].to_numpy())
+    return sketches
+
+
+def sketch_shard(path, columns, sep, shard, k, seed):
+    """Worker: read one row range (only the sketched columns) -> partial sketches"""
+    sketches = new_sketches(k, seed)
+    with open(path, "rb") as f:
+        f.seek(shard['offset'])
+        frame = pd.read_csv(f, sep=sep, header=None, names=columns, usecols=SKETCH_COLUMNS, nrows=shard['n_rows'])
+    return sketch_frame(frame, sketches), len(frame)
+
+
+def merge_sketches(total, partial):
+    for col, sketch in partial.items():
+        total[col].merge(sketch)
+    return total
+
+
+def stream_sketches(paths, sep=",", workers=1, shard_rows=DEFAULT_SHARD_ROWS, k=DEFAULT_K):
+    """Sketches of SKETCH_COLUMNS over every row of every file. workers=1 stays in this process (chunked
+    read_csv), more workers sketch shards in parallel. Returns (sketches, rows)"""
+    total = new_sketches(k, seed=0)
+    rows = 0
+    if workers == 1:
+        for path in paths:
+            for chunk in iter_csv_chunks(path, shard_rows, sep=sep, usecols=SKETCH_COLUMNS):
+                sketch_frame(chunk, total)
+                rows += len(chunk)
+        return total, rows
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for path in paths:
+            columns = list(pd.read_csv(path, sep=sep, nrows=0).columns) # real names, even if quoted in the file
+            _, shards = plan_shards(path, shard_rows)
+            futures += [pool.submit(sketch_shard, path, columns, sep, shard, k, len(futures) + i)
+                        for i, shard in enumerate(shards)]
+        for future in as_completed(futures):
+            partial, n = future.result()
+            merge_sketches(total, partial)
+            rows += n
+    return total, rows
+
+
+def cut_points(sketches):
+    return {key: float(sketches[col].quantile(q)) for key, (col, q) in CUT_POINTS.items()}
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: VERSIONED thresholds.pkl
+
+def load_saved(path):
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return None
+
+
+def build_thresholds(sketches, rows, paths, k, previous=None):
+    """Same keys the app / scoring read (emp_median, nr_median) + where they came from"""
+    return {
+        **cut_points(sketches),
+        'version': (previous or {}).get('version', 0) + 1,
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'rows': rows,
+        'sources': [os.path.abspath(p) for p in paths],
+        'method': "exact counts" if all(s.is_exact() for s in sketches.values()) else f"QuantileSketch k={k}",
+    }
+
+
+def save_thresholds(thresholds, path=THRESHOLDS_PATH):
+    """Keep the current file as thresholds.vN.pkl, then swap the new one in (temp file + rename)"""
+    previous = load_saved(path)
+    if previous is not None:
+        shutil.copy2(path, path.replace(".pkl", f".v{previous.get('version', 0)}.pkl"))
+    tmp = path + ".tmp"
+    joblib.dump(thresholds, tmp)
+    os.replace(tmp, path)
+
+
+def refresh(paths, sep=",", workers=1, shard_rows=DEFAULT_SHARD_ROWS, k=DEFAULT_K, previous_path=THRESHOLDS_PATH):
+    """Whole job without saving -> new thresholds dict + the one at previous_path it will replace"""
+    sketches, rows = stream_sketches(paths, sep, workers, shard_rows, k)
+    if not rows:
+        raise ValueError("No rows to compute thresholds from")
+    previous = load_saved(previous_path)
+    return build_thresholds(sketches, rows, paths, k, previous), previous
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute thresholds.pkl from any amount of history")
+    parser.add_argument("csv", nargs="+", help="customer / campaign CSV files (same columns as the UCI file)")
+    parser.add_argument("--sep", default=",")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--shard-rows", type=int, default=DEFAULT_SHARD_ROWS)
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="sketch size (bigger = more accurate)")
+    parser.add_argument("--output", default=THRESHOLDS_PATH)
+    parser.add_argument("--register", action="store_true",
+                        help="save as a new models/ registry version (live model + these thresholds)")
+    args = parser.parse_args(argv)
+
+    live = read_pointer()
+    if args.register and live is None:
+        raise SystemExit("No models/ registry, run without --register to update thresholds.pkl")
+    previous_path = os.path.join(version_dir(live), THRESHOLDS_PATH) if args.register else args.output
+
+    start = time.perf_counter()
+    thresholds, previous = refresh(args.csv, args.sep, args.workers, args.shard_rows, args.k, previous_path)
+    print(f"Sketched {thresholds['rows']:,} rows from {len(args.csv)} file(s) in {time.perf_counter() - start:.1f}s")
+    for key in CUT_POINTS:
+        before = f" (was {previous[key]:g})" if previous and key in previous else ""
+        print(f"  {key}: {thresholds[key]:g}{before}")
+
+    if args.register:
+        version = register(version_dir(live), note=f"thresholds v{thresholds['version']} from {thresholds['rows']:,} rows",
+                           make_current=False, copy_extras=False, overrides={THRESHOLDS_PATH: thresholds})
+        print(f"Registered {version} (live model {live} + new thresholds), not live yet. Compare with: "
+              f"python model_registry.py shadow {version}")
+    else:
+        save_thresholds(thresholds, args.output)
+        print(f"Saved -> {args.output} (version {thresholds['version']})")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
@@ -0,0 +1,243 @@
+"""
+CACHED TRAINING PIPELINE FOR BANKCONVERT AI
+
+1. Why: every notebook run repeats load -> drop_duplicates -> drop leakage columns -> split -> feature engineering
+(row-wise .apply per feature) -> get_dummies -> scaling before a single model is trained, even when only a
+hyperparameter changed.
+
+2. How:
+   - the same steps as the notebook, as 4 stages: load, split, features, encode (+ train, which is never cached)
+   - every stage output is saved in .pipeline_cache/ under a content-addressed key: sha256 of the input file's
+     bytes + the stage's own parameters (sep, test_size=0.3, random_state=2025, ...) + the key of the stage before
+     it. Same inputs -> same key -> loaded from disk instead of recomputed, so changing only --param values goes
+     straight to training. Editing a stage's code means bumping its number in STAGE_VERSIONS
+   - feature engineering is the vectorised engineer_features from scoring.py (np.select over whole columns)
+     instead of .apply(categorize_age), .apply(economic_condition, axis=1) etc.
+   - encoding keeps the notebook's layout: get_dummies(drop_first=True) on the TRAIN split decides the columns,
+     StandardScaler is fitted on train only, medians for economic_condition come from train only
+   - outputs the 4 artifacts the app reads (best_model.pkl, scaler.pkl, feature_columns.pkl, thresholds.pkl) into
+     candidate/ by default, NOT next to the app: a flat best_model.pkl is hot-swapped into every session, so an
+     experiment only goes live through model_registry.py register (or shadow first)
+
+Usage:
+    python train_pipeline.py bank-additional-full.csv --model random_forest --param max_depth=15
+    python train_pipeline.py bank-additional-full.csv --param n_estimators=200 --output-dir experiments/trees200
+    python model_registry.py register --from candidate --no-activate --note "max_depth=15"
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import pandas as pd
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.utils.class_weight import compute_sample_weight
+
+from batch_score import file_fingerprint
+from retrain import evaluate
+from scoring import (CATEGORICAL_COLS, FEATURE_COLUMNS_PATH, MODEL_PATH, RANDOM_STATE, SCALER_PATH, TEST_SIZE,
+                     THRESHOLDS_PATH, encode_features, engineer_features, load_labelled_data)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+CACHE_DIR = ".pipeline_cache"
+CANDIDATE_DIR = "candidate" # never the live folder: going live is model_registry.py / retrain.py's job
+
+# bump a stage's number when its code changes, so old cached outputs are not reused
+STAGE_VERSIONS = {'load': 1, 'split': 1, 'features': 1, 'encode': 1,
+                  'timeline': 1, 'fold': 1} # last two: backtest.py
+
+# the notebook's 4 model families, with its class imbalance handling
+MODELS = {
+    'random_forest': lambda: RandomForestClassifier(random_state=RANDOM_STATE, class_weight='balanced', n_jobs=-1),
+    'logistic_regression': lambda: LogisticRegression(random_state=RANDOM_STATE, max_iter=1000,
+                                                      class_weight='balanced'),
+    'decision_tree': lambda: DecisionTreeClassifier(random_state=RANDOM_STATE, class_weight='balanced'),
+    'gradient_boosting': lambda: GradientBoostingClassifier(random_state=RANDOM_STATE), # sample_weight in train
+}
+DEFAULT_PARAMS = {'random_forest': {'max_depth': 15}} # final tuned model of the notebook
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: STAGE CACHE
+
+class StageCache:
+    """Stage outputs on disk, one joblib file per (stage, key)"""
+
+    def __init__(self, cache_dir=CACHE_DIR, enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.log = [] # (stage, 'hit' / 'computed', seconds) of this run
+
+    @staticmethod
+    def key(stage, upstream, **params):
+        payload = json.dumps({'stage': stage, 'version': STAGE_VERSIONS[stage], 'upstream': upstream,
+                              'params': params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def path(self, stage, key):
+        return os.path.join(self.cache_dir, f"{stage}-{key[:20]}.joblib")
+
+    def get(self, stage, key):
+        """Cached output, or None on a miss (or with the cache disabled)"""
+        path = self.path(stage, key)
+        return joblib.load(path) if self.enabled and os.path.exists(path) else None
+
+    def put(self, stage, key, result):
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.path(stage, key)
+            tmp = path + ".tmp"
+            joblib.dump(result, tmp)
+            os.replace(tmp, path) # a crash mid-write never leaves a half file that counts as a hit
+
+    def run(self, stage, key, compute):
+        start = time.perf_counter()
+        result = self.get(stage, key)
+        if result is not None:
+            self.log.append((stage, "hit", time.perf_counter() - start))
+            return result
+        result = compute()
+        self.put(stage, key, result)
+        self.log.append((stage, "computed", time.perf_counter() - start))
+        return result
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: STAGES (same steps as the notebook)
+
+def stage_load(csv_path, sep):
+    """Read + drop_duplicates + drop duration/campaign + y to 0/1"""
+    X, y = load_labelled_data(csv_path, sep)
+    return {'X': X, 'y': y}
+
+
+def stage_split(loaded, test_size, random_state):
+    X_train, X_test, y_train, y_test = train_test_split(loaded['X'], loaded['y'], test_size=test_size,
+                                                        random_state=random_state, stratify=loaded['y'])
+    return {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test}
+
+
+def stage_features(split):
+    """5 engineered features, medians from the TRAINING split only (no test leakage)"""
+    emp_median = float(split['X_train']['emp.var.rate'].median())
+    nr_median = float(split['X_train']['nr.employed'].median())
+    return {
+        'X_train': engineer_features(split['X_train'], emp_median, nr_median),
+        'X_test': engineer_features(split['X_test'], emp_median, nr_median),
+        'y_train': split['y_train'], 'y_test': split['y_test'],
+        'thresholds': {'emp_median': emp_median, 'nr_median': nr_median},
+    }
+
+
+def stage_encode(features):
+    """One-hot columns from the train split (drop_first=True) + StandardScaler fitted on train numbers"""
+    X_train = features['X_train']
+    dummies = pd.get_dummies(X_train, columns=CATEGORICAL_COLS, drop_first=True)
+    feature_columns = dummies.columns.tolist()
+    numerical_cols = [col for col in X_train.columns if col not in CATEGORICAL_COLS]
+    scaler = StandardScaler().fit(X_train[numerical_cols])
+    return {
+        # test columns follow train's, unseen levels are all-zero (= the notebook's reindex(fill_value=0))
+        'X_train': encode_features(X_train, feature_columns, scaler),
+        'X_test': encode_features(features['X_test'], feature_columns, scaler),
+        'y_train': features['y_train'].to_numpy(), 'y_test': features['y_test'].to_numpy(),
+        'feature_columns': feature_columns, 'scaler': scaler, 'thresholds': features['thresholds'],
+    }
+
+
+def prepare(csv_path, sep=";", test_size=TEST_SIZE, random_state=RANDOM_STATE, cache=None):
+    """Run or load the 4 cached stages -> encoded train/test + the artifacts the app needs.
+    Keys only depend on inputs + params, so they are all known up front and an earlier stage is only
+    loaded / run when a later one misses (a full hit reads just the encode file)"""
+    cache = cache or StageCache()
+    load_key = cache.key('load', file_fingerprint(csv_path), sep=sep) # file CONTENT, not its name or mtime
+    split_key = cache.key('split', load_key, test_size=test_size, random_state=random_state)
+    features_key = cache.key('features', split_key)
+    encode_key = cache.key('encode', features_key)
+
+    loaded = lambda: cache.run('load', load_key, lambda: stage_load(csv_path, sep))
+    split = lambda: cache.run('split', split_key, lambda: stage_split(loaded(), test_size, random_state))
+    features = lambda: cache.run('features', features_key, lambda: stage_features(split()))
+    return cache.run('encode', encode_key, lambda: stage_encode(features()))
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: TRAIN + SAVE
+
+def train(prepared, model_name='random_forest', params=None):
+    """Fit one model family on the prepared train split (never cached, this is the part being tuned)"""
+    model = MODELS[model_name]()
+    model.set_params(**{**DEFAULT_PARAMS.get(model_name, {}), **(params or {})})
+    fit_kwargs = {}
+    if model_name == 'gradient_boosting':
+        fit_kwargs['sample_weight'] = compute_sample_weight('balanced', prepared['y_train'])
+    model.fit(prepared['X_train'], prepared['y_train'], **fit_kwargs)
+    return model
+
+
+def save_artifacts(model, prepared, output_dir=CANDIDATE_DIR):
+    """Same 4 files the notebook writes, each via temp file + rename"""
+    os.makedirs(output_dir, exist_ok=True)
+    for name, obj in ((MODEL_PATH, model), (SCALER_PATH, prepared['scaler']),
+                      (FEATURE_COLUMNS_PATH, prepared['feature_columns']), (THRESHOLDS_PATH, prepared['thresholds'])):
+        path = os.path.join(output_dir, name)
+        joblib.dump(obj, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+
+def parse_params(pairs):
+    """['max_depth=15', 'solver="liblinear"'] -> {'max_depth': 15, 'solver': 'liblinear'}"""
+    params = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        try:
+            params[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            params[name] = value # bare words like lbfgs
+    return params
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Notebook preprocessing + training with cached stages")
+    parser.add_argument("csv", nargs="?", default="bank-additional-full.csv")
+    parser.add_argument("--sep", default=";")
+    parser.add_argument("--test-size", type=float, default=TEST_SIZE)
+    parser.add_argument("--random-state", type=int, default=RANDOM_STATE)
+    parser.add_argument("--model", default="random_forest", choices=sorted(MODELS))
+    parser.add_argument("--param", action="append", default=[], help="hyperparameter, e.g. --param max_depth=15")
+    parser.add_argument("--output-dir", default=CANDIDATE_DIR, help="where the 4 .pkl files go (not the live folder)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="recompute every stage, write nothing to the cache")
+    args = parser.parse_args(argv)
+
+    cache = StageCache(args.cache_dir, enabled=not args.no_cache)
+    prepared = prepare(args.csv, args.sep, args.test_size, args.random_state, cache)
+    start = time.perf_counter()
+    model = train(prepared, args.model, parse_params(args.param))
+    cache.log.append(("train", "computed", time.perf_counter() - start))
+    save_artifacts(model, prepared, args.output_dir)
+
+    for stage, status, seconds in cache.log:
+        print(f"  {stage:<9}{status:<10}{seconds:>7.2f}s")
+    scores = evaluate(model, prepared['X_test'], prepared['y_test'])
+    print(f"{args.model} on {len(prepared['y_test']):,} test rows: "
+          + ", ".join(f"{name} {value:.4f}" for name, value in scores.items()))
+    print(f"Saved {MODEL_PATH}, {SCALER_PATH}, {FEATURE_COLUMNS_PATH}, {THRESHOLDS_PATH} -> {args.output_dir}")
+    print(f"Not live yet: python model_registry.py register --from {args.output_dir} --no-activate")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------
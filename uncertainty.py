@@ -0,0 +1,155 @@
+"""
+PER-PREDICTION UNCERTAINTY FOR BANKCONVERT AI
+
+1. Why: the result card only says "X% confidence", which is just predict_proba again. Two customers at 60% can be
+very different: one where all 100 trees say ~60%, one where half the trees say 10% and half say 100%.
+
+2. How:
+   - spread = std of the per-tree votes. The forest probability IS the mean of those votes, so both come from the
+     same pass over the trees (tree_votes here for the sklearn model, forest_predict_spread for the exported one)
+   - optional split-conformal interval, calibrated once on the held-out 30% split (conformal.pkl):
+     score = |outcome - probability| / (spread + beta) on every held-out customer, q = the (1 - alpha) quantile of
+     those scores (with the (n + 1) finite-sample correction), interval = probability +- q * (spread + beta).
+     For a new customer the interval holds the real outcome (0 or 1) at least 1 - alpha of the time, and it is
+     wider where the trees disagree more. beta = median spread, so rows with near-zero spread still get a band
+   - an interval that reaches both 0 and 1 means the model cannot rule either outcome out (= uncertain), and its
+     lower end is a cautious score to rank prospects by
+   - conformal.pkl keeps the sha256 of the model file it was calibrated on, q + beta of another forest give no
+     coverage guarantee, so the app and batch_score.py only use it for that exact model file
+
+Usage:
+    python uncertainty.py bank-additional-full.csv --alpha 0.1
+"""
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 1: IMPORTS
+
+import argparse
+import os
+
+import joblib
+import numpy as np
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 2: CONSTANTS
+
+CONFORMAL_PATH = "conformal.pkl"
+DEFAULT_ALPHA = 0.1 # intervals miss the real outcome for at most 10% of customers
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 3: TREE VOTES
+
+def has_tree_votes(model):
+    """Forests only, a single tree or a linear model has nothing to disagree with"""
+    return len(getattr(model, 'estimators_', [])) > 1 and all(hasattr(t, 'predict_proba')
+                                                                for t in np.ravel(model.estimators_))
+
+
+def tree_votes(model, X):
+    """P(class 1) from every tree -> (rows x trees), the same numbers RandomForestClassifier averages"""
+    X = np.asarray(X, dtype=np.float32) # what the forest passes its trees (they were fitted without column names)
+    return np.column_stack([tree.predict_proba(X)[:, 1] for tree in model.estimators_])
+
+
+def predict_with_spread(model, X):
+    """(probability, spread). spread is None for models without tree votes"""
+    if not has_tree_votes(model):
+        from scoring import predict_probability
+        return predict_probability(model, X), None
+    votes = tree_votes(model, X)
+    return votes.mean(axis=1), votes.std(axis=1)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 4: SPLIT-CONFORMAL INTERVALS
+
+def calibrate_conformal(probability, spread, y, alpha=DEFAULT_ALPHA):
+    """q and beta from held-out customers the model never trained on"""
+    probability, spread, y = (np.asarray(a, dtype=np.float64) for a in (probability, spread, y))
+    beta = max(float(np.median(spread)), 1e-3)
+    scores = np.abs(y - probability) / (spread + beta)
+    n = len(scores)
+    level = min(np.ceil((n + 1) * (1 - alpha)) / n, 1.0)
+    return {
+        'alpha': alpha,
+        'q': float(np.quantile(scores, level, method='higher')),
+        'beta': beta,
+        'n': n,
+    }
+
+
+def conformal_interval(probability, spread, calibration):
+    """(lower, upper), clipped to [0, 1]"""
+    half = calibration['q'] * (np.asarray(spread) + calibration['beta'])
+    return np.clip(probability - half, 0, 1), np.clip(probability + half, 0, 1)
+
+
+def is_uncertain(lower, upper):
+    """Interval reaches both outcomes, so neither can be ruled out"""
+    return (np.asarray(lower) <= 0) & (np.asarray(upper) >= 1)
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 5: SAVE / LOAD
+
+def save_conformal(calibration, path=CONFORMAL_PATH):
+    tmp = path + ".tmp"
+    joblib.dump(calibration, tmp)
+    os.replace(tmp, path)
+
+
+def load_conformal(path=CONFORMAL_PATH):
+    """Saved calibration, or None if uncertainty.py has not been run for this model"""
+    try:
+        return joblib.load(path)
+    except FileNotFoundError:
+        return None
+
+
+def load_model_conformal(model_sha256, path=CONFORMAL_PATH):
+    """Saved calibration only if it was calibrated on the model file with this sha256, else None"""
+    calibration = load_conformal(path)
+    return calibration if calibration is not None and calibration.get('model_sha256') == model_sha256 else None
+
+#---------------------------------------------------------------------------------------------------------
+# SECTION 6: CLI
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate split-conformal intervals on the held-out split")
+    parser.add_argument("csv", nargs="?", default="bank-additional-full.csv", help="original dataset")
+    parser.add_argument("--sep", default=";")
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA, help="allowed miss rate of the intervals")
+    parser.add_argument("--output", default=CONFORMAL_PATH)
+    args = parser.parse_args(argv)
+
+    from batch_score import file_fingerprint
+    from model_registry import resolve_artifact
+    from scoring import MODEL_PATH, load_artifacts, load_dataset_split, load_thresholds, preprocess_batch
+    model, scaler, feature_columns = load_artifacts()
+    if not has_tree_votes(model):
+        raise SystemExit(f"{type(model).__name__} has no tree votes, intervals need a forest")
+    emp_median, nr_median = load_thresholds()
+    _, X_test, _, y_test = load_dataset_split(args.csv, args.sep)
+    X = preprocess_batch(X_test, feature_columns, scaler, emp_median, nr_median)
+    probability, spread = predict_with_spread(model, X)
+    y = np.asarray(y_test)
+
+    # check on half before calibrating on all of it: coverage on rows the calibration did not see
+    half = len(y) // 2
+    check = calibrate_conformal(probability[:half], spread[:half], y[:half], args.alpha)
+    lower, upper = conformal_interval(probability[half:], spread[half:], check)
+    coverage = np.mean((y[half:] >= lower) & (y[half:] <= upper))
+
+    calibration = calibrate_conformal(probability, spread, y, args.alpha)
+    calibration['model_sha256'] = file_fingerprint(resolve_artifact(MODEL_PATH))
+    save_conformal(calibration, args.output)
+    lower, upper = conformal_interval(probability, spread, calibration)
+    print(f"Held-out rows: {len(y):,} | vote spread median {np.median(spread):.3f}, 90th pct "
+          f"{np.percentile(spread, 90):.3f}")
+    print(f"q = {calibration['q']:.3f}, beta = {calibration['beta']:.3f} -> mean interval width "
+          f"{np.mean(upper - lower):.1%}, {np.mean(is_uncertain(lower, upper)):.1%} of customers uncertain")
+    print(f"Coverage on the unseen half: {coverage:.1%} (target {1 - args.alpha:.0%})")
+    print(f"Saved -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
+#---------------------------------------------------------------------------------------------------------